@@ -1,28 +1,44 @@
 
 from fastapi import Depends, Header, HTTPException
 from sqlalchemy.orm import Session
-from app.core.db import get_db
+from app.core.db import get_db, SessionLocal
 from app.models.global_role_model import GlobalRoleType
 from app.models.project_user_model import ProjectRoleType
 from app.services.global_role_service import GlobalRoleService
 from app.services.item_service import ItemService
 from app.services.lock_service import LockService
+from app.services.notification_service import NotificationService
+from app.services.idempotency_service import IdempotencyService
 from app.services.user_service import UserService
 from app.services.project_service import ProjectService
+from app.services.timeline_service import TimelineService
+from app.services.simulation_service import SimulationService
+from app.services.cashflow_service import CashflowService
 from app.repositories.global_role_repository import GlobalRoleRepository
 from app.repositories.project_user_repository import ProjectUserRepository
 from app.repositories.list_repository import ListRepository
 from app.repositories.item_repository import ItemRepository
 from app.repositories.user_repository import UserRepository
 from app.repositories.project_repository import ProjectRepository
-from typing import Optional
+from typing import Optional, Set, Tuple
 from app.utils.logger import logger # Import logger
+from app.utils.etag import WeakETagError, parse_if_match
+from app.core.exceptions import BadRequestException, PreconditionFailedException
 
 def get_external_user_id(user_external_id: str = Header(..., alias="X-User-ID")) -> str:
     if not user_external_id:
         raise HTTPException(status_code=401, detail="User ID header required")
     return user_external_id
 
+def get_if_match_version(if_match: Optional[str] = Header(None, alias="If-Match")) -> Optional[int]:
+    """Row version required by If-Match, or None for an unconditional update"""
+    try:
+        return parse_if_match(if_match)
+    except WeakETagError:
+        raise PreconditionFailedException("If-Match needs a strong ETag; weak ETags never match")
+    except ValueError:
+        raise BadRequestException("If-Match must be an ETag returned by this API")
+
 def get_user_repository(db: Session = Depends(get_db)) -> UserRepository:
     return UserRepository(db)
 
@@ -64,9 +80,27 @@ def get_project_service(
 ) -> ProjectService:
     return ProjectService(db)
 
+def get_timeline_service(db: Session = Depends(get_db)) -> TimelineService:
+    return TimelineService(db)
+
+def get_simulation_service(db: Session = Depends(get_db)) -> SimulationService:
+    return SimulationService(db)
+
+def get_cashflow_service(db: Session = Depends(get_db)) -> CashflowService:
+    return CashflowService(db)
+
 def get_lock_service(db: Session = Depends(get_db)) -> LockService:
     return LockService(db)
 
+def get_idempotency_service(db: Session = Depends(get_db)) -> IdempotencyService:
+    return IdempotencyService(db)
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")) -> Optional[str]:
+    return idempotency_key
+
+def get_notification_service(db: Session = Depends(get_db)) -> NotificationService:
+    return NotificationService(db)
+
 def get_item_service(
     db: Session = Depends(get_db),
     item_repo: ItemRepository = Depends(get_item_repository),
@@ -113,3 +147,18 @@ def require_project_access(
     project = project_repo.get_by_id_for_user(project_id, user_internal_id)
     if not project:
         raise HTTPException(status_code=403, detail="Access denied to this project")
+
+def get_stream_identity(user_external_id: str = Depends(get_external_user_id)) -> Tuple[int, Set[int]]:
+    """
+    Resolve the user and their project ids for a long-lived stream.
+
+    Uses its own short session instead of get_db so that no pooled connection
+    stays checked out for the lifetime of the connection.
+    """
+    db = SessionLocal()
+    try:
+        user = UserRepository(db).get_or_create_by_external_id(user_external_id)
+        project_ids = set(ProjectRepository(db).get_project_ids_for_user(user.internal_id))
+        return user.internal_id, project_ids
+    finally:
+        db.close()
@@ -1,20 +1,28 @@
 
-from fastapi import APIRouter, Depends, status
-from typing import List as TypeList, Dict, Any
-from app.schemas.list_schema import ListUpdate, ListInDB
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import List as TypeList, Dict, Any, Optional
+from app.schemas.list_schema import ListUpdate, ListInDB, ListSummary
 from app.schemas.item_schema import ItemCreate, ItemUpdate, ItemInDB
 from app.schemas.response_schema import ResponseModel
-from app.schemas.lock_schema import LockInDB
+from app.schemas.lock_schema import LockInDB, LockQueue, LockSetRequest
+from app.core.config import settings
 from app.services.list_service import ListService
 from app.services.item_service import ItemService
 from app.services.lock_service import LockService
+from app.services.lock_wait_queue import lock_wait_queue
+from app.services.idempotency_service import IdempotencyService
 from app.api.dependencies import (
     get_list_service,
     get_item_service,
     get_lock_service,
     get_current_user_id,
+    get_external_user_id,
+    get_if_match_version,
+    get_idempotency_key,
+    get_idempotency_service,
     require_project_access,
 )
+from app.utils.etag import format_etag
 from app.utils.logger import logger
 
 
@@ -26,29 +34,69 @@ router = APIRouter()
 @router.get("/project/{project_id}", response_model=ResponseModel[TypeList[ListInDB]])
 def get_all_lists_for_project(
     project_id: int,
+    include_locks: bool = Query(False, description="Embed each list's lock status"),
     list_service: ListService = Depends(get_list_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    lists = list_service.get_all_lists_for_project(project_id, user_internal_id)
+    lists = list_service.get_all_lists_for_project(project_id, user_internal_id, include_locks)
     return ResponseModel(data=lists, message="Lists for project retrieved successfully")
 
+@router.post("/locks", response_model=ResponseModel[TypeList[LockInDB]])
+def acquire_locks(
+    selection: LockSetRequest,
+    lock_service: LockService = Depends(get_lock_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """
+    Lock several lists at once: explicit `list_ids`, a `step_id` with all of its
+    sub-steps, or a whole `project_id`. Either every list is locked or none is (409).
+    """
+    locks = lock_service.acquire_locks(selection, user_internal_id)
+    return ResponseModel(data=[LockInDB.model_validate(lock) for lock in locks], message="Locks acquired successfully")
+
+@router.post("/locks/release", response_model=ResponseModel[TypeList[int]])
+def release_locks(
+    selection: LockSetRequest,
+    lock_service: LockService = Depends(get_lock_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Release the caller's locks on the selected lists; returns the released list ids"""
+    released = lock_service.release_locks(selection, user_internal_id)
+    return ResponseModel(data=released, message="Locks released successfully")
+
 @router.get("/{list_id}", response_model=ResponseModel[ListInDB])
 async def get_list(
     list_id: int,
+    response: Response,
     list_service: ListService = Depends(get_list_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
     db_list = list_service.get_list(list_id, user_internal_id)
+    response.headers["ETag"] = format_etag(db_list.version)
     return ResponseModel(data=db_list, message="List retrieved successfully")
 
+@router.get("/{list_id}/summary", response_model=ResponseModel[ListSummary])
+def get_list_summary(
+    list_id: int,
+    list_service: ListService = Depends(get_list_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Item count, total cost, max delivery period and per-category / per-status counts, without the items"""
+    summary = list_service.get_list_summary(list_id, user_internal_id)
+    return ResponseModel(data=summary, message="List summary retrieved successfully")
+
 @router.put("/{list_id}", response_model=ResponseModel[ListInDB])
 async def update_list(
     list_id: int,
     list_update: ListUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(get_if_match_version),
     list_service: ListService = Depends(get_list_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    updated_list = list_service.update_list(list_id, list_update, user_internal_id)
+    """With If-Match, the update only applies to that version of the list; otherwise 412 with the current list"""
+    updated_list = list_service.update_list(list_id, list_update, user_internal_id, expected_version)
+    response.headers["ETag"] = format_etag(updated_list.version)
     return ResponseModel(data=updated_list, message="List updated successfully")
 
 @router.delete("/{list_id}", response_model=ResponseModel[dict])
@@ -64,11 +112,20 @@ async def delete_list(
 async def create_item(
     list_id: int,
     item_create: ItemCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service),
     item_service: ItemService = Depends(get_item_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    item = item_service.create_item(list_id, item_create, user_internal_id)
-    return ResponseModel(data=item, message="Item created successfully")
+    """With an Idempotency-Key header, a retried request returns the original item instead of creating another"""
+    body, replayed = idempotency_service.run(
+        idempotency_key, user_internal_id, f"POST /lists/{list_id}/items", item_create.model_dump(mode="json"),
+        lambda: ResponseModel(data=item_service.create_item(list_id, item_create, user_internal_id), message="Item created successfully"),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
 
 @router.get("/{list_id}/items", response_model=ResponseModel[TypeList[ItemInDB]])
 async def get_items(
@@ -84,10 +141,19 @@ async def update_item(
     list_id: int,
     item_id: int,
     item_update: ItemUpdate,
+    response: Response,
+    base_version: Optional[int] = Query(None, ge=1, description="Version the edit started from; merges edits of other fields"),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     item_service: ItemService = Depends(get_item_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    item = item_service.update_item(list_id, item_id, item_update, user_internal_id)
+    """
+    With If-Match, the update only applies to that version of the item (412 otherwise).
+    With base_version, changes made since then to other fields are kept and only
+    same-field conflicts are rejected (409 listing `conflicting_fields`).
+    """
+    item = item_service.update_item(list_id, item_id, item_update, user_internal_id, expected_version, base_version)
+    response.headers["ETag"] = format_etag(item.version)
     return ResponseModel(data=item, message="Item updated successfully")
 
 @router.delete("/{list_id}/items/{item_id}", response_model=ResponseModel[Dict])
@@ -102,12 +168,36 @@ async def delete_item(
 
 @router.post("/{list_id}/lock", response_model=ResponseModel[LockInDB])
 async def acquire_lock(
+    list_id: int,
+    wait: float = Query(0, ge=0, le=settings.LOCK_MAX_WAIT_SECONDS, description="Seconds to queue for the lock"),
+    user_external_id: str = Depends(get_external_user_id)
+):
+    """
+    Acquire the list lock. With wait > 0 the caller joins a FIFO queue and the
+    request returns as soon as the lock is handed over, or 409 after `wait` seconds.
+    Uses short sessions only, so a waiting request holds no database connection.
+    """
+    lock = await lock_wait_queue.acquire(list_id, user_external_id, wait)
+    return ResponseModel(data=lock, message="Lock acquired successfully")
+
+@router.get("/{list_id}/lock/queue", response_model=ResponseModel[LockQueue])
+def get_lock_queue(
+    list_id: int,
+    lock_service: LockService = Depends(get_lock_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Current lock holder and the users waiting for the lock, in queue order"""
+    return ResponseModel(data=lock_service.get_queue(list_id, user_internal_id), message="Lock queue retrieved successfully")
+
+@router.post("/{list_id}/lock/renew", response_model=ResponseModel[LockInDB])
+def renew_lock(
     list_id: int,
     lock_service: LockService = Depends(get_lock_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    lock = lock_service.acquire_lock(list_id, user_internal_id)
-    return ResponseModel(data=LockInDB.model_validate(lock), message="Lock acquired successfully")
+    """Extend the lease on a held lock; call this more often than LOCK_TTL_SECONDS"""
+    lock = lock_service.renew_lock(list_id, user_internal_id)
+    return ResponseModel(data=LockInDB.model_validate(lock), message="Lock renewed successfully")
 
 @router.delete("/{list_id}/lock", response_model=ResponseModel[None])
 async def release_lock(
@@ -1,20 +1,50 @@
-from fastapi import APIRouter, Depends, status
-from typing import List as TypeList
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import List as TypeList, Optional
 from app.schemas.project_schema import Project, ProjectCreate, ProjectUpdate, ProjectAddUser, ProjectRemoveUser
 from app.schemas.response_schema import ResponseModel
+from app.schemas.lock_schema import ListLockStatus
+from app.core.config import settings
+from app.schemas.timeline_schema import ProjectCashflow, ProjectSimulation, ProjectTimeline
 from app.services.project_service import ProjectService
-from app.api.dependencies import get_project_service, get_current_user_id
+from app.services.lock_service import LockService
+from app.services.idempotency_service import IdempotencyService
+from app.services.timeline_service import TimelineService
+from app.services.simulation_service import SimulationService
+from app.services.cashflow_service import CashflowService
+from app.api.dependencies import (
+    get_project_service,
+    get_timeline_service,
+    get_simulation_service,
+    get_cashflow_service,
+    get_lock_service,
+    get_current_user_id,
+    get_idempotency_key,
+    get_idempotency_service,
+)
 
 router = APIRouter()
 
 @router.post("/", response_model=ResponseModel[Project], status_code=status.HTTP_201_CREATED)
 def create_project(
     project: ProjectCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service),
     project_service: ProjectService = Depends(get_project_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
-    new_project = project_service.create_project(project, user_internal_id)
-    return ResponseModel(data=new_project, message="Project created successfully")
+    """With an Idempotency-Key header, a retried request returns the original project instead of creating another"""
+    body, replayed = idempotency_service.run(
+        idempotency_key, user_internal_id, "POST /projects", project.model_dump(mode="json"),
+        lambda: ResponseModel(
+            data=Project.model_validate(project_service.create_project(project, user_internal_id)),
+            message="Project created successfully",
+        ),
+        status_code=status.HTTP_201_CREATED,
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
 
 @router.get("/{project_id}", response_model=ResponseModel[Project])
 def get_project(
@@ -33,6 +63,48 @@ def get_all_projects(
     projects = project_service.get_all_projects_for_user(user_internal_id)
     return ResponseModel(data=projects, message="Projects retrieved successfully")
 
+@router.get("/{project_id}/locks", response_model=ResponseModel[TypeList[ListLockStatus]])
+def get_project_locks(
+    project_id: int,
+    lock_service: LockService = Depends(get_lock_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Holder and lease of every locked list in the project; unlocked lists are omitted"""
+    locks = lock_service.get_project_locks(project_id, user_internal_id)
+    return ResponseModel(data=[ListLockStatus.model_validate(lock) for lock in locks], message="Project locks retrieved successfully")
+
+@router.get("/{project_id}/timeline", response_model=ResponseModel[ProjectTimeline])
+def get_project_timeline(
+    project_id: int,
+    timeline_service: TimelineService = Depends(get_timeline_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Earliest/latest start and finish, slack and the critical path over the step tree and step dependencies"""
+    timeline = timeline_service.get_project_timeline(project_id, user_internal_id)
+    return ResponseModel(data=timeline, message="Project timeline retrieved successfully")
+
+@router.get("/{project_id}/simulation", response_model=ResponseModel[ProjectSimulation])
+def get_project_simulation(
+    project_id: int,
+    trials: Optional[int] = Query(None, ge=1, le=settings.SIMULATION_MAX_TRIALS),
+    simulation_service: SimulationService = Depends(get_simulation_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """P50/P90 finish date and final cost with histograms, from duration and cost variance of finished steps"""
+    simulation = simulation_service.simulate_project(project_id, user_internal_id, trials)
+    return ResponseModel(data=simulation, message="Project simulation completed successfully")
+
+@router.get("/{project_id}/cashflow", response_model=ResponseModel[ProjectCashflow])
+def get_project_cashflow(
+    project_id: int,
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    cashflow_service: CashflowService = Depends(get_cashflow_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Planned spending per bucket: workers prices spread over step periods, materials and items when they are bought"""
+    cashflow = cashflow_service.get_project_cashflow(project_id, bucket, user_internal_id)
+    return ResponseModel(data=cashflow, message="Project cash flow retrieved successfully")
+
 @router.put("/{project_id}", response_model=ResponseModel[Project])
 def update_project(
     project_id: int,
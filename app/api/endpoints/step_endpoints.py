@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
 from sqlalchemy.orm import Session
 from app.core.db import get_db
 from app.services.step_service import StepService
-from app.schemas.step_schema import Step, StepCreate, StepUpdate
+from app.core.config import settings
+from app.schemas.step_schema import (
+    Step, StepCopyResult, StepCreate, StepShift, StepInDB, StepImport, StepImportResult, StepPlacement, StepUpdate, StepPage, StepRollup
+)
+from app.schemas.timeline_schema import StepDependency, StepDependencyCreate
+from app.services.timeline_service import TimelineService
 from app.schemas.response_schema import ResponseModel # Import ResponseModel
-from typing import List
+from typing import List, Optional
 from app.api.dependencies import get_external_user_id, get_user_service # Import get_external_user_id and get_user_service
 from app.services.user_service import UserService # Import UserService
 
@@ -21,6 +27,30 @@ def create_step(
     new_step = StepService(db).create_step(step, user.internal_id) # Pass user_internal_id
     return ResponseModel(data=new_step, message="Step created successfully")
 
+@router.post("/import", response_model=ResponseModel[StepImportResult], status_code=status.HTTP_201_CREATED)
+def import_steps(
+    step_import: StepImport,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Create a nested plan of steps and their lists in one transaction; returns the new ids by temp_id"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    result = StepService(db).import_steps(step_import, user.internal_id)
+    return ResponseModel(data=result, message="Steps imported successfully")
+
+@router.get("/project/{project_id}/tree", response_model=ResponseModel[List[StepRollup]])
+def get_step_tree(
+    project_id: int,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """The project's top-level steps, each nesting its sub-steps, with costs and dates rolled up over every subtree"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    tree = StepService(db).get_step_tree(project_id, user.internal_id)
+    return ResponseModel(data=tree, message="Step tree retrieved successfully")
+
 @router.get("/{step_id}", response_model=ResponseModel[Step])
 def get_step(
     step_id: int,
@@ -34,15 +64,27 @@ def get_step(
         raise HTTPException(status_code=404, detail="Step not found")
     return ResponseModel(data=step, message="Step retrieved successfully")
 
-@router.get("/", response_model=ResponseModel[List[Step]])
+@router.get("/", response_model=ResponseModel[StepPage])
 def get_all_steps(
+    project_id: Optional[int] = Query(None),
+    parent_step_id: Optional[int] = Query(None),
+    from_date: Optional[datetime] = Query(None, description="Only steps whose planned period ends on or after this"),
+    to_date: Optional[datetime] = Query(None, description="Only steps whose planned period starts on or before this"),
+    after_id: Optional[int] = Query(None, description="Return steps with a larger id than this"),
+    limit: int = Query(settings.STEP_PAGE_SIZE, ge=1, le=settings.STEP_MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     user_external_id: str = Depends(get_external_user_id), # Get external user ID
     user_service: UserService = Depends(get_user_service) # Get user service
 ):
+    """
+    Steps of the caller's projects in id order, without sub_steps.
+    Pass next_after_id from the previous page as after_id to continue.
+    """
     user = user_service.get_or_create_user_by_external_id(user_external_id)
-    steps = StepService(db).get_all_steps() # No user_internal_id needed for get_all_steps in service
-    return ResponseModel(data=steps, message="Steps retrieved successfully")
+    page = StepService(db).list_steps(
+        user.internal_id, after_id, limit, project_id, parent_step_id, from_date, to_date
+    )
+    return ResponseModel(data=page, message="Steps retrieved successfully")
 
 @router.put("/{step_id}", response_model=ResponseModel[Step])
 def update_step(
@@ -69,3 +111,79 @@ def delete_step(
     if not StepService(db).delete_step(step_id, user.internal_id): # Pass user_internal_id
         raise HTTPException(status_code=404, detail="Step not found")
     return ResponseModel(data={"status": "success"}, message="Step deleted successfully") # Wrapped in ResponseModel
+
+@router.post("/{step_id}/move", response_model=ResponseModel[Step])
+def move_step(
+    step_id: int,
+    placement: StepPlacement,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Move the step and its sub-steps under another step of the project (400 if that would make a cycle)"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    moved = StepService(db).move_step(step_id, placement.parent_step_id, user.internal_id)
+    return ResponseModel(data=moved, message="Step moved successfully")
+
+@router.post("/{step_id}/copy", response_model=ResponseModel[StepCopyResult], status_code=status.HTTP_201_CREATED)
+def copy_step(
+    step_id: int,
+    placement: StepPlacement,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Copy the step and its sub-steps, each with a new empty list, under parent_step_id"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    result = StepService(db).copy_step(step_id, placement.parent_step_id, user.internal_id)
+    return ResponseModel(data=result, message="Step copied successfully")
+
+@router.post("/{step_id}/shift", response_model=ResponseModel[List[StepInDB]])
+def shift_step(
+    step_id: int,
+    shift: StepShift,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Move the planned dates of the step and all of its sub-steps; returns the changed steps"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    shifted = StepService(db).shift_step(step_id, shift, user.internal_id)
+    return ResponseModel(data=shifted, message="Step schedule shifted successfully")
+
+@router.delete("/{step_id}/subtree", response_model=ResponseModel[dict])
+def delete_step_subtree(
+    step_id: int,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Delete the step and all of its sub-steps, with their lists and items"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    result = StepService(db).delete_step_subtree(step_id, user.internal_id)
+    return ResponseModel(data=result, message="Step subtree deleted successfully")
+
+@router.post("/{step_id}/dependencies", response_model=ResponseModel[StepDependency], status_code=status.HTTP_201_CREATED)
+def add_step_dependency(
+    step_id: int,
+    dependency: StepDependencyCreate,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    """The step cannot start before predecessor_id finishes (400 if that would make the schedule cyclic)"""
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    created = TimelineService(db).add_dependency(step_id, dependency.predecessor_id, user.internal_id)
+    return ResponseModel(data=created, message="Step dependency added successfully")
+
+@router.delete("/{step_id}/dependencies/{predecessor_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_step_dependency(
+    step_id: int,
+    predecessor_id: int,
+    db: Session = Depends(get_db),
+    user_external_id: str = Depends(get_external_user_id),
+    user_service: UserService = Depends(get_user_service)
+):
+    user = user_service.get_or_create_user_by_external_id(user_external_id)
+    TimelineService(db).remove_dependency(step_id, predecessor_id, user.internal_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
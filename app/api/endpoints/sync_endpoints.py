@@ -1,27 +1,85 @@
-from fastapi import APIRouter, Depends
-from typing import List as TypeList
+import json
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, Set, Tuple, AsyncIterator
 
+from app.core.config import settings
 from app.services.notification_service import NotificationService
-from app.api.dependencies import get_current_user_id, get_list_service
+from app.services.event_hub import event_hub, Subscription
+from app.api.dependencies import get_current_user_id, get_list_service, get_stream_identity, get_notification_service
+from app.core.exceptions import NotFoundException
 from app.services.list_service import ListService
 from app.schemas.response_schema import ResponseModel
 from app.schemas.list_schema import ListInDB
+from app.schemas.notification_schema import NotificationPage
 
 router = APIRouter()
 
-@router.get("/notifications", response_model=TypeList[str])
+@router.get("/notifications", response_model=ResponseModel[NotificationPage])
 def get_notifications(
-    notification_service: NotificationService = Depends(),
+    before_id: Optional[int] = Query(None, description="Return notifications older than this id"),
+    limit: int = Query(settings.NOTIFICATION_PAGE_SIZE, ge=1, le=settings.NOTIFICATION_MAX_PAGE_SIZE),
+    notification_service: NotificationService = Depends(get_notification_service),
     user_internal_id: int = Depends(get_current_user_id)
 ):
     """
-    Get notifications for changes
+    Get the user's notification inbox, newest first.
+    Pass next_before_id from the previous page as before_id to continue.
     """
-    return notification_service.get_notifications()
+    page = notification_service.get_user_notifications(user_internal_id, before_id, limit)
+    return ResponseModel(data=page, message="Notifications retrieved successfully")
+
+@router.post("/notifications/read-all", response_model=ResponseModel[Dict[str, int]])
+def mark_all_notifications_read(
+    up_to_id: Optional[int] = Query(None, description="Mark notifications up to this id as read; defaults to all"),
+    notification_service: NotificationService = Depends(get_notification_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Mark every notification up to up_to_id as read"""
+    last_read_id = notification_service.mark_all_as_read(user_internal_id, up_to_id)
+    return ResponseModel(data={"last_read_id": last_read_id}, message="Notifications marked as read")
+
+@router.post("/notifications/{notification_id}/read", response_model=ResponseModel[Dict[str, Any]])
+def mark_notification_read(
+    notification_id: int,
+    notification_service: NotificationService = Depends(get_notification_service),
+    user_internal_id: int = Depends(get_current_user_id)
+):
+    """Mark a single notification as read"""
+    if not notification_service.mark_as_read(notification_id, user_internal_id):
+        raise NotFoundException("Notification not found")
+    return ResponseModel(data={"id": notification_id, "read": True}, message="Notification marked as read")
+
+async def _event_stream(subscription: Subscription) -> AsyncIterator[str]:
+    """Serialize hub events as SSE frames, with keep-alive comments while idle"""
+    try:
+        yield f"retry: 3000\n: subscribed to {len(subscription.project_ids)} projects\n\n"
+        while True:
+            event = await subscription.get(timeout=settings.SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        event_hub.unsubscribe(subscription)
+
+@router.get("/stream")
+async def stream_changes(identity: Tuple[int, Set[int]] = Depends(get_stream_identity)):
+    """
+    Server-Sent Events stream of item, list, lock and membership changes
+    for every project the user can access.
+    """
+    user_internal_id, project_ids = identity
+    subscription = event_hub.subscribe(user_internal_id, project_ids)
+    return StreamingResponse(
+        _event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/lists/{list_id}/sync", response_model=ResponseModel[ListInDB])
 def sync_list(
-    list_id: int, 
+    list_id: int,
     user_internal_id: int = Depends(get_current_user_id),
     list_service: ListService = Depends(get_list_service)
 ):
@@ -32,4 +90,4 @@ def sync_list(
         success=True,
         message="List synchronized successfully",
         data=updated_list
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,117 @@
+import asyncio
+import itertools
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.exceptions import BaseAPIException
+from app.services.collaboration_service import PRESENCE_SCOPE, CollaborationService
+from app.services.event_hub import event_hub, Subscription
+from app.services.pubsub import RESYNC_EVENT
+from app.utils.logger import logger
+
+router = APIRouter()
+
+_connection_ids = itertools.count(1)
+
+
+async def _forward_events(websocket: WebSocket, subscription: Subscription, collaboration: CollaborationService) -> None:
+    """Relay hub events that concern this list to the socket"""
+    while True:
+        event = await subscription.get(timeout=settings.SSE_KEEPALIVE_SECONDS)
+        if event is None:
+            continue
+        if event["type"] == "membership.removed" and event["data"]["user_internal_id"] == collaboration.user_internal_id:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Access to the project was removed")
+            return
+        if event["type"] == RESYNC_EVENT or event["data"].get("list_id") == collaboration.list_id:
+            await websocket.send_json(event)
+
+
+async def _handle_message(websocket: WebSocket, collaboration: CollaborationService, text: str) -> None:
+    try:
+        message = json.loads(text)
+    except ValueError:
+        await websocket.send_json({"type": "error", "message": "Message is not valid JSON"})
+        return
+    if not isinstance(message, dict):
+        await websocket.send_json({"type": "error", "message": "Message must be a JSON object"})
+        return
+    message_type = message.get("type")
+    try:
+        if message_type == "lock":
+            await run_in_threadpool(collaboration.acquire_lock)
+            await websocket.send_json({"type": "lock.ok"})
+        elif message_type == "heartbeat":
+            held = await run_in_threadpool(collaboration.heartbeat)
+            await websocket.send_json({"type": "heartbeat.ack", "lock_held": held})
+        elif message_type == "unlock":
+            await run_in_threadpool(collaboration.release_lock)
+            await websocket.send_json({"type": "unlock.ok"})
+        else:
+            await websocket.send_json({"type": "error", "message": f"Unknown message type: {message_type}"})
+    except BaseAPIException as e:
+        await websocket.send_json({"type": "error", "message": e.detail, "status_code": e.status_code})
+
+
+@router.websocket("/lists/{list_id}")
+async def list_collaboration(
+    websocket: WebSocket,
+    list_id: int,
+    user_external_id: Optional[str] = Header(None, alias="X-User-ID"),
+    user_id: Optional[str] = Query(None, description="X-User-ID for clients that cannot set handshake headers"),
+):
+    """
+    Collaboration channel for one list.
+
+    Pushes item, list, lock and presence events for the list. Clients send
+    {"type": "lock"}, {"type": "heartbeat"} and {"type": "unlock"}; a lock taken
+    over the socket is released when heartbeats stop or the socket closes.
+    """
+    external_id = user_external_id or user_id
+    if not external_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User ID header required")
+        return
+
+    identity = await run_in_threadpool(CollaborationService.authorize, list_id, external_id)
+    if not identity:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="List not found or you don't have access")
+        return
+    user_internal_id, project_id = identity
+
+    await websocket.accept()
+    collaboration = CollaborationService(list_id, user_internal_id, project_id, next(_connection_ids))
+    subscription = event_hub.subscribe(user_internal_id, {project_id})
+    forwarder = asyncio.create_task(_forward_events(websocket, subscription, collaboration))
+    try:
+        users = collaboration.join()
+        await websocket.send_json({
+            "type": "presence.snapshot",
+            "data": {"list_id": list_id, "users": users, "scope": PRESENCE_SCOPE},
+        })
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=settings.LOCK_HEARTBEAT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                if collaboration.holds_lock:
+                    logger.info(f"Heartbeat timeout: releasing lock on list {list_id} held by user {user_internal_id}")
+                    await run_in_threadpool(collaboration.release_lock)
+                    await websocket.send_json({"type": "lock.expired"})
+                continue
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+            if message.get("text") is None:
+                await websocket.send_json({"type": "error", "message": "Binary frames are not supported; send JSON text"})
+                continue
+            await _handle_message(websocket, collaboration, message["text"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        forwarder.cancel()
+        event_hub.unsubscribe(subscription)
+        collaboration.leave()
+        # Shielded: the release must finish even when the handler is cancelled (server shutdown)
+        await asyncio.shield(run_in_threadpool(collaboration.release_lock))
@@ -8,6 +8,11 @@ from app.models.project_role_model import ProjectRole, ProjectRoleType
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def create_raw_connection():
+    """A DBAPI connection outside the pool, for long-lived LISTEN or advisory-lock sessions"""
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.dbapi.connect(*cargs, **cparams)
+
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -11,9 +11,13 @@ async def api_exception_handler(request: Request, exc: BaseAPIException):
     """
     logger.error(f"API Exception caught: {exc.__class__.__name__} - {exc.detail}",
                  extra={"status_code": exc.status_code, "detail": exc.detail})
+    content = {"message": exc.detail} # Changed 'detail' to 'message'
+    if getattr(exc, "data", None) is not None:
+        content["data"] = exc.data
     return JSONResponse(
         status_code=exc.status_code,
-        content={"message": exc.detail}, # Changed 'detail' to 'message'
+        content=content,
+        headers=getattr(exc, "headers", None),
     )
 
 async def generic_exception_handler(request: Request, exc: Exception):
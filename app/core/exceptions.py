@@ -1,5 +1,6 @@
 
 from fastapi import status
+from typing import Any, Optional
 
 class BaseAPIException(Exception):
     """Base class for all API exceptions."""
@@ -28,6 +29,21 @@ class ConflictException(BaseAPIException):
     def __init__(self, detail: str = "User is already in this list"):
         super().__init__(detail, status.HTTP_409_CONFLICT)
 
+class PreconditionFailedException(BaseAPIException):
+    """412 for a stale If-Match; carries the current row and its ETag"""
+    def __init__(self, detail: str = "Resource was modified by someone else", data: Optional[Any] = None,
+                 etag: Optional[str] = None):
+        super().__init__(detail, status.HTTP_412_PRECONDITION_FAILED)
+        self.data = data
+        self.headers = {"ETag": etag} if etag else None
+
+class MergeConflictException(BaseAPIException):
+    """409 when a merged edit touches fields someone else changed since the base version"""
+    def __init__(self, detail: str = "Conflicting changes", data: Optional[Any] = None, etag: Optional[str] = None):
+        super().__init__(detail, status.HTTP_409_CONFLICT)
+        self.data = data
+        self.headers = {"ETag": etag} if etag else None
+
 class BadRequestException(BaseAPIException):
     def __init__(self, detail: str = "Bad request"):
         super().__init__(detail, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -8,13 +8,24 @@ import json
 import time
 
 from app.api.endpoints import router as api_router
-from app.api.endpoints import project_endpoints, step_endpoints, role_endpoints # Import role_endpoints
+from app.api.endpoints import project_endpoints, step_endpoints, role_endpoints, ws_endpoints # Import role_endpoints
 from app.core.config import settings
 from app.utils.logger import logger
 from app.core.db import engine, get_db, initialize_database
 from app.models.base import Base
 from app.core.exceptions import BaseAPIException
 from app.core.error_handlers import api_exception_handler, generic_exception_handler
+from app.services.event_hub import event_hub
+from app.services.notification_service import prune_old_notifications
+from app.services.idempotency_service import prune_idempotency_keys
+from app.services.rollup_service import reconcile_rollups
+from app.services.simulation_service import simulation_pool
+from app.services.notification_coalescer import notification_coalescer
+from app.services.lock_service import sweep_expired_locks
+from app.services.lock_wait_queue import lock_wait_queue
+from app.services.lock_metrics import lock_metrics
+from app.utils.metrics import metrics
+from app.utils.periodic import PeriodicTask
 
 # Import all models explicitly to ensure they're registered
 from app.models.list_model import List
@@ -37,9 +48,40 @@ async def lifespan(app: FastAPI):
         initialize_database(db)
     finally:
         db.close()
+    await event_hub.start()
+    event_hub.add_listener(lock_wait_queue.on_event)
+    event_hub.add_listener(lock_metrics.on_event)
+    notification_pruner = PeriodicTask(
+        "notification-pruner", settings.NOTIFICATION_PRUNE_INTERVAL_SECONDS, prune_old_notifications
+    )
+    notification_pruner.start()
+    idempotency_pruner = PeriodicTask(
+        "idempotency-pruner", settings.IDEMPOTENCY_PRUNE_INTERVAL_SECONDS, prune_idempotency_keys
+    )
+    idempotency_pruner.start()
+    rollup_reconciler = PeriodicTask(
+        "rollup-reconciler", settings.ROLLUP_RECONCILE_INTERVAL_SECONDS, reconcile_rollups
+    )
+    rollup_reconciler.start()
+    digest_flusher = PeriodicTask(
+        "notification-digests", max(settings.NOTIFICATION_DIGEST_WINDOW_SECONDS / 2, 1.0), notification_coalescer.flush_expired
+    )
+    digest_flusher.start()
+    lock_sweeper = PeriodicTask("lock-sweeper", settings.LOCK_SWEEP_INTERVAL_SECONDS, sweep_expired_locks)
+    lock_sweeper.start()
     yield
     # Shutdown
     logger.info("Application is shutting down")
+    await lock_sweeper.stop()
+    await digest_flusher.stop()
+    notification_coalescer.flush()
+    await rollup_reconciler.stop()
+    simulation_pool.shutdown()
+    await idempotency_pruner.stop()
+    await notification_pruner.stop()
+    event_hub.remove_listener(lock_metrics.on_event)
+    event_hub.remove_listener(lock_wait_queue.on_event)
+    await event_hub.stop()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -68,6 +110,7 @@ app.include_router(api_router, prefix="/api")
 app.include_router(project_endpoints.router, prefix="/api/projects", tags=["projects"])
 app.include_router(step_endpoints.router, prefix="/api/steps", tags=["steps"])
 app.include_router(role_endpoints.router, prefix="/api", tags=["roles"]) # Include role_endpoints
+app.include_router(ws_endpoints.router, prefix="/ws", tags=["collaboration"])
 
 @app.get("/")
 def read_root():
@@ -77,6 +120,10 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return {"subscribers": event_hub.subscriber_count(), **metrics.snapshot()}
+
 
 if __name__ == "__main__":
     # logger.info("Starting the application")
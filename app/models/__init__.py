@@ -5,8 +5,13 @@ from .project_user_model import ProjectUser
 from .list_model import List
 from .item_model import Item
 from .lock_model import Lock
+from .lock_waiter_model import LockWaiter
 from .project_model import Project
 from .step_model import Step
+from .step_closure_model import StepClosure
+from .step_dependency_model import StepDependency
+from .notification_model import Notification, NotificationCursor
+from .idempotency_key_model import IdempotencyKey
 
 # Import models in dependency order
 
@@ -17,8 +22,14 @@ __all__ = [
     "ProjectRole",
     "ProjectUser",
     "Lock",
+    "LockWaiter",
     "List",
     "Item",
     "Project",
     "Step",
+    "StepClosure",
+    "StepDependency",
+    "Notification",
+    "NotificationCursor",
+    "IdempotencyKey",
 ]
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from .base import Base
+
+class IdempotencyKey(Base):
+    """
+    A client-supplied Idempotency-Key and the response it produced.
+    A row without response is a request still being executed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.internal_id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    # "POST /lists/5/items": a key is only valid for the endpoint it was first used on
+    scope = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=False), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=False), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
@@ -1,5 +1,6 @@
 
 from sqlalchemy import Column, String, Float, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -13,7 +14,7 @@ class Item(BaseModel):
     category = Column(String, nullable=True)
     quantity = Column(Integer, default=1)
     price = Column(Float, nullable=True)
-    list_id = Column(Integer, ForeignKey('lists.id'), nullable=False)
+    list_id = Column(Integer, ForeignKey('lists.id'), nullable=False, index=True)
     item_link = Column(String, nullable=True)
     item_photo_link = Column(String, nullable=True)
     delivery_price = Column(Float, nullable=True)
@@ -23,6 +24,10 @@ class Item(BaseModel):
     approved = Column(Integer, default=0)
     bought = Column(Integer, default=0)
     delivered = Column(Integer, default=0)
+    # Bumped by every update; compared against If-Match for optimistic concurrency
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Field name -> version that last changed it; lets concurrent edits of different fields merge
+    field_versions = Column(JSONB, nullable=False, default=dict, server_default="{}")
 
     # Relationships
     list = relationship("List", back_populates="items")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import BaseModel
@@ -12,8 +12,12 @@ class List(BaseModel):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     destination_address = Column(String, nullable=True)
-    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False, index=True)
     step_id = Column(Integer, ForeignKey('steps.id'), nullable=False, unique=True)
+    # Bumped by every update; compared against If-Match for optimistic concurrency
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Server-maintained sum of quantity x price + delivery over the items
+    items_total = Column(Float, nullable=False, default=0, server_default="0")
     
     items = relationship("Item", back_populates="list", cascade="all, delete-orphan")
     project = relationship("Project", back_populates="lists")
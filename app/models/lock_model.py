@@ -9,7 +9,11 @@ class Lock(BaseModel):
     id = Column(Integer, primary_key=True, index=True)
     list_id = Column(Integer, ForeignKey("lists.id"), nullable=False, unique=True)
     holder_id = Column(Integer, ForeignKey("users.internal_id"), nullable=False)
-    acquired_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    acquired_at = Column(DateTime(timezone=False), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=False), nullable=False, index=True)
     
     list = relationship("List", back_populates="lock")
     holder = relationship("User")
+
+    # Set by LockRepository on acquire: (holder_id, expires_at) of the expired lease this lock replaced
+    taken_over_from = None
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from .base import Base
+
+class LockWaiter(Base):
+    """A user queued for a list lock; the lowest id among unexpired waiters is next in line"""
+    __tablename__ = "lock_waiters"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    list_id = Column(Integer, ForeignKey("lists.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.internal_id"), nullable=False)
+    enqueued_at = Column(DateTime(timezone=False), nullable=False, server_default=func.now())
+    deadline = Column(DateTime(timezone=False), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("list_id", "user_id", name="uq_lock_waiters_list_id_user_id"),
+        Index("ix_lock_waiters_list_id_id", "list_id", "id"),
+    )
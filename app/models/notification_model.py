@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.internal_id"), nullable=False)
+    project_id = Column(Integer, nullable=False)
+    list_id = Column(Integer, nullable=True)
+    type = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    is_read = Column(Boolean, nullable=False, default=False, server_default="false")
+    created_at = Column(DateTime(timezone=False), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_created_at", "created_at"),
+    )
+
+class NotificationCursor(Base):
+    __tablename__ = "notification_cursors"
+
+    user_id = Column(Integer, ForeignKey("users.internal_id"), primary_key=True)
+    last_read_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
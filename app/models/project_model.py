@@ -9,12 +9,15 @@ class Project(BaseModel):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     place_description = Column(String)
+    # Totals and dates are server-maintained rollups over the project's steps
     planned_start_date = Column(DateTime(timezone=False))
     planned_end_date = Column(DateTime(timezone=False))
     actual_start_date = Column(DateTime(timezone=False))
     actual_end_date = Column(DateTime(timezone=False))
-    total_materials_price = Column(Float)
-    total_workers_price = Column(Float)
+    total_materials_price = Column(Float, default=0, server_default="0")
+    total_workers_price = Column(Float, default=0, server_default="0")
+    # Bumped whenever the rollups change; keys the cached step tree
+    rollup_generation = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=False), server_default=func.now())
     updated_at = Column(DateTime(timezone=False), onupdate=func.now())
 
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from .base import Base
+
+
+class StepClosure(Base):
+    """
+    One row per (ancestor, descendant) pair of the step tree, including each
+    step paired with itself at depth 0, so subtree and ancestor queries are a
+    single indexed lookup instead of a walk over parent_step_id.
+    """
+    __tablename__ = "step_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("steps.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("steps.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_step_closure_descendant_id", "descendant_id", "ancestor_id"),
+    )
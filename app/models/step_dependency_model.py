@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from .base import Base
+
+
+class StepDependency(Base):
+    """Finish-to-start link: the successor step cannot start before the predecessor finishes"""
+    __tablename__ = "step_dependencies"
+
+    predecessor_id = Column(Integer, ForeignKey("steps.id", ondelete="CASCADE"), primary_key=True)
+    successor_id = Column(Integer, ForeignKey("steps.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_step_dependencies_successor_id", "successor_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -15,6 +15,9 @@ class Step(Base):
     actual_end_date = Column(DateTime(timezone=False))
     materials_price = Column(Float)
     workers_price = Column(Float)
+    # Server-maintained: own prices, materials including the step list's items_total
+    total_materials_price = Column(Float, nullable=False, default=0, server_default="0")
+    total_workers_price = Column(Float, nullable=False, default=0, server_default="0")
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     parent_step_id = Column(Integer, ForeignKey("steps.id"))
     
@@ -26,4 +29,9 @@ class Step(Base):
     created_at = Column(DateTime(timezone=False), server_default=func.now())
     updated_at = Column(DateTime(timezone=False), onupdate=func.now())
 
+    __table_args__ = (
+        # Serves project-scoped listings filtered by parent, keyset-paginated on id
+        Index("ix_steps_project_id_parent_step_id_id", "project_id", "parent_step_id", "id"),
+    )
+
 Project.steps = relationship("Step", order_by=Step.id, back_populates="project")
@@ -0,0 +1,101 @@
+from typing import List as TypeList
+from sqlalchemy import Float, Numeric, case, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from app.models.item_model import Item
+from app.models.list_model import List
+from app.models.step_model import Step
+from app.repositories.rollup_repository import ITEM_COST
+
+# date_trunc units the cash-flow series can be bucketed by
+BUCKET_INTERVALS = {"day": "1 day", "week": "1 week", "month": "1 month"}
+
+
+class CashflowRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_cashflow(self, project_id: int, bucket: str) -> TypeList[Row]:
+        """
+        (bucket_start, materials, workers) per bucket with spending, in one
+        statement; bucket_start is None for spending on steps without a
+        planned start. Step materials fall on the planned start; item costs on
+        the date they must be ordered, delivery_period days before it.
+
+        Workers prices are spread evenly over each step's planned period with a
+        sweep: every period start adds its per-second rate, every end removes
+        it, and bucket boundaries (generate_series) are added as points, so a
+        running sum gives the project-wide rate on segments that each lie in
+        one bucket. That is two rows per step plus one per bucket, however long
+        the periods are. Rates are numeric so adding and removing one cancels exactly.
+        """
+        interval = literal_column(f"interval '{BUCKET_INTERVALS[bucket]}'")
+        start = Step.planned_start_date
+        end = func.greatest(func.coalesce(Step.planned_end_date, start), start)
+        periods = (
+            select(
+                start.label("start"),
+                end.label("end"),
+                (Step.workers_price.cast(Numeric) / func.extract("epoch", end - start)).label("rate"),
+            )
+            .where(Step.project_id == project_id, end > start, Step.workers_price != 0)
+            .cte("periods")
+        )
+        boundaries = func.generate_series(
+            select(func.date_trunc(bucket, func.min(periods.c.start))).scalar_subquery(),
+            select(func.max(periods.c.end)).scalar_subquery(),
+            interval,
+        )
+        points = union_all(
+            select(periods.c.start.label("at"), periods.c.rate.label("delta")),
+            select(periods.c.end, -periods.c.rate),
+            select(boundaries, literal(0).cast(Numeric)),
+        ).subquery()
+        segments = (
+            select(
+                points.c.at,
+                func.lead(points.c.at).over(order_by=points.c.at).label("next_at"),
+                func.sum(func.sum(points.c.delta)).over(order_by=points.c.at).label("rate"),
+            )
+            .group_by(points.c.at)
+            .subquery()
+        )
+        spread_workers = select(
+            func.date_trunc(bucket, segments.c.at).label("bucket_start"),
+            literal(0.0).label("materials"),
+            (segments.c.rate * func.extract("epoch", segments.c.next_at - segments.c.at)).cast(Float).label("workers"),
+        ).where(segments.c.rate != 0, segments.c.next_at.is_not(None))
+        # Materials on the planned start; workers too when there is no period to spread them over
+        step_materials = select(
+            func.date_trunc(bucket, start),
+            func.coalesce(Step.materials_price, 0),
+            case((or_(start.is_(None), end == start), func.coalesce(Step.workers_price, 0)), else_=0.0),
+        ).where(Step.project_id == project_id)
+        project_lists = select(List.id).where(List.project_id == project_id)
+        # Items summed per list and delivery period first, so the step join and date math run once per group
+        item_groups = (
+            select(Item.list_id, Item.delivery_period, func.sum(ITEM_COST).label("cost"))
+            .where(Item.list_id.in_(project_lists))
+            .group_by(Item.list_id, Item.delivery_period)
+            .subquery()
+        )
+        item_costs = (
+            select(
+                func.date_trunc(bucket, start - func.make_interval(0, 0, 0, func.coalesce(item_groups.c.delivery_period, 0))),
+                item_groups.c.cost,
+                literal(0.0),
+            )
+            .join(List, List.id == item_groups.c.list_id)
+            .join(Step, Step.id == List.step_id)
+        )
+        spending = union_all(spread_workers, step_materials, item_costs).subquery()
+        return self.db.execute(
+            select(
+                spending.c.bucket_start,
+                func.sum(spending.c.materials).cast(Float).label("materials"),
+                func.sum(spending.c.workers).cast(Float).label("workers"),
+            )
+            .group_by(spending.c.bucket_start)
+            .order_by(spending.c.bucket_start.nulls_last())
+        ).all()
+
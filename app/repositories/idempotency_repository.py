@@ -0,0 +1,69 @@
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.idempotency_key_model import IdempotencyKey
+
+
+class IdempotencyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim(self, user_internal_id: int, key: str, scope: str, request_hash: str, ttl: timedelta,
+              stale_after: timedelta) -> bool:
+        """
+        Insert the key, or take over an expired one or one still without a
+        response after stale_after. Returns False when a live row already
+        exists; the unique constraint settles races.
+        """
+        statement = pg_insert(IdempotencyKey).values(
+            user_id=user_internal_id, key=key, scope=scope, request_hash=request_hash, expires_at=func.now() + ttl
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_idempotency_keys_user_id_key",
+            set_={
+                "scope": statement.excluded.scope,
+                "request_hash": statement.excluded.request_hash,
+                "status_code": None,
+                "response": None,
+                "created_at": func.now(),
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=or_(
+                IdempotencyKey.expires_at < func.now(),
+                and_(IdempotencyKey.response.is_(None), IdempotencyKey.created_at < func.now() - stale_after),
+            ),
+        ).returning(IdempotencyKey.id)
+        claimed = self.db.execute(statement).first() is not None
+        self.db.commit()
+        return claimed
+
+    def get(self, user_internal_id: int, key: str) -> Optional[IdempotencyKey]:
+        return self.db.scalars(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_internal_id, IdempotencyKey.key == key)
+        ).first()
+
+    def complete(self, user_internal_id: int, key: str, status_code: int, response: Dict[str, Any]) -> None:
+        self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_internal_id, IdempotencyKey.key == key)
+            .values(status_code=status_code, response=response)
+        )
+        self.db.commit()
+
+    def release(self, user_internal_id: int, key: str) -> None:
+        """Forget a key whose request failed, so a retry executes again"""
+        self.db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_internal_id, IdempotencyKey.key == key, IdempotencyKey.response.is_(None)
+            )
+        )
+        self.db.commit()
+
+    def delete_expired(self) -> int:
+        result = self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now()))
+        self.db.commit()
+        return result.rowcount
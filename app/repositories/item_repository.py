@@ -1,16 +1,23 @@
+from itertools import chain
+from sqlalchemy import Integer, delete, func, literal, or_, select, update
 from sqlalchemy.orm import Session
 from app.models.item_model import Item
+from app.models.list_model import List
 from typing import List as TypeList, Optional
 from .base_repository import BaseRepository
+from .rollup_repository import ITEM_COST, RollupRepository, item_cost
 from app.utils.logger import logger
 
 class ItemRepository(BaseRepository[Item]):
     def __init__(self, db: Session):
         super().__init__(Item, db)
+        self.rollups = RollupRepository(db)
 
     def create(self, list_id: int, item_data: dict) -> Item:
         db_item = Item(list_id=list_id, **item_data)
         self.db.add(db_item)
+        self.db.flush()
+        self.rollups.add_item_cost(list_id, item_cost(db_item.quantity, db_item.price, db_item.delivery_price))
         self.db.commit()
         self.db.refresh(db_item)
         logger.info(f"Created item: {db_item.__dict__}")
@@ -25,19 +32,74 @@ class ItemRepository(BaseRepository[Item]):
     def get_all_by_list(self, list_id: int) -> TypeList[Item]:
         return self.db.query(Item).filter(Item.list_id == list_id).all()
 
-    def update(self, item_id: int, item_data: dict) -> Optional[Item]:
-        db_item = self.db.query(Item).filter(Item.id == item_id).first()
-        if db_item:
-            for key, value in item_data.items():
-                setattr(db_item, key, value)
+    def update(self, item_id: int, item_data: dict, expected_version: Optional[int] = None,
+               base_version: Optional[int] = None) -> Optional[Item]:
+        """
+        A single UPDATE ... RETURNING that bumps the version and stamps the
+        changed fields with it. Returns None if the item is gone, or:
+        - expected_version: the item is no longer at that version;
+        - base_version: another edit since base_version set one of the same
+          fields to a different value (edits of other fields merge).
+        The conditions are re-checked on the locked row, so concurrent
+        edits cannot slip past each other. The cost change is rolled up in
+        the same transaction, using the pre-update cost read under that lock.
+        The parent list is locked first, before the item row.
+        """
+        conditions = [Item.id == item_id]
+        if expected_version is not None:
+            conditions.append(Item.version == expected_version)
+        if base_version is not None:
+            conditions.extend(
+                or_(self._field_version(field) <= base_version, getattr(Item, field).is_not_distinct_from(value))
+                for field, value in item_data.items()
+            )
+        stamped = func.jsonb_build_object(*chain.from_iterable((literal(field), Item.version + 1) for field in item_data))
+        self._lock_list(select(Item.list_id).where(Item.id == item_id).scalar_subquery())
+        previous = select(Item.id, ITEM_COST.label("cost")).where(Item.id == item_id).with_for_update().cte("previous")
+        row = self.db.execute(
+            update(Item)
+            .where(Item.id == previous.c.id, *conditions)
+            .values(**item_data, version=Item.version + 1, field_versions=Item.field_versions.op("||")(stamped))
+            .returning(Item, previous.c.cost),
+            execution_options={"populate_existing": True},
+        ).first()
+        if row is None:
             self.db.commit()
-            self.db.refresh(db_item)
+            return None
+        db_item, previous_cost = row
+        self.rollups.add_item_cost(
+            db_item.list_id, item_cost(db_item.quantity, db_item.price, db_item.delivery_price) - previous_cost
+        )
+        if "delivery_period" in item_data:
+            # Moves the item's cost in the cash-flow forecast without changing any total
+            self.rollups.bump_list_generation(db_item.list_id)
+        self.db.commit()
         return db_item
 
+    @staticmethod
+    def _field_version(field: str):
+        return func.coalesce(Item.field_versions[field].astext.cast(Integer), 0)
+
+    @staticmethod
+    def conflicting_fields(item: Item, item_data: dict, base_version: int) -> TypeList[str]:
+        """Fields of item_data that changed to a different value after base_version"""
+        return [
+            field for field, value in item_data.items()
+            if (item.field_versions or {}).get(field, 0) > base_version and getattr(item, field) != value
+        ]
+
     def delete(self, list_id: int, item_id: int) -> bool:
-        db_item = self.get_by_id(list_id, item_id)
-        if db_item:
-            self.db.delete(db_item)
+        self._lock_list(list_id)
+        cost = self.db.scalar(
+            delete(Item).where(Item.list_id == list_id, Item.id == item_id).returning(ITEM_COST)
+        )
+        if cost is None:
             self.db.commit()
-            return True
-        return False
\ No newline at end of file
+            return False
+        self.rollups.add_item_cost(list_id, -cost)
+        self.db.commit()
+        return True
+
+    def _lock_list(self, list_id) -> None:
+        """Take the parent list row before any item row, the order ListRepository.delete locks in"""
+        self.db.execute(select(List.id).where(List.id == list_id).with_for_update())
\ No newline at end of file
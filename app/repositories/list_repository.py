@@ -1,13 +1,20 @@
 
 from typing import List as TypeList, Optional, Dict, Any
+from app.models.item_model import Item
 from app.models.list_model import List
+from app.models.lock_model import Lock
 from app.models.project_user_model import ProjectUser
+from app.models.step_closure_model import StepClosure
 from .base_repository import BaseRepository
+from .rollup_repository import ITEM_COST, RollupRepository
+from sqlalchemy import Integer, and_, exists, func, literal, literal_column, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 class ListRepository(BaseRepository[List]):
     def __init__(self, db: Session):
         super().__init__(List, db)
+        self.rollups = RollupRepository(db)
 
     def get_by_id(self, list_id: int) -> Optional[List]:
         return self.db.query(List).filter(List.id == list_id).first()
@@ -18,18 +25,99 @@ class ListRepository(BaseRepository[List]):
             ProjectUser.user_id == user_internal_id
         ).first()
 
+    def get_for_write(self, list_id: int, user_internal_id: int) -> Optional[Row]:
+        """
+        (list, is_member, lock_holder_id): the list, whether the user belongs to
+        its project and who holds its unexpired lock (None when unlocked). The
+        list row is locked FOR UPDATE first and stays locked until the write
+        commits; granting a list lock takes the same row (LockRepository.lock_lists),
+        so no lock can be granted between this check and the write. The lock is
+        read in a second statement, whose snapshot sees a grant that was waited for.
+        """
+        self.db.execute(select(List.id).where(List.id == list_id).with_for_update())
+        is_member = exists().where(ProjectUser.project_id == List.project_id, ProjectUser.user_id == user_internal_id)
+        return self.db.execute(
+            select(List, is_member.label("is_member"), Lock.holder_id)
+            .outerjoin(Lock, and_(Lock.list_id == List.id, Lock.expires_at >= func.now()))
+            .where(List.id == list_id)
+        ).first()
+
     def get_all_for_project(self, project_id: int) -> TypeList[List]:
         return self.db.query(List).filter(List.project_id == project_id).all()
 
-    def update(self, list_id: int, list_update: Dict[str, Any]) -> Optional[List]:
-        db_list = self.get_by_id(list_id)
-        if not db_list:
-            return None
-        
-        for key, value in list_update.items():
-            if hasattr(db_list, key):
-                setattr(db_list, key, value)
-        
+    def get_by_ids(self, list_ids: TypeList[int]) -> TypeList[List]:
+        return self.db.query(List).filter(List.id.in_(list_ids)).order_by(List.id).all()
+
+    def get_all_in_step_subtree(self, step_id: int) -> TypeList[List]:
+        """Lists of a step and all of its sub-steps, at any depth, via step_closure"""
+        subtree = select(StepClosure.descendant_id).where(StepClosure.ancestor_id == step_id)
+        return self.db.query(List).filter(List.step_id.in_(subtree)).order_by(List.id).all()
+
+    def get_summary(self, list_id: int) -> Row:
+        """
+        Count, total cost, max delivery period and per-category / per-status
+        counts in one statement: items are grouped by category (via
+        ix_items_list_id) and the groups folded into the list totals.
+        """
+        per_category = (
+            select(
+                Item.category,
+                func.count().label("item_count"),
+                func.sum(ITEM_COST).label("total_cost"),
+                func.max(Item.delivery_period).label("max_delivery_period"),
+                func.count().filter(Item.approved > 0).label("approved"),
+                func.count().filter(Item.bought > 0).label("bought"),
+                func.count().filter(Item.delivered > 0).label("delivered"),
+            )
+            .where(Item.list_id == list_id)
+            .group_by(Item.category)
+            .subquery()
+        )
+        return self.db.execute(
+            select(
+                _sum_counts(per_category.c.item_count).label("item_count"),
+                func.coalesce(func.sum(per_category.c.total_cost), 0).label("total_cost"),
+                func.max(per_category.c.max_delivery_period).label("max_delivery_period"),
+                func.coalesce(
+                    func.jsonb_object_agg(
+                        func.coalesce(per_category.c.category, literal("uncategorized")), per_category.c.item_count
+                    ),
+                    literal_column("'{}'::jsonb"),
+                ).label("by_category"),
+                func.jsonb_build_object(
+                    "approved", _sum_counts(per_category.c.approved),
+                    "bought", _sum_counts(per_category.c.bought),
+                    "delivered", _sum_counts(per_category.c.delivered),
+                ).label("by_status"),
+            )
+        ).one()
+
+    def update(self, list_id: int, list_update: Dict[str, Any], expected_version: Optional[int] = None) -> Optional[List]:
+        """
+        UPDATE ... WHERE id AND version in one statement, bumping the version.
+        Returns None if the list is gone or no longer at expected_version.
+        """
+        values = {key: value for key, value in list_update.items() if hasattr(List, key)}
+        conditions = [List.id == list_id]
+        if expected_version is not None:
+            conditions.append(List.version == expected_version)
+        db_list = self.db.scalars(
+            update(List).where(*conditions).values(**values, version=List.version + 1).returning(List),
+            execution_options={"populate_existing": True},
+        ).first()
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
+
+    def delete(self, id: int) -> Optional[List]:
+        """Delete the list with its items and take its items_total off the step and project"""
+        db_list = self.db.query(List).filter(List.id == id).with_for_update().populate_existing().first()
+        if db_list:
+            self.db.delete(db_list)
+            self.db.flush()
+            self.rollups.add_step_amounts(db_list.step_id, -db_list.items_total, 0)
+            self.db.commit()
+        return db_list
+
+
+def _sum_counts(column):
+    return func.coalesce(func.sum(column), 0).cast(Integer)
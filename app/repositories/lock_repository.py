@@ -1,35 +1,233 @@
 from .base_repository import BaseRepository
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from sqlalchemy import delete, exists, func, literal, literal_column, or_, select, update, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+from datetime import timedelta
+from typing import List as TypeList, Optional, Tuple
+from app.models.list_model import List
 from app.models.lock_model import Lock
+from app.models.lock_waiter_model import LockWaiter
 
 class LockRepository(BaseRepository[Lock]):
     def __init__(self, db: Session):
         super().__init__(Lock, db)
-    
+
     def get_lock_by_list_id(self, list_id: int) -> Optional[Lock]:
-        return self.db.query(Lock).filter(Lock.list_id == list_id).first()
-
-    def acquire_lock(self, list_id: int, holder_internal_id: int) -> Optional[Lock]:
-        try:
-            lock = Lock(list_id=list_id, holder_id=holder_internal_id)
-            self.db.add(lock)
-            self.db.commit()
-            self.db.refresh(lock)
-            return lock
-        except IntegrityError:
+        """The unexpired lock on a list, if any"""
+        return self.db.query(Lock).filter(Lock.list_id == list_id, Lock.expires_at >= func.now()).first()
+
+    def lock_lists(self, list_ids: TypeList[int]) -> None:
+        """
+        Take the list rows FOR UPDATE in list_id order before granting a lock.
+        Item writes hold their list row from the lock check to commit, so this
+        waits for writes already past the check and later writes see the lock.
+        """
+        self.db.execute(select(List.id).where(List.id.in_(list_ids)).order_by(List.id).with_for_update())
+
+    def _upsert_lock(self, list_id: int, holder_internal_id: int, ttl: timedelta, source=None):
+        """INSERT ... ON CONFLICT (list_id) DO UPDATE that only takes over expired or own locks"""
+        if source is None:
+            source = select(literal(list_id), literal(holder_internal_id), func.now(), func.now() + ttl,
+                            func.now(), func.now())
+        locks = self._run_upsert(source)
+        return locks[0] if locks else None
+
+    def _run_upsert(self, source) -> TypeList[Lock]:
+        """
+        Run the upsert. Each lock that replaced another user's expired, unswept
+        lease gets taken_over_from = (holder_id, expires_at) of that lease.
+        """
+        rows = self.db.execute(self._upsert_statement(source), execution_options={"populate_existing": True}).all()
+        for lock, previous_holder_id, previous_expires_at in rows:
+            lock.taken_over_from = (previous_holder_id, previous_expires_at) if previous_holder_id is not None else None
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _upsert_statement(source):
+        columns = ["list_id", "holder_id", "acquired_at", "expires_at", "created_at", "updated_at"]
+        statement = pg_insert(Lock).from_select(columns, source)
+        # Subqueries in RETURNING read the rows as they were before the upsert;
+        # the new row is referenced by name since SQLAlchemy won't correlate into RETURNING
+        previous = aliased(Lock, name="previous")
+        taken_over = [
+            select(column).where(
+                previous.list_id == literal_column("locks.list_id"),
+                previous.holder_id != literal_column("locks.holder_id"),
+                previous.expires_at < func.now(),
+            ).scalar_subquery()
+            for column in (previous.holder_id, previous.expires_at)
+        ]
+        return statement.on_conflict_do_update(
+            index_elements=[Lock.list_id],
+            set_={
+                "holder_id": statement.excluded.holder_id,
+                "acquired_at": case(
+                    (Lock.holder_id == statement.excluded.holder_id, Lock.acquired_at),
+                    else_=statement.excluded.acquired_at,
+                ),
+                "expires_at": statement.excluded.expires_at,
+                "updated_at": statement.excluded.updated_at,
+            },
+            where=or_(Lock.expires_at < func.now(), Lock.holder_id == statement.excluded.holder_id),
+        ).returning(Lock, *taken_over)
+
+    def acquire_lock(self, list_id: int, holder_internal_id: int, ttl: timedelta) -> Optional[Lock]:
+        """
+        Take the lock, or take over an expired one, in a single upsert.
+        Acquiring a lock you already hold extends its lease. Fails while other
+        users are queued ahead of the caller, so waiters are served in FIFO order.
+        """
+        self.lock_lists([list_id])
+        source = select(
+            literal(list_id), literal(holder_internal_id), func.now(), func.now() + ttl, func.now(), func.now()
+        ).where(~self._waiters_ahead(list_id, holder_internal_id))
+        lock = self._upsert_lock(list_id, holder_internal_id, ttl, source)
+        if lock:
+            self.db.execute(delete(LockWaiter).where(
+                LockWaiter.list_id == list_id, LockWaiter.user_id == holder_internal_id
+            ))
+        self.db.commit()
+        return lock
+
+    def acquire_many(self, list_ids: TypeList[int], holder_internal_id: int, ttl: timedelta) -> Optional[TypeList[Lock]]:
+        """
+        All-or-nothing: lock every list in one upsert, taking the rows in list_id
+        order so concurrent bulk requests cannot deadlock. Returns None and rolls
+        back if any list is held by someone else or has users queued ahead.
+        """
+        list_ids = sorted(set(list_ids))
+        self.lock_lists(list_ids)
+        source = select(
+            List.id, literal(holder_internal_id), func.now(), func.now() + ttl, func.now(), func.now()
+        ).where(List.id.in_(list_ids), ~self._waiters_ahead(List.id, holder_internal_id)).order_by(List.id)
+        locks = self._run_upsert(source)
+        if len(locks) != len(list_ids):
             self.db.rollback()
             return None
+        self.db.execute(delete(LockWaiter).where(
+            LockWaiter.list_id.in_(list_ids), LockWaiter.user_id == holder_internal_id
+        ))
+        self.db.commit()
+        return sorted(locks, key=lambda lock: lock.list_id)
 
-    def release_lock(self, list_id: int, holder_internal_id: int) -> bool:
-        lock = self.db.query(Lock).filter(
-            Lock.list_id == list_id,
-            Lock.holder_id == holder_internal_id
+    def release_many(self, list_ids: TypeList[int], holder_internal_id: int) -> TypeList[int]:
+        """Release the user's locks among the lists in one statement; returns the released list ids"""
+        released = self.db.scalars(
+            delete(Lock)
+            .where(Lock.list_id.in_(list_ids), Lock.holder_id == holder_internal_id)
+            .returning(Lock.list_id)
+        ).all()
+        self.db.commit()
+        return sorted(released)
+
+    @staticmethod
+    def _waiters_ahead(list_id, user_internal_id: int):
+        own_waiter_id = select(LockWaiter.id).where(
+            LockWaiter.list_id == list_id, LockWaiter.user_id == user_internal_id
+        ).scalar_subquery()
+        return exists().where(
+            LockWaiter.list_id == list_id,
+            LockWaiter.user_id != user_internal_id,
+            LockWaiter.deadline > func.now(),
+            LockWaiter.id < func.coalesce(own_waiter_id, 2147483647),
+        )
+
+    def has_waiters_ahead(self, list_id: int, user_internal_id: int) -> bool:
+        """Whether other users are queued for the list before this one"""
+        return self.db.scalar(select(self._waiters_ahead(list_id, user_internal_id)))
+
+    def hand_over(self, list_id: int, ttl: timedelta) -> Optional[Lock]:
+        """Give a free (or expired) lock to the first unexpired waiter and remove them from the queue"""
+        self.lock_lists([list_id])
+        head = self.db.scalars(
+            select(LockWaiter)
+            .where(LockWaiter.list_id == list_id, LockWaiter.deadline > func.now())
+            .order_by(LockWaiter.id)
+            .limit(1)
+            .with_for_update()
         ).first()
+        lock = self._upsert_lock(list_id, head.user_id, ttl) if head is not None else None
+        if lock is not None:
+            self.db.delete(head)
+        self.db.commit()
+        return lock
 
-        if lock:
-            self.db.delete(lock)
-            self.db.commit()
-            return True
-        return False
+    def enqueue(self, list_id: int, user_internal_id: int, wait: timedelta) -> None:
+        """Join the wait queue; waiting again keeps the original place and extends the deadline"""
+        statement = pg_insert(LockWaiter).values(list_id=list_id, user_id=user_internal_id, deadline=func.now() + wait)
+        statement = statement.on_conflict_do_update(
+            constraint="uq_lock_waiters_list_id_user_id",
+            set_={"deadline": statement.excluded.deadline},
+        )
+        self.db.execute(statement)
+        self.db.commit()
+
+    def queue_position(self, list_id: int, user_internal_id: int) -> int:
+        """1-based place among unexpired waiters, or 0 when the user is not queued"""
+        own_waiter_id = select(LockWaiter.id).where(
+            LockWaiter.list_id == list_id, LockWaiter.user_id == user_internal_id
+        ).scalar_subquery()
+        return self.db.scalar(
+            select(func.count()).select_from(LockWaiter).where(
+                LockWaiter.list_id == list_id,
+                or_(LockWaiter.deadline > func.now(), LockWaiter.id == own_waiter_id),
+                LockWaiter.id <= own_waiter_id,
+            )
+        )
+
+    def dequeue(self, list_id: int, user_internal_id: int) -> int:
+        """Leave the queue; returns the position held before leaving (0 if not queued)"""
+        position = self.queue_position(list_id, user_internal_id)
+        self.db.execute(delete(LockWaiter).where(
+            LockWaiter.list_id == list_id, LockWaiter.user_id == user_internal_id
+        ))
+        self.db.commit()
+        return position
+
+    def get_waiters(self, list_id: int) -> TypeList[LockWaiter]:
+        return self.db.scalars(
+            select(LockWaiter)
+            .where(LockWaiter.list_id == list_id, LockWaiter.deadline > func.now())
+            .order_by(LockWaiter.id)
+        ).all()
+
+    def delete_expired_waiters(self) -> int:
+        result = self.db.execute(delete(LockWaiter).where(LockWaiter.deadline <= func.now()))
+        self.db.commit()
+        return result.rowcount
+
+    def renew_lock(self, list_id: int, holder_internal_id: int, ttl: timedelta) -> Optional[Lock]:
+        """Extend an unexpired lease held by the user"""
+        lock = self.db.scalars(
+            update(Lock)
+            .where(Lock.list_id == list_id, Lock.holder_id == holder_internal_id, Lock.expires_at >= func.now())
+            .values(expires_at=func.now() + ttl, updated_at=func.now())
+            .returning(Lock),
+            execution_options={"populate_existing": True},
+        ).first()
+        self.db.commit()
+        return lock
+
+    def get_for_project(self, project_id: int) -> TypeList[Lock]:
+        """Unexpired locks on all lists of a project, via lists.project_id"""
+        return self.db.scalars(
+            select(Lock)
+            .join(List, List.id == Lock.list_id)
+            .where(List.project_id == project_id, Lock.expires_at >= func.now())
+            .order_by(Lock.list_id)
+        ).all()
+
+    def release_lock(self, list_id: int, holder_internal_id: int) -> bool:
+        result = self.db.execute(
+            delete(Lock).where(Lock.list_id == list_id, Lock.holder_id == holder_internal_id)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def delete_expired(self) -> TypeList[Tuple[int, int]]:
+        """Remove stale leases; returns (list_id, holder_id) for each"""
+        rows = self.db.execute(
+            delete(Lock).where(Lock.expires_at < func.now()).returning(Lock.list_id, Lock.holder_id)
+        ).all()
+        self.db.commit()
+        return [tuple(row) for row in rows]
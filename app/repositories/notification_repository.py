@@ -0,0 +1,113 @@
+from datetime import timedelta
+from typing import List as TypeList, Optional, Tuple, TYPE_CHECKING
+from sqlalchemy import Integer, String, column, insert, select, update, delete, func, literal, or_, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.notification_model import Notification, NotificationCursor
+from app.models.project_user_model import ProjectUser
+
+if TYPE_CHECKING:
+    from app.services.notification_coalescer import PendingDigest
+
+class NotificationRepository:
+    """Never commits: callers write notifications inside their own transaction or a savepoint of it"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_member_project_ids(self, user_internal_id: int) -> TypeList[int]:
+        return self.db.scalars(select(ProjectUser.project_id).where(ProjectUser.user_id == user_internal_id)).all()
+
+    def create_for_project_members(
+        self,
+        project_id: int,
+        exclude_user_id: Optional[int],
+        notification_type: str,
+        message: str,
+        list_id: Optional[int] = None,
+    ) -> int:
+        """Insert one notification per project member in a single INSERT ... SELECT"""
+        members = select(
+            ProjectUser.user_id,
+            literal(project_id),
+            literal(list_id),
+            literal(notification_type),
+            literal(message),
+        ).where(ProjectUser.project_id == project_id)
+        if exclude_user_id is not None:
+            members = members.where(ProjectUser.user_id != exclude_user_id)
+
+        result = self.db.execute(
+            insert(Notification).from_select(
+                ["user_id", "project_id", "list_id", "type", "message"], members
+            )
+        )
+        return result.rowcount
+
+    def create_digests(self, digests: TypeList["PendingDigest"]) -> int:
+        """Fan several digests out to their projects' members (minus each actor) in one statement"""
+        rows = values(
+            column("project_id", Integer),
+            column("list_id", Integer),
+            column("actor_id", Integer),
+            column("type", String),
+            column("message", String),
+            name="digests",
+        ).data([(d.project_id, d.list_id, d.user_id, d.notification_type, d.message) for d in digests])
+        recipients = select(
+            ProjectUser.user_id, rows.c.project_id, rows.c.list_id, rows.c.type, rows.c.message
+        ).join(rows, ProjectUser.project_id == rows.c.project_id).where(ProjectUser.user_id != rows.c.actor_id)
+
+        result = self.db.execute(
+            insert(Notification).from_select(
+                ["user_id", "project_id", "list_id", "type", "message"], recipients
+            )
+        )
+        return result.rowcount
+
+    def create_for_user(self, user_id: int, project_id: int, notification_type: str, message: str) -> None:
+        self.db.add(Notification(user_id=user_id, project_id=project_id, type=notification_type, message=message))
+
+    def get_page_for_user(
+        self, user_id: int, before_id: Optional[int], limit: int
+    ) -> TypeList[Tuple[Notification, bool]]:
+        """Newest first, keyset-paginated on (user_id, id); each row comes with its read state"""
+        cursor = select(NotificationCursor.last_read_id).where(
+            NotificationCursor.user_id == user_id
+        ).scalar_subquery()
+        is_read = or_(Notification.is_read, Notification.id <= func.coalesce(cursor, 0))
+
+        query = select(Notification, is_read.label("read")).where(Notification.user_id == user_id)
+        if before_id is not None:
+            query = query.where(Notification.id < before_id)
+        rows = self.db.execute(query.order_by(Notification.id.desc()).limit(limit)).all()
+        return [(row.Notification, row.read) for row in rows]
+
+    def mark_read(self, notification_id: int, user_id: int) -> bool:
+        result = self.db.execute(
+            update(Notification)
+            .where(Notification.id == notification_id, Notification.user_id == user_id)
+            .values(is_read=True)
+        )
+        return result.rowcount > 0
+
+    def mark_all_read(self, user_id: int, up_to_id: Optional[int] = None) -> int:
+        """Move the user's read cursor forward in one upsert; returns the new cursor"""
+        if up_to_id is None:
+            up_to_id = select(func.coalesce(func.max(Notification.id), 0)).where(
+                Notification.user_id == user_id
+            ).scalar_subquery()
+        statement = pg_insert(NotificationCursor).values(user_id=user_id, last_read_id=up_to_id)
+        statement = statement.on_conflict_do_update(
+            index_elements=[NotificationCursor.user_id],
+            set_={
+                "last_read_id": func.greatest(NotificationCursor.last_read_id, statement.excluded.last_read_id),
+                "updated_at": func.now(),
+            },
+        ).returning(NotificationCursor.last_read_id)
+        last_read_id = self.db.execute(statement).scalar_one()
+        return last_read_id
+
+    def delete_older_than(self, age: timedelta) -> int:
+        result = self.db.execute(delete(Notification).where(Notification.created_at < func.now() - age))
+        return result.rowcount
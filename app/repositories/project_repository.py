@@ -15,6 +15,10 @@ class ProjectRepository(BaseRepository[Project]):
     def get_all_for_user(self, user_internal_id: int) -> TypeList[Project]: # Changed type to int
         return self.db.query(Project).options(joinedload(Project.project_users).joinedload(ProjectUser.user)).join(ProjectUser).filter(ProjectUser.user_id == user_internal_id).all()
 
+    def get_project_ids_for_user(self, user_internal_id: int) -> TypeList[int]:
+        rows = self.db.query(ProjectUser.project_id).filter(ProjectUser.user_id == user_internal_id).all()
+        return [row.project_id for row in rows]
+
     def get_by_id_for_user(self, project_id: int, user_internal_id: int) -> Optional[Project]: # Changed type to int
         return self.db.query(Project).options(joinedload(Project.project_users).joinedload(ProjectUser.user)).join(ProjectUser).filter(
             Project.id == project_id,
@@ -0,0 +1,214 @@
+from typing import List as TypeList, Set
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+from app.models.item_model import Item
+from app.models.list_model import List
+from app.models.project_model import Project
+from app.models.step_model import Step
+
+# What an item adds to its list's total
+ITEM_COST = func.coalesce(Item.quantity, 0) * func.coalesce(Item.price, 0) + func.coalesce(Item.delivery_price, 0)
+
+# Totals are floats; smaller differences are rounding, not drift
+DRIFT_TOLERANCE = 1e-6
+
+
+def item_cost(quantity, price, delivery_price) -> float:
+    """ITEM_COST for values already in memory"""
+    return (quantity or 0) * (price or 0) + (delivery_price or 0)
+
+
+class RollupRepository:
+    """
+    Server-maintained totals:
+    - lists.items_total: ITEM_COST summed over the list's items;
+    - steps.total_materials_price / total_workers_price: the step's own prices,
+      materials including its list's items_total;
+    - projects: step totals summed, and min/max planned and actual dates;
+      rollup_generation is bumped by every project update here, so anything
+      derived from steps and list totals can be cached against it.
+
+    Write paths apply deltas with the methods below inside their own transaction
+    (these never commit), always locking rows in list -> item -> step -> project
+    order. reconcile() recomputes everything to repair drift.
+    """
+
+    _DATE_COLUMNS = ("planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date")
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_item_cost(self, list_id: int, delta: float) -> None:
+        """Add delta to the list, its step and its project"""
+        if not delta:
+            return
+        step_id = self.db.scalar(
+            update(List)
+            .where(List.id == list_id)
+            .values(items_total=List.items_total + delta, updated_at=List.updated_at)
+            .returning(List.step_id)
+        )
+        if step_id is not None:
+            self.add_step_amounts(step_id, delta, 0)
+
+    def add_step_amounts(self, step_id: int, materials_delta: float, workers_delta: float) -> None:
+        """Add the deltas to the step's totals and to its project"""
+        if not materials_delta and not workers_delta:
+            return
+        project_id = self.db.scalar(
+            update(Step)
+            .where(Step.id == step_id)
+            .values(
+                total_materials_price=Step.total_materials_price + materials_delta,
+                total_workers_price=Step.total_workers_price + workers_delta,
+                updated_at=Step.updated_at,
+            )
+            .returning(Step.project_id)
+        )
+        if project_id is not None:
+            self.add_project_amounts(project_id, materials_delta, workers_delta)
+
+    def add_project_amounts(self, project_id: int, materials_delta: float, workers_delta: float) -> None:
+        if not materials_delta and not workers_delta:
+            return
+        self.db.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(
+                total_materials_price=func.coalesce(Project.total_materials_price, 0) + materials_delta,
+                total_workers_price=func.coalesce(Project.total_workers_price, 0) + workers_delta,
+                rollup_generation=Project.rollup_generation + 1,
+                updated_at=Project.updated_at,
+            )
+        )
+
+    def refresh_project_dates(self, project_id: int) -> None:
+        """Recompute the project's min/max dates from its steps in one UPDATE; call after any step change"""
+        dates = {
+            column.name: select(column).where(Step.project_id == project_id).scalar_subquery()
+            for column in self._step_dates().selected_columns
+        }
+        self.db.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(**dates, rollup_generation=Project.rollup_generation + 1, updated_at=Project.updated_at)
+        )
+
+    def bump_generation(self, project_id: int) -> None:
+        """Invalidate what is cached against the project's generation without changing any total"""
+        self.db.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(rollup_generation=Project.rollup_generation + 1, updated_at=Project.updated_at)
+        )
+
+    def bump_list_generation(self, list_id: int) -> None:
+        """bump_generation for the project of the list"""
+        self.db.execute(
+            update(Project)
+            .where(Project.id == select(List.project_id).where(List.id == list_id).scalar_subquery())
+            .values(rollup_generation=Project.rollup_generation + 1, updated_at=Project.updated_at)
+        )
+
+    @staticmethod
+    def _step_dates():
+        return select(
+            func.min(Step.planned_start_date).label("planned_start_date"),
+            func.max(Step.planned_end_date).label("planned_end_date"),
+            func.min(Step.actual_start_date).label("actual_start_date"),
+            func.max(Step.actual_end_date).label("actual_end_date"),
+        )
+
+    def reconcile(self) -> int:
+        """
+        Recompute lists, then steps, then projects from the source rows and
+        overwrite only the ones that drifted; returns how many rows were fixed.
+        Runs under REPEATABLE READ so totals come from one snapshot: a row
+        changed by a concurrent write fails the run (retried on the next one)
+        instead of being overwritten with a stale total.
+        """
+        self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        fixed_lists = self._reconcile_lists()
+        step_projects = self._reconcile_steps()
+        fixed = fixed_lists + len(step_projects) + self._reconcile_projects(set(step_projects))
+        self.db.commit()
+        return fixed
+
+    def _reconcile_lists(self) -> int:
+        expected = (
+            select(List.id.label("list_id"), func.coalesce(func.sum(ITEM_COST), 0).label("items_total"))
+            .outerjoin(Item, Item.list_id == List.id)
+            .group_by(List.id)
+            .subquery()
+        )
+        return self.db.execute(
+            update(List)
+            .where(List.id == expected.c.list_id, _drifted(List.items_total, expected.c.items_total))
+            .values(items_total=expected.c.items_total, updated_at=List.updated_at)
+        ).rowcount
+
+    def _reconcile_steps(self) -> TypeList[int]:
+        """Returns the project id of each fixed step"""
+        expected = (
+            select(
+                Step.id.label("step_id"),
+                (func.coalesce(Step.materials_price, 0) + func.coalesce(List.items_total, 0)).label("materials"),
+                func.coalesce(Step.workers_price, 0).label("workers"),
+            )
+            .outerjoin(List, List.step_id == Step.id)
+            .subquery()
+        )
+        return self.db.scalars(
+            update(Step)
+            .where(
+                Step.id == expected.c.step_id,
+                or_(
+                    _drifted(Step.total_materials_price, expected.c.materials),
+                    _drifted(Step.total_workers_price, expected.c.workers),
+                ),
+            )
+            .values(
+                total_materials_price=expected.c.materials,
+                total_workers_price=expected.c.workers,
+                updated_at=Step.updated_at,
+            )
+            .returning(Step.project_id)
+        ).all()
+
+    def _reconcile_projects(self, changed_project_ids: Set[int]) -> int:
+        """Fix drifted projects; these and changed_project_ids get a new rollup_generation"""
+        expected = (
+            self._step_dates()
+            .add_columns(
+                Project.id.label("project_id"),
+                func.coalesce(func.sum(Step.total_materials_price), 0).label("materials"),
+                func.coalesce(func.sum(Step.total_workers_price), 0).label("workers"),
+            )
+            .select_from(Project)
+            .outerjoin(Step, Step.project_id == Project.id)
+            .group_by(Project.id)
+            .subquery()
+        )
+        return self.db.execute(
+            update(Project)
+            .where(
+                Project.id == expected.c.project_id,
+                or_(
+                    Project.id.in_(changed_project_ids),
+                    _drifted(Project.total_materials_price, expected.c.materials),
+                    _drifted(Project.total_workers_price, expected.c.workers),
+                    *(getattr(Project, column).is_distinct_from(expected.c[column]) for column in self._DATE_COLUMNS),
+                ),
+            )
+            .values(
+                total_materials_price=expected.c.materials,
+                total_workers_price=expected.c.workers,
+                **{column: expected.c[column] for column in self._DATE_COLUMNS},
+                rollup_generation=Project.rollup_generation + 1,
+                updated_at=Project.updated_at,
+            )
+        ).rowcount
+
+
+def _drifted(stored, expected):
+    return func.abs(func.coalesce(stored, 0) - expected) > DRIFT_TOLERANCE
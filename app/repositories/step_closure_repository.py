@@ -0,0 +1,87 @@
+from typing import Dict, List as TypeList, Optional, Tuple
+from sqlalchemy import Integer, column, delete, func, insert, literal, select, values
+from sqlalchemy.orm import Session, aliased
+from app.models.step_closure_model import StepClosure
+
+# First key of the advisory lock that serializes hierarchy changes in a project: ASCII "STEP"
+HIERARCHY_LOCK_NAMESPACE = 0x53544550
+
+
+class StepClosureRepository:
+    """
+    Maintains step_closure alongside steps.parent_step_id. Methods never commit;
+    they run inside the transaction of the step write that calls them.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def lock_hierarchy(self, project_id: int) -> None:
+        """Serialize moves and subtree deletes in a project until the transaction ends"""
+        self.db.execute(select(func.pg_advisory_xact_lock(HIERARCHY_LOCK_NAMESPACE, project_id)))
+
+    def subtree_ids(self, step_id: int):
+        """Select of the ids of the step and all of its descendants"""
+        return select(StepClosure.descendant_id).where(StepClosure.ancestor_id == step_id)
+
+    def is_in_subtree(self, root_id: int, step_id: int) -> bool:
+        """Whether step_id is root_id or one of its descendants; a parent there would make a cycle"""
+        return self.db.scalar(select(
+            select(StepClosure).where(StepClosure.ancestor_id == root_id, StepClosure.descendant_id == step_id).exists()
+        ))
+
+    def add_steps(self, steps: TypeList[Tuple[int, Optional[int]]]) -> None:
+        """
+        Add closure rows for new (step_id, parent_step_id) pairs, parents listed
+        before their children. Pairs within the batch are built in memory; the
+        ancestors above the batch come from one INSERT ... SELECT joined to the
+        existing rows of the parents the batch hangs from.
+        """
+        in_batch: Dict[int, TypeList[Tuple[int, int]]] = {}
+        outside: Dict[int, Tuple[Optional[int], int]] = {}
+        for step_id, parent_id in steps:
+            if parent_id in in_batch:
+                in_batch[step_id] = [(step_id, 0)] + [(ancestor, depth + 1) for ancestor, depth in in_batch[parent_id]]
+                outside_parent, offset = outside[parent_id]
+                outside[step_id] = (outside_parent, offset + 1)
+            else:
+                in_batch[step_id] = [(step_id, 0)]
+                outside[step_id] = (parent_id, 1)
+
+        self.db.execute(insert(StepClosure).values([
+            {"ancestor_id": ancestor, "descendant_id": step_id, "depth": depth}
+            for step_id, pairs in in_batch.items() for ancestor, depth in pairs
+        ]))
+        hanging = [(step_id, parent, offset) for step_id, (parent, offset) in outside.items() if parent is not None]
+        if hanging:
+            batch = values(
+                column("step_id", Integer), column("parent_id", Integer), column("depth_offset", Integer), name="batch"
+            ).data(hanging)
+            self.db.execute(insert(StepClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(StepClosure.ancestor_id, batch.c.step_id, StepClosure.depth + batch.c.depth_offset)
+                .join(batch, StepClosure.descendant_id == batch.c.parent_id),
+            ))
+
+    def move(self, step_id: int, new_parent_id: Optional[int]) -> None:
+        """
+        Re-hang the subtree in two statements: drop every pair linking an outside
+        ancestor to the subtree, then pair each ancestor of the new parent with
+        each member of the subtree. Callers check is_in_subtree first.
+        """
+        self.detach(step_id)
+        if new_parent_id is None:
+            return
+        above, below = aliased(StepClosure), aliased(StepClosure)
+        self.db.execute(insert(StepClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + literal(1))
+            .where(above.descendant_id == new_parent_id, below.ancestor_id == step_id),
+        ))
+
+    def detach(self, step_id: int) -> None:
+        """Make the step a root of its own subtree as far as the closure is concerned"""
+        subtree = self.subtree_ids(step_id)
+        self.db.execute(delete(StepClosure).where(
+            StepClosure.descendant_id.in_(subtree), StepClosure.ancestor_id.not_in(subtree)
+        ))
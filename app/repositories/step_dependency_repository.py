@@ -0,0 +1,82 @@
+from typing import List as TypeList, Tuple
+from sqlalchemy import Float, delete, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from app.models.step_dependency_model import StepDependency
+from app.models.step_model import Step
+from app.repositories.rollup_repository import RollupRepository
+
+
+class StepDependencyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+        self.rollups = RollupRepository(db)
+
+    def get_schedule_steps(self, project_id: int) -> TypeList[Row]:
+        """Hierarchy, dates and prices of every step of the project, in id order"""
+        return self.db.execute(
+            select(
+                Step.id, Step.parent_step_id, Step.name, Step.planned_start_date, Step.planned_end_date,
+                Step.actual_start_date, Step.actual_end_date, Step.materials_price, Step.workers_price,
+                Step.total_materials_price, Step.total_workers_price,
+            )
+            .where(Step.project_id == project_id)
+            .order_by(Step.id)
+        ).all()
+
+    def get_completion_ratios(self, limit: int) -> TypeList[Row]:
+        """
+        For the most recently finished steps of all projects: actual over
+        planned duration, and final totals over the step's own price estimate.
+        Either ratio is None where the planned side is missing or zero.
+        """
+        planned_seconds = func.extract("epoch", Step.planned_end_date - Step.planned_start_date)
+        actual_seconds = func.extract("epoch", Step.actual_end_date - Step.actual_start_date)
+        estimate = func.coalesce(Step.materials_price, 0) + func.coalesce(Step.workers_price, 0)
+        return self.db.execute(
+            select(
+                (actual_seconds / func.nullif(planned_seconds, 0)).cast(Float).label("duration_ratio"),
+                ((Step.total_materials_price + Step.total_workers_price) / func.nullif(estimate, 0)).label("cost_ratio"),
+            )
+            .where(Step.actual_start_date.is_not(None), Step.actual_end_date.is_not(None))
+            .order_by(Step.actual_end_date.desc())
+            .limit(limit)
+        ).all()
+
+    def get_for_project(self, project_id: int) -> TypeList[Tuple[int, int]]:
+        """(predecessor_id, successor_id) of every dependency between the project's steps"""
+        rows = self.db.execute(
+            select(StepDependency.predecessor_id, StepDependency.successor_id)
+            .join(Step, Step.id == StepDependency.successor_id)
+            .where(Step.project_id == project_id)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    def has_dependencies(self, step_id: int) -> bool:
+        """Whether the step is a predecessor or successor in any dependency"""
+        return self.db.scalar(select(exists().where(
+            or_(StepDependency.predecessor_id == step_id, StepDependency.successor_id == step_id)
+        )))
+
+    def add(self, project_id: int, predecessor_id: int, successor_id: int) -> bool:
+        """Insert the link if missing and invalidate the project's cached schedule; False if it existed"""
+        added = self.db.scalar(
+            pg_insert(StepDependency)
+            .values(predecessor_id=predecessor_id, successor_id=successor_id)
+            .on_conflict_do_nothing()
+            .returning(StepDependency.successor_id)
+        )
+        if added is not None:
+            self.rollups.bump_generation(project_id)
+        self.db.commit()
+        return added is not None
+
+    def remove(self, project_id: int, predecessor_id: int, successor_id: int) -> bool:
+        removed = self.db.execute(delete(StepDependency).where(
+            StepDependency.predecessor_id == predecessor_id, StepDependency.successor_id == successor_id
+        )).rowcount
+        if removed:
+            self.rollups.bump_generation(project_id)
+        self.db.commit()
+        return removed > 0
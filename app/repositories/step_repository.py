@@ -1,8 +1,280 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Any, Dict, List as TypeList, Optional, Tuple
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, aliased
+from app.models.item_model import Item
+from app.models.list_model import List
+from app.models.lock_model import Lock
+from app.models.project_user_model import ProjectUser
+from app.models.step_closure_model import StepClosure
 from app.models.step_model import Step
 from app.schemas.step_schema import StepCreate, StepUpdate
 from .base_repository import BaseRepository
+from .rollup_repository import RollupRepository
+from .step_closure_repository import StepClosureRepository
+
+# Step fields carried over by copy_subtree
+_COPIED_FIELDS = (
+    "name", "planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date",
+    "materials_price", "workers_price",
+)
 
 class StepRepository(BaseRepository[Step]):
+    """
+    Steps, keeping their own totals, the project's rollups and the step_closure
+    hierarchy current in the same transaction
+    """
+
     def __init__(self, db: Session):
         super().__init__(Step, db)
+        self.rollups = RollupRepository(db)
+        self.closure = StepClosureRepository(db)
+
+    def create(self, obj_in: Dict[str, Any]) -> Step:
+        db_step = Step(**obj_in)
+        db_step.total_materials_price = db_step.materials_price or 0
+        db_step.total_workers_price = db_step.workers_price or 0
+        self.db.add(db_step)
+        self.db.flush()
+        self.closure.add_steps([(db_step.id, db_step.parent_step_id)])
+        self.rollups.add_project_amounts(db_step.project_id, db_step.total_materials_price, db_step.total_workers_price)
+        self.rollups.refresh_project_dates(db_step.project_id)
+        self.db.commit()
+        self.db.refresh(db_step)
+        return db_step
+
+    def create_many(self, project_id: int, steps: TypeList[Dict[str, Any]]) -> TypeList[Tuple[int, int]]:
+        """
+        Insert steps with their lists in one transaction and three statements:
+        ids are drawn from the steps sequence up front, so parents can be
+        resolved before a single multi-row INSERT of all steps, followed by
+        one multi-row INSERT ... RETURNING of their lists. A step's
+        "parent_index" points at an earlier entry; otherwise its
+        parent_step_id is used as given. Returns (step_id, list_id) per step.
+        """
+        ids = self.db.scalars(
+            select(func.nextval(func.pg_get_serial_sequence(Step.__tablename__, "id")))
+            .select_from(func.generate_series(1, len(steps)))
+        ).all()
+        rows = []
+        for step_id, fields in zip(ids, steps):
+            fields = dict(fields)
+            parent_index = fields.pop("parent_index", None)
+            if parent_index is not None:
+                fields["parent_step_id"] = ids[parent_index]
+            rows.append({
+                **fields,
+                "id": step_id,
+                "project_id": project_id,
+                "total_materials_price": fields.get("materials_price") or 0,
+                "total_workers_price": fields.get("workers_price") or 0,
+            })
+        self.db.execute(insert(Step).values(rows))
+        self.closure.add_steps([(row["id"], row["parent_step_id"]) for row in rows])
+        list_ids = dict(self.db.execute(
+            insert(List)
+            .values([{"name": f"List for {row['name']}", "project_id": project_id, "step_id": row["id"]} for row in rows])
+            .returning(List.step_id, List.id)
+        ).all())
+
+        self.rollups.add_project_amounts(
+            project_id, sum(row["total_materials_price"] for row in rows), sum(row["total_workers_price"] for row in rows)
+        )
+        self.rollups.refresh_project_dates(project_id)
+        self.db.commit()
+        return [(step_id, list_ids[step_id]) for step_id in ids]
+
+    def has_sub_steps(self, step_id: int) -> bool:
+        return self.db.scalar(select(exists().where(Step.parent_step_id == step_id)))
+
+    def update(self, id: int, obj_in: Dict[str, Any]) -> Optional[Step]:
+        """
+        Callers changing parent_step_id hold lock_hierarchy and have ruled out a
+        cycle. A step moved to another project takes its list with it; callers
+        only move top-level steps without sub-steps or dependencies.
+        """
+        db_step = self._get_for_update(id)
+        if not db_step:
+            return None
+        old_project_id = db_step.project_id
+        old_parent_id = db_step.parent_step_id
+        old_totals = (db_step.total_materials_price, db_step.total_workers_price)
+        materials_delta = -(db_step.materials_price or 0)
+        workers_delta = -(db_step.workers_price or 0)
+        for field, value in obj_in.items():
+            setattr(db_step, field, value)
+        materials_delta += db_step.materials_price or 0
+        workers_delta += db_step.workers_price or 0
+        db_step.total_materials_price += materials_delta
+        db_step.total_workers_price += workers_delta
+        self.db.flush()
+        if db_step.parent_step_id != old_parent_id:
+            self.closure.move(id, db_step.parent_step_id)
+
+        if db_step.project_id != old_project_id:
+            self.db.execute(update(List).where(List.step_id == id).values(project_id=db_step.project_id))
+            self.rollups.add_project_amounts(old_project_id, -old_totals[0], -old_totals[1])
+            self.rollups.add_project_amounts(db_step.project_id, db_step.total_materials_price, db_step.total_workers_price)
+            self.rollups.refresh_project_dates(old_project_id)
+            self.rollups.refresh_project_dates(db_step.project_id)
+        else:
+            self.rollups.add_project_amounts(db_step.project_id, materials_delta, workers_delta)
+            self.rollups.refresh_project_dates(db_step.project_id)
+        self.db.commit()
+        self.db.refresh(db_step)
+        return db_step
+
+    def delete(self, id: int) -> Optional[Step]:
+        """Delete the step (with its list and items) and take its totals off the project"""
+        db_step = self._get_for_update(id)
+        if db_step:
+            # Its sub-steps become top-level steps, as parent_step_id is cleared on them
+            self.closure.detach(id)
+            self.db.delete(db_step)
+            self.db.flush()
+            self.rollups.add_project_amounts(
+                db_step.project_id, -db_step.total_materials_price, -db_step.total_workers_price
+            )
+            self.rollups.refresh_project_dates(db_step.project_id)
+            self.db.commit()
+        return db_step
+
+    def lock_hierarchy(self, project_id: int) -> None:
+        self.closure.lock_hierarchy(project_id)
+
+    def would_create_cycle(self, step_id: int, new_parent_id: int) -> bool:
+        return self.closure.is_in_subtree(step_id, new_parent_id)
+
+    def copy_subtree(self, step_id: int, new_parent_id: Optional[int]) -> TypeList[Tuple[int, int, int]]:
+        """
+        Copy the step and its descendants, with fresh empty lists, under
+        new_parent_id via create_many. Returns (source_id, step_id, list_id) per copy.
+        """
+        rows = self.db.execute(
+            select(Step, StepClosure.depth)
+            .join(StepClosure, StepClosure.descendant_id == Step.id)
+            .where(StepClosure.ancestor_id == step_id)
+            .order_by(StepClosure.depth, Step.id)
+        ).all()
+        if not rows:
+            return []
+        index_of = {step.id: index for index, (step, _) in enumerate(rows)}
+        copies = [
+            {
+                **{field: getattr(step, field) for field in _COPIED_FIELDS},
+                "parent_step_id": new_parent_id if depth == 0 else None,
+                "parent_index": None if depth == 0 else index_of[step.parent_step_id],
+            }
+            for step, depth in rows
+        ]
+        created = self.create_many(rows[0].Step.project_id, copies)
+        return [(step.id, new_step_id, list_id) for (step, _), (new_step_id, list_id) in zip(rows, created)]
+
+    def shift_subtree(self, step_id: int, delta: timedelta) -> TypeList[Step]:
+        """
+        Move the planned dates of the step and all of its descendants by delta
+        in one UPDATE over step_closure, refresh the project's dates (which
+        also bumps its rollup_generation) and commit. Returns the updated steps.
+        """
+        shifted = self.db.scalars(
+            update(Step)
+            .where(Step.id.in_(self.closure.subtree_ids(step_id)))
+            .values(
+                planned_start_date=Step.planned_start_date + delta,
+                planned_end_date=Step.planned_end_date + delta,
+            )
+            .returning(Step),
+            execution_options={"populate_existing": True, "synchronize_session": False},
+        ).all()
+        if shifted:
+            self.rollups.refresh_project_dates(shifted[0].project_id)
+        self.db.commit()
+        return sorted(shifted, key=lambda step: step.id)
+
+    def delete_subtree(self, step_id: int) -> Optional[Tuple[int, TypeList[int], int]]:
+        """
+        Delete the step and all of its descendants with their lists, items and
+        locks, one statement per table; closure rows go with the steps by
+        ON DELETE CASCADE. Returns (project_id, deleted list ids, deleted step count).
+        """
+        root = self._get_for_update(step_id)
+        if root is None:
+            return None
+        project_id = root.project_id
+        step_ids = self.db.scalars(self.closure.subtree_ids(step_id)).all()
+        materials, workers = self.db.execute(
+            select(func.coalesce(func.sum(Step.total_materials_price), 0), func.coalesce(func.sum(Step.total_workers_price), 0))
+            .where(Step.id.in_(step_ids))
+        ).one()
+        list_ids = self.db.scalars(select(List.id).where(List.step_id.in_(step_ids)).with_for_update()).all()
+        unsynchronized = {"synchronize_session": False}
+        self.db.execute(delete(Item).where(Item.list_id.in_(list_ids)), execution_options=unsynchronized)
+        self.db.execute(delete(Lock).where(Lock.list_id.in_(list_ids)), execution_options=unsynchronized)
+        self.db.execute(delete(List).where(List.id.in_(list_ids)), execution_options=unsynchronized)
+        self.db.execute(delete(Step).where(Step.id.in_(step_ids)), execution_options=unsynchronized)
+        self.rollups.add_project_amounts(project_id, -materials, -workers)
+        self.rollups.refresh_project_dates(project_id)
+        self.db.commit()
+        self.db.expunge(root)
+        return project_id, sorted(list_ids), len(step_ids)
+
+    def get_page_for_user(
+        self,
+        user_internal_id: int,
+        limit: int,
+        after_id: Optional[int] = None,
+        project_id: Optional[int] = None,
+        parent_step_id: Optional[int] = None,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+    ) -> TypeList[Step]:
+        """
+        Steps of the user's projects in id order, keyset-paginated on id and
+        served by ix_steps_project_id_parent_step_id_id. The date range keeps
+        steps whose planned period overlaps [from_date, to_date].
+        """
+        member_projects = select(ProjectUser.project_id).where(ProjectUser.user_id == user_internal_id)
+        query = select(Step).where(Step.project_id.in_(member_projects))
+        if project_id is not None:
+            query = query.where(Step.project_id == project_id)
+        if parent_step_id is not None:
+            query = query.where(Step.parent_step_id == parent_step_id)
+        if from_date is not None:
+            query = query.where(Step.planned_end_date >= from_date)
+        if to_date is not None:
+            query = query.where(Step.planned_start_date <= to_date)
+        if after_id is not None:
+            query = query.where(Step.id > after_id)
+        return self.db.scalars(query.order_by(Step.id).limit(limit)).all()
+
+    def get_subtree_rollups(self, project_id: int) -> TypeList[Row]:
+        """
+        One row per step of the project with totals over the step and all of its
+        sub-steps: materials and workers prices, the lists' items_total and the
+        earliest start / latest end dates, aggregated over step_closure pairs.
+        """
+        ancestor = aliased(Step, name="ancestor")
+        return self.db.execute(
+            select(
+                ancestor.id.label("step_id"),
+                ancestor.name,
+                ancestor.parent_step_id,
+                func.coalesce(func.sum(Step.materials_price), 0).label("materials_price"),
+                func.coalesce(func.sum(Step.workers_price), 0).label("workers_price"),
+                func.coalesce(func.sum(List.items_total), 0).label("items_cost"),
+                func.min(Step.planned_start_date).label("planned_start_date"),
+                func.max(Step.planned_end_date).label("planned_end_date"),
+                func.min(Step.actual_start_date).label("actual_start_date"),
+                func.max(Step.actual_end_date).label("actual_end_date"),
+            )
+            .join(StepClosure, StepClosure.ancestor_id == ancestor.id)
+            .join(Step, Step.id == StepClosure.descendant_id)
+            .outerjoin(List, List.step_id == Step.id)
+            .where(ancestor.project_id == project_id)
+            .group_by(ancestor.id)
+            .order_by(ancestor.id)
+        ).all()
+
+    def _get_for_update(self, id: int) -> Optional[Step]:
+        return self.db.query(Step).filter(Step.id == id).with_for_update().populate_existing().first()
@@ -42,5 +42,6 @@ class ItemInDB(ItemBase):
     approved: int
     bought: int
     delivered: int
+    version: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
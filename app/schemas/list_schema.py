@@ -1,8 +1,9 @@
 
-from typing import List as TypeList, Optional
+from typing import Dict, List as TypeList, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 from .item_schema import ItemInDB
+from .lock_schema import ListLockStatus
 
 class ListBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
@@ -26,6 +27,19 @@ class ListInDB(BaseModel):
     created_at: datetime
     updated_at: datetime
     destination_address: Optional[str] = None
+    version: Optional[int] = None
+    items_total: Optional[float] = None
     items: TypeList[ItemInDB] = []
+    lock_status: Optional[ListLockStatus] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+class ListSummary(BaseModel):
+    list_id: int
+    item_count: int
+    total_cost: float
+    max_delivery_period: Optional[int] = None
+    # Items without a category are counted under "uncategorized"
+    by_category: Dict[str, int] = {}
+    # Items flagged approved, bought and delivered
+    by_status: Dict[str, int] = {}
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 
 class LockBase(BaseModel):
     list_id: int
@@ -11,8 +11,38 @@ class LockCreate(LockBase):
 
 class LockInDB(LockBase):
     id: int
-    acquired_at: datetime = datetime.now() # Added default value
+    # None when the backend cannot see the holder's lease (another worker's advisory lock)
+    acquired_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
     created_at: Optional[datetime] = None # Added created_at
     updated_at: Optional[datetime] = None # Added updated_at
+    # (holder_id, expires_at) of another user's expired lease this acquire replaced; not serialized
+    taken_over_from: Optional[Tuple[int, datetime]] = Field(default=None, exclude=True)
 
     model_config = ConfigDict(from_attributes=True)
+
+class ListLockStatus(BaseModel):
+    """Who holds a list's lock, for lock badges"""
+    list_id: int
+    holder_id: int
+    acquired_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class LockWaiterInfo(BaseModel):
+    user_internal_id: int
+    position: int
+    deadline: datetime
+
+class LockQueue(BaseModel):
+    list_id: int
+    holder_id: Optional[int] = None
+    expires_at: Optional[datetime] = None
+    waiters: List[LockWaiterInfo] = []
+
+class LockSetRequest(BaseModel):
+    """Lists to lock or release together; give exactly one of the selectors"""
+    list_ids: Optional[List[int]] = None
+    step_id: Optional[int] = None
+    project_id: Optional[int] = None
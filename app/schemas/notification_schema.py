@@ -0,0 +1,18 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List, Optional
+
+class NotificationInDB(BaseModel):
+    id: int
+    project_id: int
+    list_id: Optional[int] = None
+    type: str
+    message: str
+    read: bool = False
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class NotificationPage(BaseModel):
+    items: List[NotificationInDB]
+    next_before_id: Optional[int] = None
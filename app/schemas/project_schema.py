@@ -8,12 +8,6 @@ from app.utils.logger import logger # Import logger
 class ProjectBase(BaseModel):
     name: str
     place_description: Optional[str] = None
-    planned_start_date: Optional[datetime] = None
-    planned_end_date: Optional[datetime] = None
-    actual_start_date: Optional[datetime] = None
-    actual_end_date: Optional[datetime] = None
-    total_materials_price: Optional[float] = None
-    total_workers_price: Optional[float] = None
 
 class ProjectCreate(ProjectBase):
     pass
@@ -30,6 +24,13 @@ class ProjectUser(BaseModel):
 
 class Project(ProjectBase):
     id: int
+    # Rollups over the project's steps, maintained by the server
+    planned_start_date: Optional[datetime] = None
+    planned_end_date: Optional[datetime] = None
+    actual_start_date: Optional[datetime] = None
+    actual_end_date: Optional[datetime] = None
+    total_materials_price: Optional[float] = None
+    total_workers_price: Optional[float] = None
     created_at: datetime # Added created_at
     updated_at: Optional[datetime] = None # Added updated_at
     steps: TypeList['Step'] = []
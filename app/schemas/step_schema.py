@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Dict, Optional, List
+from datetime import datetime, timezone
 
 class StepBase(BaseModel):
     name: str
@@ -19,12 +19,86 @@ class StepCreate(StepBase):
 class StepUpdate(StepBase):
     pass
 
-class Step(StepBase):
+class StepInDB(StepBase):
     id: int
+    total_materials_price: Optional[float] = None
+    total_workers_price: Optional[float] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-    sub_steps: List['Step'] = []
 
     model_config = ConfigDict(from_attributes=True)
 
+class Step(StepInDB):
+    sub_steps: List['Step'] = []
+
+class StepPage(BaseModel):
+    """Steps without their sub_steps; pass next_after_id as after_id for the following page"""
+    items: List[StepInDB]
+    next_after_id: Optional[int] = None
+
 Step.model_rebuild()
+
+class StepImportNode(BaseModel):
+    """A step to import; temp_id is the client's own id for it, unique within the import"""
+    temp_id: str = Field(..., min_length=1, max_length=64)
+    name: str
+    planned_start_date: Optional[datetime] = None
+    planned_end_date: Optional[datetime] = None
+    actual_start_date: Optional[datetime] = None
+    actual_end_date: Optional[datetime] = None
+    materials_price: Optional[float] = None
+    workers_price: Optional[float] = None
+    sub_steps: List['StepImportNode'] = []
+
+StepImportNode.model_rebuild()
+
+class StepImport(BaseModel):
+    project_id: int
+    # Existing step to hang the imported top-level steps under
+    parent_step_id: Optional[int] = None
+    steps: List[StepImportNode] = Field(..., min_length=1)
+
+class StepPlacement(BaseModel):
+    """Where to move or copy a step; None makes it a top-level step"""
+    parent_step_id: Optional[int] = None
+
+class StepShift(BaseModel):
+    """Either delta_days, or new_start_date to re-anchor the step's planned start"""
+    delta_days: Optional[float] = None
+    new_start_date: Optional[datetime] = None
+
+    @field_validator("new_start_date")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Step dates are stored naive in UTC; an offset in the request is converted to that"""
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class StepCopyResult(BaseModel):
+    """Ids of the new steps and their lists, keyed by the id of the step they copy"""
+    step_ids: Dict[int, int]
+    list_ids: Dict[int, int]
+
+class StepImportResult(BaseModel):
+    """Ids of the created steps and their lists, keyed by temp_id"""
+    step_ids: Dict[str, int]
+    list_ids: Dict[str, int]
+
+class StepRollup(BaseModel):
+    """A step with totals over itself and all of its sub-steps"""
+    step_id: int
+    name: str
+    parent_step_id: Optional[int] = None
+    materials_price: float
+    workers_price: float
+    items_cost: float
+    planned_start_date: Optional[datetime] = None
+    planned_end_date: Optional[datetime] = None
+    actual_start_date: Optional[datetime] = None
+    actual_end_date: Optional[datetime] = None
+    sub_steps: List['StepRollup'] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+StepRollup.model_rebuild()
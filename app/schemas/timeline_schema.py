@@ -0,0 +1,71 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class StepDependencyCreate(BaseModel):
+    predecessor_id: int
+
+class StepDependency(BaseModel):
+    predecessor_id: int
+    successor_id: int
+
+class TimelineStep(BaseModel):
+    """Schedule of one step; a step with sub-steps spans them and has no duration of its own"""
+    step_id: int
+    parent_step_id: Optional[int] = None
+    name: str
+    duration_days: float
+    earliest_start: datetime
+    earliest_finish: datetime
+    latest_start: datetime
+    latest_finish: datetime
+    slack_days: float
+    critical: bool
+    predecessor_ids: List[int] = []
+
+class ProjectTimeline(BaseModel):
+    project_id: int
+    start: datetime
+    finish: datetime
+    duration_days: float
+    critical_path: List[int]
+    steps: List[TimelineStep]
+
+class DateBin(BaseModel):
+    start: datetime
+    end: datetime
+    count: int
+
+class CostBin(BaseModel):
+    low: float
+    high: float
+    count: int
+
+class ProjectSimulation(BaseModel):
+    """Distribution of the project's finish date and final cost over Monte-Carlo trials"""
+    project_id: int
+    trials: int
+    history_size: int
+    completion_p50: datetime
+    completion_p90: datetime
+    completion_histogram: List[DateBin]
+    cost_mean: float
+    cost_p50: float
+    cost_p90: float
+    cost_histogram: List[CostBin]
+
+class CashflowBucket(BaseModel):
+    start: datetime
+    materials: float
+    workers: float
+    total: float
+    cumulative: float
+
+class ProjectCashflow(BaseModel):
+    """Planned spending per day, week or month; buckets without spending are omitted"""
+    project_id: int
+    bucket: str
+    buckets: List[CashflowBucket]
+    unscheduled_materials: float
+    unscheduled_workers: float
+    total: float
@@ -0,0 +1,49 @@
+from sqlalchemy.orm import Session
+from app.core.exceptions import NotFoundException
+from app.repositories.cashflow_repository import CashflowRepository
+from app.repositories.project_repository import ProjectRepository
+from app.schemas.timeline_schema import CashflowBucket, ProjectCashflow
+from app.services.step_tree_cache import cashflow_cache
+
+
+class CashflowService:
+    def __init__(self, db: Session):
+        self.repository = CashflowRepository(db)
+        self.project_repository = ProjectRepository(db)
+
+    def get_project_cashflow(self, project_id: int, bucket: str, user_internal_id: int) -> ProjectCashflow:
+        """Spending series of the project; cached until the project's rollup_generation changes"""
+        project = self.project_repository.get_by_id_for_user(project_id, user_internal_id)
+        if not project:
+            raise NotFoundException("Project not found or you don't have access")
+
+        key = (project.rollup_generation, bucket)
+        cashflow = cashflow_cache.get(project_id, key)
+        if cashflow is None:
+            cashflow = self._compute_cashflow(project_id, bucket)
+            cashflow_cache.put(project_id, key, cashflow)
+        return cashflow
+
+    def _compute_cashflow(self, project_id: int, bucket: str) -> ProjectCashflow:
+        buckets, cumulative = [], 0.0
+        unscheduled_materials = unscheduled_workers = 0.0
+        for row in self.repository.get_cashflow(project_id, bucket):
+            if row.bucket_start is None:
+                unscheduled_materials, unscheduled_workers = row.materials, row.workers
+                continue
+            cumulative += row.materials + row.workers
+            buckets.append(CashflowBucket(
+                start=row.bucket_start,
+                materials=row.materials,
+                workers=row.workers,
+                total=row.materials + row.workers,
+                cumulative=cumulative,
+            ))
+        return ProjectCashflow(
+            project_id=project_id,
+            bucket=bucket,
+            buckets=buckets,
+            unscheduled_materials=unscheduled_materials,
+            unscheduled_workers=unscheduled_workers,
+            total=cumulative + unscheduled_materials + unscheduled_workers,
+        )
@@ -0,0 +1,129 @@
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.core.db import SessionLocal
+from app.core.exceptions import BaseAPIException
+from app.repositories.list_repository import ListRepository
+from app.repositories.user_repository import UserRepository
+from app.services.event_hub import event_hub
+from app.services.lock_service import LockService
+from app.utils.logger import logger
+
+
+# The join snapshot only covers sockets on the serving worker; users on other
+# workers appear to a client once a presence.* event about them arrives
+PRESENCE_SCOPE = "worker"
+
+
+class PresenceRegistry:
+    """Who is viewing or editing each list on this process (not across workers)"""
+
+    VIEWING = "viewing"
+    EDITING = "editing"
+
+    def __init__(self):
+        self._lists: Dict[int, Dict[int, Tuple[int, str]]] = {}
+
+    def join(self, list_id: int, connection_id: int, user_internal_id: int) -> None:
+        self._lists.setdefault(list_id, {})[connection_id] = (user_internal_id, self.VIEWING)
+
+    def set_state(self, list_id: int, connection_id: int, state: str) -> None:
+        connections = self._lists.get(list_id, {})
+        if connection_id in connections:
+            connections[connection_id] = (connections[connection_id][0], state)
+
+    def leave(self, list_id: int, connection_id: int) -> None:
+        connections = self._lists.get(list_id, {})
+        connections.pop(connection_id, None)
+        if not connections:
+            self._lists.pop(list_id, None)
+
+    def snapshot(self, list_id: int) -> List[Dict[str, Any]]:
+        """One entry per user; a user editing from any connection counts as editing"""
+        users: Dict[int, str] = {}
+        for user_internal_id, state in self._lists.get(list_id, {}).values():
+            if users.get(user_internal_id) != self.EDITING:
+                users[user_internal_id] = state
+        return [{"user_internal_id": user_id, "state": state} for user_id, state in users.items()]
+
+
+presence_registry = PresenceRegistry()
+
+
+class CollaborationService:
+    """Database and presence operations for one collaboration socket.
+
+    Every call opens its own short session so the socket never keeps a pooled
+    connection checked out while it is idle.
+    """
+
+    def __init__(self, list_id: int, user_internal_id: int, project_id: int, connection_id: int):
+        self.list_id = list_id
+        self.user_internal_id = user_internal_id
+        self.project_id = project_id
+        self.connection_id = connection_id
+        self.holds_lock = False
+
+    @staticmethod
+    def authorize(list_id: int, user_external_id: str) -> Optional[Tuple[int, int]]:
+        """Resolve the user and return (user_internal_id, project_id) if they can access the list"""
+        db = SessionLocal()
+        try:
+            user = UserRepository(db).get_or_create_by_external_id(user_external_id)
+            db_list = ListRepository(db).get_by_id_for_user(list_id, user.internal_id)
+            if not db_list:
+                return None
+            return user.internal_id, db_list.project_id
+        finally:
+            db.close()
+
+    def _run(self, operation) -> Any:
+        db: Session = SessionLocal()
+        try:
+            return operation(LockService(db))
+        finally:
+            db.close()
+
+    def join(self) -> List[Dict[str, Any]]:
+        presence_registry.join(self.list_id, self.connection_id, self.user_internal_id)
+        self._publish_presence("joined")
+        return presence_registry.snapshot(self.list_id)
+
+    def leave(self) -> None:
+        presence_registry.leave(self.list_id, self.connection_id)
+        self._publish_presence("left")
+
+    def acquire_lock(self) -> None:
+        """Acquire the list lock; raises LockException when another user holds it"""
+        self._run(lambda lock_service: lock_service.acquire_lock(self.list_id, self.user_internal_id))
+        self.holds_lock = True
+        presence_registry.set_state(self.list_id, self.connection_id, PresenceRegistry.EDITING)
+        self._publish_presence(PresenceRegistry.EDITING)
+
+    def heartbeat(self) -> bool:
+        """Renew the lock lease; returns False once the lock has been lost"""
+        if not self.holds_lock:
+            return False
+        try:
+            self._run(lambda lock_service: lock_service.renew_lock(self.list_id, self.user_internal_id))
+        except BaseAPIException:
+            self.holds_lock = False
+        return self.holds_lock
+
+    def release_lock(self) -> None:
+        if not self.holds_lock:
+            return
+        self.holds_lock = False
+        try:
+            self._run(lambda lock_service: lock_service.release_lock(self.list_id, self.user_internal_id))
+        except BaseAPIException as e:
+            logger.warning(f"Could not release lock on list {self.list_id} for user {self.user_internal_id}: {e.detail}")
+        presence_registry.set_state(self.list_id, self.connection_id, PresenceRegistry.VIEWING)
+        self._publish_presence(PresenceRegistry.VIEWING)
+
+    def _publish_presence(self, change_type: str) -> None:
+        event_hub.publish(
+            f"presence.{change_type}",
+            self.project_id,
+            {"list_id": self.list_id, "user_internal_id": self.user_internal_id},
+        )
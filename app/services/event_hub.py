@@ -0,0 +1,147 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.pubsub import PubSubBackend, InMemoryPubSub, create_backend
+from app.utils.logger import logger
+
+
+class Subscription:
+    """A single stream consumer with a bounded queue of pending events"""
+
+    def __init__(self, user_internal_id: int, project_ids: Set[int], queue_size: int):
+        self.user_internal_id = user_internal_id
+        self.project_ids = set(project_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Enqueue an event, dropping the oldest one when the consumer is too slow"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, returning None when the timeout passes"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """Fan-out of change events to the stream subscribers of this process.
+
+    Services publish from request threads into the pub/sub backend, which
+    hands every event back to `deliver` in each process; dispatch to the
+    subscriber queues always happens on the event loop that owns them.
+    """
+
+    def __init__(self, queue_size: int = settings.EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.backend: PubSubBackend = InMemoryPubSub(self.deliver)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_project: Dict[int, Set[Subscription]] = {}
+        self._by_user: Dict[int, Set[Subscription]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._sequence = 0
+
+    async def start(self) -> None:
+        """Bind to the running loop and start the configured pub/sub backend"""
+        self._loop = asyncio.get_running_loop()
+        self.backend = create_backend(self.deliver)
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        self.backend = InMemoryPubSub(self.deliver)
+
+    def subscribe(self, user_internal_id: int, project_ids: Set[int]) -> Subscription:
+        """Register a subscriber; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_internal_id, project_ids, self.queue_size)
+        self._by_user.setdefault(user_internal_id, set()).add(subscription)
+        for project_id in subscription.project_ids:
+            self._by_project.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber and all of its project registrations"""
+        for project_id in subscription.project_ids:
+            self._discard(self._by_project, project_id, subscription)
+        self._discard(self._by_user, subscription.user_internal_id, subscription)
+        if subscription.dropped:
+            logger.warning(f"Subscriber of user {subscription.user_internal_id} dropped {subscription.dropped} events")
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `listener` on the event loop for every event this process receives"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._by_user.values())
+
+    def publish(self, event_type: str, project_id: int, data: Dict[str, Any]) -> None:
+        """Publish an event to every subscriber of the project; safe to call from any thread"""
+        self.backend.publish({
+            "type": event_type,
+            "project_id": project_id,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat(),
+            "published_at": time.time(),
+        })
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Hand an event received from the backend to the local subscribers"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        self._sequence += 1
+        event["id"] = self._sequence
+        project_id = event["project_id"]
+        if project_id is None:
+            # stream.resync concerns every open stream
+            subscriptions = [sub for subs in self._by_user.values() for sub in subs]
+        else:
+            subscriptions = list(self._by_project.get(project_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+        if event["type"] in ("membership.added", "membership.removed"):
+            self._apply_membership(event)
+        for listener in self._listeners:
+            listener(event)
+
+    def _apply_membership(self, event: Dict[str, Any]) -> None:
+        """Keep the project set of the affected user's open streams up to date"""
+        project_id = event["project_id"]
+        user_internal_id = event["data"].get("user_internal_id")
+        for subscription in list(self._by_user.get(user_internal_id, ())):
+            if event["type"] == "membership.added" and project_id not in subscription.project_ids:
+                subscription.project_ids.add(project_id)
+                self._by_project.setdefault(project_id, set()).add(subscription)
+                subscription.put(event)
+            elif event["type"] == "membership.removed" and project_id in subscription.project_ids:
+                subscription.project_ids.discard(project_id)
+                self._discard(self._by_project, project_id, subscription)
+
+    @staticmethod
+    def _discard(index: Dict[int, Set[Subscription]], key: int, subscription: Subscription) -> None:
+        subscriptions = index.get(key)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del index[key]
+
+
+event_hub = EventHub()
@@ -0,0 +1,84 @@
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, ConflictException
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.utils.logger import logger
+
+
+class IdempotencyService:
+    """
+    Runs a create request at most once per Idempotency-Key.
+
+    The key is claimed (and committed) before the request executes, so a
+    concurrent duplicate hits the unique constraint and gets 409 instead of
+    creating a second row. A retry after completion replays the stored response.
+    Key rows are written on their own session, so claiming, releasing or
+    completing a key never commits or rolls back the request's transaction.
+    A claim left without a response (the process died before storing it) can
+    be taken over after IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, db: Session):
+        self.bind = db.get_bind()
+
+    def run(self, key: Optional[str], user_internal_id: int, scope: str, payload: Any,
+            execute: Callable[[], BaseModel], status_code: int = 200) -> Tuple[Dict[str, Any], bool]:
+        """Returns (response body, replayed); executes directly when no key is given"""
+        if key is None:
+            return execute().model_dump(mode="json"), False
+        if not key or len(key) > 255:
+            raise BadRequestException("Idempotency-Key must be 1 to 255 characters")
+
+        request_hash = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        stale_after = timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS)
+        with Session(self.bind) as key_db:
+            repository = IdempotencyRepository(key_db)
+            if not repository.claim(user_internal_id, key, scope, request_hash, ttl, stale_after):
+                return self._replay(repository, user_internal_id, key, scope, request_hash), True
+
+            try:
+                response = execute().model_dump(mode="json")
+            except Exception:
+                repository.release(user_internal_id, key)
+                raise
+            try:
+                repository.complete(user_internal_id, key, status_code, response)
+            except Exception as e:
+                # The resource exists; the key stays in progress until the claim goes stale
+                logger.error(f"Could not store the response for Idempotency-Key {key}: {e}")
+            return response, False
+
+    @staticmethod
+    def _replay(repository: IdempotencyRepository, user_internal_id: int, key: str, scope: str,
+                request_hash: str) -> Dict[str, Any]:
+        stored = repository.get(user_internal_id, key)
+        if stored is None:
+            # Released by a failed first attempt in the meantime
+            raise ConflictException("A request with this Idempotency-Key failed; retry it")
+        if stored.scope != scope or stored.request_hash != request_hash:
+            raise BadRequestException("Idempotency-Key was already used for a different request")
+        if stored.response is None:
+            raise ConflictException("A request with this Idempotency-Key is still in progress")
+        return stored.response
+
+
+def prune_idempotency_keys() -> int:
+    """Delete keys past IDEMPOTENCY_KEY_TTL_SECONDS"""
+    from app.core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        deleted = IdempotencyRepository(db).delete_expired()
+        if deleted:
+            logger.info(f"Pruned {deleted} expired idempotency keys")
+        return deleted
+    finally:
+        db.close()
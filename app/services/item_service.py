@@ -2,12 +2,16 @@ from typing import Optional, Dict, Any, List as TypeList
 from sqlalchemy.orm import Session
 from app.repositories.item_repository import ItemRepository
 from app.repositories.list_repository import ListRepository
+from app.repositories.lock_repository import LockRepository
 from app.repositories.project_repository import ProjectRepository
 from app.schemas.item_schema import ItemCreate, ItemUpdate, ItemInDB
-from app.core.exceptions import NotFoundException, LockException, ForbiddenException
+from app.core.config import settings
+from app.core.exceptions import BaseAPIException, NotFoundException, LockException, ForbiddenException, PreconditionFailedException, MergeConflictException
+from app.services.lock_backends import create_lock_backend
 from app.services.notification_service import NotificationService
 from app.services.global_role_service import GlobalRoleService
 from app.models.global_role_model import GlobalRoleType
+from app.utils.etag import format_etag
 
 class ItemService:
     def __init__(self, 
@@ -20,7 +24,7 @@ class ItemService:
         self.item_repository = item_repository
         self.list_repository = list_repository
         self.project_repository = project_repository
-        self.notification_service = NotificationService()
+        self.notification_service = NotificationService(db)
         self.global_role_service = global_role_service
 
     def _check_project_access(self, list_id: int, user_internal_id: int):
@@ -34,12 +38,25 @@ class ItemService:
         
         return db_list
 
-    def _check_lock(self, list_id: int, user_internal_id: int):
-        from app.services.lock_service import LockService
-        lock_service = LockService(self.db)
-        if not lock_service.check_lock(list_id, user_internal_id):
+    def _check_write_access(self, list_id: int, user_internal_id: int):
+        """Project access and the list lock from get_for_write, which keeps the list row locked until the write commits"""
+        row = self.list_repository.get_for_write(list_id, user_internal_id)
+        if not row:
+            raise NotFoundException("List not found")
+        db_list, is_member, holder_id = row
+        if not is_member:
+            self.db.rollback()
+            raise ForbiddenException("You don't have access to this project")
+
+        if settings.LOCK_BACKEND != "table":
+            lock = create_lock_backend(LockRepository(self.db)).get(list_id)
+            holder_id = lock.holder_id if lock else None
+        if holder_id is not None and holder_id != user_internal_id:
+            self.db.rollback()
             raise LockException("List is locked by another user")
 
+        return db_list
+
     def get_items_by_list(self, list_id: int, user_internal_id: int) -> TypeList[ItemInDB]:
         self._check_project_access(list_id, user_internal_id)
         
@@ -47,11 +64,15 @@ class ItemService:
         return [ItemInDB.model_validate(item) for item in items]
     
     def create_item(self, list_id: int, item_create: ItemCreate, user_internal_id: int) -> ItemInDB:
-        self._check_project_access(list_id, user_internal_id)
+        db_list = self._check_write_access(list_id, user_internal_id)
         
         item_data = item_create.model_dump(exclude_unset=True)
-        new_item = self.item_repository.create(list_id, item_data)
-        return ItemInDB.model_validate(new_item)
+        new_item = ItemInDB.model_validate(self.item_repository.create(list_id, item_data))
+        self.notification_service.notify_item_change(
+            db_list.project_id, list_id, new_item.id, "created", user_internal_id, {"item": new_item.model_dump(mode="json")},
+            list_name=db_list.name, item_name=new_item.name
+        )
+        return new_item
 
     def get_item(self, list_id: int, item_id: int, user_internal_id: int) -> ItemInDB:
         self._check_project_access(list_id, user_internal_id)
@@ -68,34 +89,70 @@ class ItemService:
         items = self.item_repository.get_all_by_list(list_id)
         return [ItemInDB.model_validate(item) for item in items]
 
-    def update_item(self, list_id: int, item_id: int, item_update: ItemUpdate, user_internal_id: int) -> ItemInDB:
-        self._check_project_access(list_id, user_internal_id)
-        
-        current_item = self.item_repository.get_by_id(list_id, item_id)
-        if not current_item:
-            raise NotFoundException("Item not found")
-        
+    def update_item(self, list_id: int, item_id: int, item_update: ItemUpdate, user_internal_id: int,
+                    expected_version: Optional[int] = None, base_version: Optional[int] = None) -> ItemInDB:
+        """
+        Update an item. With expected_version (from If-Match) any newer edit
+        raises PreconditionFailedException. With base_version (the version the
+        client edited from) edits of other fields are merged and only fields
+        changed by someone else since then raise MergeConflictException.
+        """
+        db_list = self._check_write_access(list_id, user_internal_id)
         update_data = item_update.model_dump(exclude_unset=True)
+        try:
+            current_item = self.item_repository.get_by_id(list_id, item_id)
+            if not current_item:
+                raise NotFoundException("Item not found")
 
-        user_global_role = self.global_role_service.get_role(user_internal_id)
-        if user_global_role:
-            if user_global_role.role_type == GlobalRoleType.CLIENT:
-                for field in update_data:
-                    if field != "price":
-                        raise ForbiddenException("Clients can only update item prices.")
-            elif user_global_role.role_type == GlobalRoleType.WORKER:
-                for field in update_data:
-                    if field not in ["quantity", "approved", "bought", "delivered"]:
-                        raise ForbiddenException("Workers can only update item quantity and status fields (approved, bought, delivered).")
-        
-        updated_item = self.item_repository.update(item_id, update_data)
+            user_global_role = self.global_role_service.get_role(user_internal_id)
+            if user_global_role:
+                if user_global_role.role_type == GlobalRoleType.CLIENT:
+                    for field in update_data:
+                        if field != "price":
+                            raise ForbiddenException("Clients can only update item prices.")
+                elif user_global_role.role_type == GlobalRoleType.WORKER:
+                    for field in update_data:
+                        if field not in ["quantity", "approved", "bought", "delivered"]:
+                            raise ForbiddenException("Workers can only update item quantity and status fields (approved, bought, delivered).")
+        except BaseAPIException:
+            # Frees the list row taken by _check_write_access
+            self.db.rollback()
+            raise
+
+        updated_item = self.item_repository.update(
+            item_id, update_data, expected_version=expected_version, base_version=base_version
+        )
         if not updated_item:
+            self._raise_stale(list_id, item_id, update_data, base_version)
+        item = ItemInDB.model_validate(updated_item)
+        self.notification_service.notify_item_change(
+            db_list.project_id, list_id, item_id, "updated", user_internal_id, {"item": item.model_dump(mode="json")},
+            list_name=db_list.name, item_name=item.name, changes=update_data
+        )
+        return item
+
+    def _raise_stale(self, list_id: int, item_id: int, update_data: Dict[str, Any], base_version: Optional[int]):
+        current_item = self.item_repository.get_by_id(list_id, item_id)
+        if not current_item:
             raise NotFoundException("Item not found")
-        return ItemInDB.model_validate(updated_item)
+        current = ItemInDB.model_validate(current_item)
+        if base_version is not None:
+            conflicts = self.item_repository.conflicting_fields(current_item, update_data, base_version)
+            raise MergeConflictException(
+                f"Conflicting changes to: {', '.join(conflicts)}",
+                data={"item": current.model_dump(mode="json"), "conflicting_fields": conflicts},
+                etag=format_etag(current.version),
+            )
+        raise PreconditionFailedException(
+            "Item was modified by someone else", data=current.model_dump(mode="json"), etag=format_etag(current.version)
+        )
 
     def delete_item(self, list_id: int, item_id: int, user_internal_id: int) -> Dict[str, str]:
-        self._check_project_access(list_id, user_internal_id)
+        db_list = self._check_write_access(list_id, user_internal_id)
         success = self.item_repository.delete(list_id, item_id)
         if not success:
             raise NotFoundException("Item not found")
+        self.notification_service.notify_item_change(
+            db_list.project_id, list_id, item_id, "deleted", user_internal_id, list_name=db_list.name
+        )
         return {"message": "Item deleted successfully"}
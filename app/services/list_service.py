@@ -4,10 +4,15 @@ from sqlalchemy.orm import Session
 from app.repositories.list_repository import ListRepository
 from app.repositories.item_repository import ItemRepository
 from app.repositories.project_repository import ProjectRepository
-from app.schemas.list_schema import ListCreate, ListUpdate, ListInDB
+from app.repositories.lock_repository import LockRepository
+from app.schemas.list_schema import ListCreate, ListUpdate, ListInDB, ListSummary
+from app.schemas.lock_schema import ListLockStatus
 from app.schemas.item_schema import ItemCreate
-from app.core.exceptions import NotFoundException, LockException, ForbiddenException
+from app.core.exceptions import NotFoundException, LockException, ForbiddenException, PreconditionFailedException
+from app.services.notification_service import NotificationService
+from app.services.lock_backends import create_lock_backend
 from app.utils.logger import logger
+from app.utils.etag import format_etag
 from uuid import UUID # Import UUID
 
 class ListService:
@@ -22,6 +27,7 @@ class ListService:
         self.list_repository = list_repository
         self.project_repository = project_repository
         self.item_service = item_service
+        self.notification_service = NotificationService(db)
 
     def create_list(self, list_create: ListCreate, user_internal_id: int, items: Optional[TypeList[ItemCreate]] = None) -> ListInDB:
         project = self.project_repository.get_by_id_for_user(list_create.project_id, user_internal_id)
@@ -52,12 +58,16 @@ class ListService:
         
         return ListInDB.model_validate(response_data)
 
-    def get_all_lists_for_project(self, project_id: int, user_internal_id: int) -> TypeList[ListInDB]:
+    def get_all_lists_for_project(self, project_id: int, user_internal_id: int, include_locks: bool = False) -> TypeList[ListInDB]:
         project = self.project_repository.get_by_id_for_user(project_id, user_internal_id)
         if not project:
             raise ForbiddenException("You don't have access to this project")
 
         db_lists = self.list_repository.get_all_for_project(project_id)
+        locks = {}
+        if include_locks:
+            backend = create_lock_backend(LockRepository(self.db))
+            locks = {lock.list_id: lock for lock in backend.get_for_project(project_id, self.list_repository)}
         
         response_lists = []
         for db_list in db_lists:
@@ -69,8 +79,12 @@ class ListService:
                 'created_at': db_list.created_at,
                 'updated_at': db_list.updated_at,
                 'destination_address': db_list.destination_address,
+                'version': db_list.version,
+                'items_total': db_list.items_total,
                 'items': db_list.items
             }
+            if db_list.id in locks:
+                response_data['lock_status'] = ListLockStatus.model_validate(locks[db_list.id])
             response_lists.append(ListInDB.model_validate(response_data))
 
         return response_lists
@@ -88,12 +102,21 @@ class ListService:
             'created_at': db_list.created_at,
             'updated_at': db_list.updated_at,
             'destination_address': db_list.destination_address,
+            'version': db_list.version,
+            'items_total': db_list.items_total,
             'items': db_list.items
         }
         
         return ListInDB.model_validate(response_data)
 
-    def update_list(self, list_id: int, list_update: ListUpdate, user_internal_id: int) -> ListInDB:
+    def get_list_summary(self, list_id: int, user_internal_id: int) -> ListSummary:
+        if not self.list_repository.get_by_id_for_user(list_id, user_internal_id):
+            raise NotFoundException("List not found or you don't have access")
+        return ListSummary(list_id=list_id, **self.list_repository.get_summary(list_id)._asdict())
+
+    def update_list(self, list_id: int, list_update: ListUpdate, user_internal_id: int,
+                    expected_version: Optional[int] = None) -> ListInDB:
+        """Update a list; with expected_version (from If-Match) a stale edit raises PreconditionFailedException"""
         db_list = self.list_repository.get_by_id_for_user(list_id, user_internal_id)
         if not db_list:
             raise ForbiddenException("You don't have access to this list")
@@ -104,11 +127,18 @@ class ListService:
             raise LockException("List is locked by another user")
         
         update_data = list_update.model_dump(exclude_unset=True)
-        updated_list = self.list_repository.update(list_id, update_data)
+        updated_list = self.list_repository.update(list_id, update_data, expected_version=expected_version)
         
         if not updated_list:
-            raise NotFoundException("List not found")
+            current = self.get_list(list_id, user_internal_id)
+            raise PreconditionFailedException(
+                "List was modified by someone else", data=current.model_dump(mode="json"), etag=format_etag(current.version)
+            )
         
+        self.notification_service.notify_list_change(
+            updated_list.project_id, list_id, "updated", user_internal_id, {"changes": list_update.model_dump(mode="json", exclude_unset=True)},
+            list_name=updated_list.name
+        )
         return ListInDB.model_validate(updated_list)
 
     def delete_list(self, list_id: int, user_internal_id: int) -> Dict[str, str]:
@@ -116,8 +146,11 @@ class ListService:
         if not db_list:
             raise ForbiddenException("You don't have access to this list")
         
+        project_id = db_list.project_id
+        list_name = db_list.name
         success = self.list_repository.delete(list_id)
         if not success:
             raise NotFoundException("List not found")
         
+        self.notification_service.notify_list_change(project_id, list_id, "deleted", user_internal_id, list_name=list_name)
         return {"message": "List deleted successfully", "list_id": str(list_id)}
@@ -0,0 +1,326 @@
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.models.lock_model import Lock
+from app.repositories.list_repository import ListRepository
+from app.repositories.lock_repository import LockRepository
+from app.schemas.lock_schema import LockInDB
+from app.utils.logger import logger
+
+LockState = Union[Lock, LockInDB]
+
+# First key of the two-int advisory lock that guards a list: ASCII "LIST"
+ADVISORY_NAMESPACE = 0x4C495354
+
+
+class LockBackend(ABC):
+    """
+    Where LockService keeps list locks.
+
+    Backends store who holds each list; the FIFO wait queue always lives in
+    the lock_waiters table and is reached through the LockRepository passed in.
+    """
+
+    @abstractmethod
+    def acquire(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockState]:
+        """Take a free or expired lock, or extend one the user already holds"""
+
+    @abstractmethod
+    def renew(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockState]:
+        ...
+
+    @abstractmethod
+    def release(self, list_id: int, user_internal_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    def get(self, list_id: int) -> Optional[LockState]:
+        """The current unexpired lock on a list"""
+
+    @abstractmethod
+    def expire(self) -> List[Tuple[int, int]]:
+        """Drop leases that ran out; returns (list_id, holder_id) for each"""
+
+    def acquire_in_turn(self, list_id: int, user_internal_id: int, ttl: timedelta,
+                        lock_repo: LockRepository) -> Optional[LockState]:
+        """Acquire unless other users are queued ahead of the caller, holding the list row meanwhile"""
+        lock_repo.lock_lists([list_id])
+        try:
+            if lock_repo.has_waiters_ahead(list_id, user_internal_id):
+                return None
+            lock = self.acquire(list_id, user_internal_id, ttl)
+            if lock is not None:
+                lock_repo.dequeue(list_id, user_internal_id)
+            return lock
+        finally:
+            lock_repo.db.commit()
+
+    def hand_over(self, list_id: int, ttl: timedelta, lock_repo: LockRepository) -> Optional[LockState]:
+        """Give a free lock to the first waiter and take them out of the queue"""
+        lock_repo.lock_lists([list_id])
+        try:
+            waiters = lock_repo.get_waiters(list_id)
+            if not waiters:
+                return None
+            lock = self.acquire(list_id, waiters[0].user_id, ttl)
+            if lock is not None and lock.holder_id == waiters[0].user_id:
+                lock_repo.dequeue(list_id, waiters[0].user_id)
+                return lock
+            return None
+        finally:
+            lock_repo.db.commit()
+
+    def acquire_many(self, list_ids: List[int], user_internal_id: int, ttl: timedelta,
+                     lock_repo: LockRepository) -> Optional[List[LockState]]:
+        """All-or-nothing acquire in list_id order; undoes the locks already taken if one fails"""
+        locks = []
+        for list_id in sorted(set(list_ids)):
+            lock = self.acquire_in_turn(list_id, user_internal_id, ttl, lock_repo)
+            if lock is None:
+                for taken in locks:
+                    self.release(taken.list_id, user_internal_id)
+                return None
+            locks.append(lock)
+        return locks
+
+    def release_many(self, list_ids: List[int], user_internal_id: int) -> List[int]:
+        """Release the user's locks among the lists; returns the released list ids"""
+        return [list_id for list_id in sorted(set(list_ids)) if self.release(list_id, user_internal_id)]
+
+    def get_for_project(self, project_id: int, list_repo: ListRepository) -> List[LockState]:
+        """Current locks on every list of a project, ordered by list_id"""
+        locks = [self.get(db_list.id) for db_list in list_repo.get_all_for_project(project_id)]
+        return sorted((lock for lock in locks if lock is not None), key=lambda lock: lock.list_id)
+
+
+class TableLockBackend(LockBackend):
+    """Default: lease rows in the locks table; works across any number of workers"""
+
+    def __init__(self, lock_repo: LockRepository):
+        self.lock_repo = lock_repo
+
+    def acquire(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[Lock]:
+        return self.lock_repo.acquire_lock(list_id, user_internal_id, ttl)
+
+    def renew(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[Lock]:
+        return self.lock_repo.renew_lock(list_id, user_internal_id, ttl)
+
+    def release(self, list_id: int, user_internal_id: int) -> bool:
+        return self.lock_repo.release_lock(list_id, user_internal_id)
+
+    def get(self, list_id: int) -> Optional[Lock]:
+        return self.lock_repo.get_lock_by_list_id(list_id)
+
+    def expire(self) -> List[Tuple[int, int]]:
+        return self.lock_repo.delete_expired()
+
+    def acquire_in_turn(self, list_id: int, user_internal_id: int, ttl: timedelta,
+                        lock_repo: LockRepository) -> Optional[Lock]:
+        # The upsert already checks the queue and dequeues the caller
+        return self.lock_repo.acquire_lock(list_id, user_internal_id, ttl)
+
+    def hand_over(self, list_id: int, ttl: timedelta, lock_repo: LockRepository) -> Optional[Lock]:
+        return self.lock_repo.hand_over(list_id, ttl)
+
+    def acquire_many(self, list_ids: List[int], user_internal_id: int, ttl: timedelta,
+                     lock_repo: LockRepository) -> Optional[List[Lock]]:
+        return self.lock_repo.acquire_many(list_ids, user_internal_id, ttl)
+
+    def release_many(self, list_ids: List[int], user_internal_id: int) -> List[int]:
+        return self.lock_repo.release_many(list_ids, user_internal_id)
+
+    def get_for_project(self, project_id: int, list_repo: ListRepository) -> List[Lock]:
+        return self.lock_repo.get_for_project(project_id)
+
+
+class _LeaseTable:
+    """Process-local holder records with lease expiry, shared by the non-table backends"""
+
+    def __init__(self):
+        self.locks: Dict[int, LockInDB] = {}
+        self.mutex = threading.RLock()
+
+    def current(self, list_id: int) -> Optional[LockInDB]:
+        lock = self.locks.get(list_id)
+        if lock is not None and lock.expires_at < datetime.utcnow():
+            return None
+        return lock
+
+    def grant(self, list_id: int, user_internal_id: int, ttl: timedelta,
+              expired: Optional[LockInDB] = None) -> LockInDB:
+        """Record the lease; `expired` is a lapsed lease the caller already removed from the table"""
+        now = datetime.utcnow()
+        stale = expired or self.locks.get(list_id)
+        previous = self.current(list_id)
+        acquired_at = previous.acquired_at if previous is not None else now
+        taken_over_from = None
+        if previous is None and stale is not None and stale.holder_id != user_internal_id:
+            taken_over_from = (stale.holder_id, stale.expires_at)
+        lock = LockInDB(id=list_id, list_id=list_id, holder_id=user_internal_id, acquired_at=acquired_at,
+                        expires_at=now + ttl, created_at=acquired_at, updated_at=now, taken_over_from=taken_over_from)
+        self.locks[list_id] = lock
+        return lock
+
+    def expired(self) -> List[Tuple[int, int]]:
+        now = datetime.utcnow()
+        return [(list_id, lock.holder_id) for list_id, lock in self.locks.items() if lock.expires_at < now]
+
+
+class InMemoryLockBackend(LockBackend):
+    """Locks in a dict; for a single worker process and for SQLite/test runs"""
+
+    def __init__(self):
+        self._leases = _LeaseTable()
+
+    def acquire(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockInDB]:
+        with self._leases.mutex:
+            current = self._leases.current(list_id)
+            if current is not None and current.holder_id != user_internal_id:
+                return None
+            return self._leases.grant(list_id, user_internal_id, ttl)
+
+    def renew(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockInDB]:
+        with self._leases.mutex:
+            current = self._leases.current(list_id)
+            if current is None or current.holder_id != user_internal_id:
+                return None
+            return self._leases.grant(list_id, user_internal_id, ttl)
+
+    def release(self, list_id: int, user_internal_id: int) -> bool:
+        with self._leases.mutex:
+            lock = self._leases.locks.get(list_id)
+            if lock is None or lock.holder_id != user_internal_id:
+                return False
+            del self._leases.locks[list_id]
+            return True
+
+    def get(self, list_id: int) -> Optional[LockInDB]:
+        return self._leases.current(list_id)
+
+    def expire(self) -> List[Tuple[int, int]]:
+        with self._leases.mutex:
+            expired = self._leases.expired()
+            for list_id, _ in expired:
+                del self._leases.locks[list_id]
+            return expired
+
+
+class AdvisoryLockBackend(LockBackend):
+    """
+    Session-level pg_try_advisory_lock keyed by list_id, on one dedicated
+    connection per process.
+
+    Mutual exclusion between workers comes from Postgres; no rows are written.
+    The holder is published as a second advisory lock on (list_id << 32 | user_id),
+    which other workers read from pg_locks. Leases are tracked by the process that
+    took the lock, and all locks of a process vanish with its connection if it
+    dies. A lock can only be renewed or released by the process that holds it,
+    so use sticky routing (or the WebSocket channel) with more than one worker.
+    A lock held by another process is reported without acquired_at/expires_at.
+    """
+
+    def __init__(self, connect: Callable[[], Any]):
+        self.connect = connect
+        self._connection = None
+        self._leases = _LeaseTable()
+
+    def _execute(self, sql: str, params: Tuple) -> Any:
+        if self._connection is None or self._connection.closed:
+            self._connection = self.connect()
+            self._connection.autocommit = True
+        with self._connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+    @staticmethod
+    def _holder_key(list_id: int, user_internal_id: int) -> int:
+        return (list_id << 32) | user_internal_id
+
+    def _remote_holder(self, list_id: int) -> Optional[int]:
+        row = self._execute(
+            "SELECT objid::bigint FROM pg_locks "
+            "WHERE locktype = 'advisory' AND objsubid = 1 AND classid = %s::bigint::oid AND granted "
+            "AND database = (SELECT oid FROM pg_database WHERE datname = current_database()) LIMIT 1",
+            (list_id,),
+        )
+        return row[0] if row else None
+
+    def acquire(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockInDB]:
+        with self._leases.mutex:
+            current = self._leases.current(list_id)
+            if current is not None:
+                if current.holder_id != user_internal_id:
+                    return None
+                return self._leases.grant(list_id, user_internal_id, ttl)
+            expired = self._leases.locks.pop(list_id, None)
+            if expired is not None:
+                self._unlock(list_id, expired.holder_id)
+            (acquired,) = self._execute("SELECT pg_try_advisory_lock(%s, %s)", (ADVISORY_NAMESPACE, list_id))
+            if not acquired:
+                return None
+            self._execute("SELECT pg_advisory_lock(%s)", (self._holder_key(list_id, user_internal_id),))
+            return self._leases.grant(list_id, user_internal_id, ttl, expired)
+
+    def renew(self, list_id: int, user_internal_id: int, ttl: timedelta) -> Optional[LockInDB]:
+        with self._leases.mutex:
+            current = self._leases.current(list_id)
+            if current is None or current.holder_id != user_internal_id:
+                return None
+            return self._leases.grant(list_id, user_internal_id, ttl)
+
+    def release(self, list_id: int, user_internal_id: int) -> bool:
+        with self._leases.mutex:
+            lock = self._leases.locks.get(list_id)
+            if lock is None or lock.holder_id != user_internal_id:
+                return False
+            del self._leases.locks[list_id]
+            self._unlock(list_id, user_internal_id)
+            return True
+
+    def get(self, list_id: int) -> Optional[LockInDB]:
+        with self._leases.mutex:
+            current = self._leases.current(list_id)
+            if current is not None or list_id in self._leases.locks:
+                return current
+            holder_id = self._remote_holder(list_id)
+        if holder_id is None:
+            return None
+        # The lease lives in the holding process; only the holder is visible from here
+        return LockInDB(id=list_id, list_id=list_id, holder_id=holder_id, acquired_at=None, expires_at=None)
+
+    def expire(self) -> List[Tuple[int, int]]:
+        with self._leases.mutex:
+            expired = self._leases.expired()
+            for list_id, holder_id in expired:
+                del self._leases.locks[list_id]
+                self._unlock(list_id, holder_id)
+            return expired
+
+    def _unlock(self, list_id: int, user_internal_id: int) -> None:
+        self._execute("SELECT pg_advisory_unlock(%s)", (self._holder_key(list_id, user_internal_id),))
+        self._execute("SELECT pg_advisory_unlock(%s, %s)", (ADVISORY_NAMESPACE, list_id))
+
+
+_shared_backends: Dict[str, LockBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def create_lock_backend(lock_repo: LockRepository, name: Optional[str] = None) -> LockBackend:
+    """Backend named by LOCK_BACKEND; the non-table backends are process-wide singletons"""
+    name = name or settings.LOCK_BACKEND
+    if name == "table":
+        return TableLockBackend(lock_repo)
+    with _shared_lock:
+        if name not in _shared_backends:
+            if name == "memory":
+                _shared_backends[name] = InMemoryLockBackend()
+            elif name == "advisory":
+                from app.core.db import create_raw_connection
+                _shared_backends[name] = AdvisoryLockBackend(create_raw_connection)
+            else:
+                raise ValueError(f"Unknown LOCK_BACKEND: {name}")
+            logger.info(f"Using {name} lock backend")
+        return _shared_backends[name]
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import Histogram, MetricsRegistry, metrics
+
+HOLD_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+WAIT_BUCKETS = (0, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+
+class _Contention:
+    """Hold and failed-acquire histograms for one list or project"""
+
+    def __init__(self):
+        self.hold_seconds = Histogram(HOLD_BUCKETS)
+        self.failed_wait_seconds = Histogram(WAIT_BUCKETS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"hold_seconds": self.hold_seconds.snapshot(), "failed_acquire_wait_seconds": self.failed_wait_seconds.snapshot()}
+
+
+class LockMetrics:
+    """
+    Lock contention statistics.
+
+    Holds are tracked from lock.* events, which every worker receives, so hold
+    durations and the held count cover locks taken in any process. Failed
+    acquires are recorded by the process that refused them. Per-list and
+    per-project histograms are kept for at most `max_tracked` keys each.
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics, long_hold_seconds: Optional[float] = None,
+                 top_n: Optional[int] = None, max_tracked: Optional[int] = None):
+        self.long_hold_seconds = long_hold_seconds if long_hold_seconds is not None else settings.LOCK_LONG_HOLD_SECONDS
+        self.top_n = top_n if top_n is not None else settings.LOCK_METRICS_TOP_N
+        self.max_tracked = max_tracked if max_tracked is not None else settings.LOCK_METRICS_MAX_TRACKED
+        self.hold_seconds = registry.histogram("lock_hold_seconds", HOLD_BUCKETS)
+        self.failed_wait_seconds = registry.histogram("lock_failed_acquire_wait_seconds", WAIT_BUCKETS)
+        self.failed_acquires = registry.counter("lock_failed_acquires")
+        # list_id -> (project_id, holder_id, held since)
+        self._held: Dict[int, Tuple[int, int, float]] = {}
+        self._reported = set()
+        self._by_list: Dict[int, _Contention] = {}
+        self._by_project: Dict[int, _Contention] = {}
+        self._failures_by_list: Dict[int, int] = {}
+        self._mutex = threading.Lock()
+        registry.register("locks", self)
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Event hub listener for lock.acquired, lock.released and lock.expired"""
+        if not event["type"].startswith("lock."):
+            return
+        list_id, holder_id = event["data"].get("list_id"), event["data"].get("user_internal_id")
+        now = event.get("published_at", time.time())
+        if "expires_at" in event["data"]:
+            # A lease taken over after it lapsed was held until its expiry, not until the takeover
+            expired = datetime.fromisoformat(event["data"]["expires_at"]).replace(tzinfo=timezone.utc).timestamp()
+            now = min(now, expired)
+        with self._mutex:
+            if event["type"] == "lock.acquired":
+                held = self._held.get(list_id)
+                if held is None or held[1] != holder_id:
+                    self._held[list_id] = (event["project_id"], holder_id, now)
+                    self._reported.discard(list_id)
+                return
+            held = self._held.pop(list_id, None)
+            self._reported.discard(list_id)
+        if held is not None:
+            self._record_hold(list_id, held, max(now - held[2], 0.0), event["type"])
+
+    def record_failed_acquire(self, list_id: int, waited_seconds: float = 0.0, project_id: Optional[int] = None) -> None:
+        """An acquire that was refused after queueing for `waited_seconds`; the project defaults to the holder's"""
+        self.failed_acquires.inc()
+        self.failed_wait_seconds.observe(waited_seconds)
+        with self._mutex:
+            if project_id is None:
+                project_id = self._held.get(list_id, (None,))[0]
+            if list_id in self._failures_by_list or len(self._failures_by_list) < self.max_tracked:
+                self._failures_by_list[list_id] = self._failures_by_list.get(list_id, 0) + 1
+            for contention in self._tracked(list_id, project_id):
+                contention.failed_wait_seconds.observe(waited_seconds)
+
+    def report_long_holds(self) -> int:
+        """Log each lock held past LOCK_LONG_HOLD_SECONDS once; returns how many were logged"""
+        now = time.time()
+        with self._mutex:
+            long_held = [
+                (list_id, held) for list_id, held in self._held.items()
+                if list_id not in self._reported and now - held[2] >= self.long_hold_seconds
+            ]
+            self._reported.update(list_id for list_id, _ in long_held)
+        for list_id, (project_id, holder_id, since) in long_held:
+            logger.warning(f"Lock on list {list_id} (project {project_id}) held by user {holder_id} for {now - since:.0f}s")
+        return len(long_held)
+
+    def held_count(self) -> int:
+        return len(self._held)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._mutex:
+            hottest = sorted(self._failures_by_list.items(), key=lambda entry: entry[1], reverse=True)[:self.top_n]
+            return {
+                "held": len(self._held),
+                "top_contended_lists": [
+                    {"list_id": list_id, "failed_acquires": failures, **self._by_list[list_id].snapshot()}
+                    for list_id, failures in hottest if list_id in self._by_list
+                ],
+                "by_project": {project_id: contention.snapshot() for project_id, contention in self._by_project.items()},
+            }
+
+    def _record_hold(self, list_id: int, held: Tuple[int, int, float], seconds: float, ended_by: str) -> None:
+        project_id, holder_id, _ = held
+        self.hold_seconds.observe(seconds)
+        with self._mutex:
+            for contention in self._tracked(list_id, project_id):
+                contention.hold_seconds.observe(seconds)
+        if seconds >= self.long_hold_seconds:
+            logger.warning(f"Lock on list {list_id} was held by user {holder_id} for {seconds:.0f}s ({ended_by})")
+
+    def _tracked(self, list_id: int, project_id: int):
+        """Histograms for the list and its project; keys past max_tracked only count globally"""
+        for index, key in ((self._by_list, list_id), (self._by_project, project_id)):
+            if key is None:
+                continue
+            contention = index.get(key)
+            if contention is None and len(index) < self.max_tracked:
+                contention = index[key] = _Contention()
+            if contention is not None:
+                yield contention
+
+
+lock_metrics = LockMetrics()
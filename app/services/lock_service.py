@@ -1,10 +1,14 @@
 from app.repositories.lock_repository import LockRepository
 from app.repositories.list_repository import ListRepository
 from app.repositories.project_repository import ProjectRepository
-from typing import Optional, Dict, Any
-from app.core.exceptions import LockException, NotFoundException, ForbiddenException
+from datetime import timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.config import settings
+from app.core.exceptions import LockException, NotFoundException, ForbiddenException, BadRequestException
 from .notification_service import NotificationService
-from app.models.lock_model import Lock
+from .lock_backends import LockBackend, LockState, create_lock_backend
+from .lock_metrics import lock_metrics
+from app.schemas.lock_schema import LockSetRequest
 from app.utils.logger import logger
 from sqlalchemy.orm import Session
 
@@ -14,13 +18,15 @@ class LockService:
         db: Session, 
         lock_repo: Optional[LockRepository] = None,
         list_repo: Optional[ListRepository] = None,
-        project_repo: Optional[ProjectRepository] = None
+        project_repo: Optional[ProjectRepository] = None,
+        backend: Optional[LockBackend] = None
     ):
         self.db = db
         self.lock_repo = lock_repo or LockRepository(db)
         self.list_repo = list_repo or ListRepository(db)
         self.project_repo = project_repo or ProjectRepository(db)
-        self.notification_service = NotificationService()
+        self.backend = backend or create_lock_backend(self.lock_repo)
+        self.notification_service = NotificationService(db)
     
     def _check_project_access(self, list_id: int, user_internal_id: int):
         db_list = self.list_repo.get_by_id(list_id)
@@ -33,15 +39,19 @@ class LockService:
         
         return db_list
 
-    def acquire_lock(self, list_id: int, user_internal_id: int) -> Optional[Lock]:
+    def acquire_lock(self, list_id: int, user_internal_id: int, record_failure: bool = True) -> Optional[LockState]:
+        """Take the lock or raise LockException; pass record_failure=False when the caller will queue instead"""
         try:
-            self._check_project_access(list_id, user_internal_id)
+            db_list = self._check_project_access(list_id, user_internal_id)
             
-            lock = self.lock_repo.acquire_lock(list_id, user_internal_id) # Pass user_internal_id
+            lock = self.backend.acquire_in_turn(list_id, user_internal_id, self._ttl(), self.lock_repo)
             if lock:
-                self.notification_service.notify_lock_acquired(list_id, user_internal_id)
+                self._announce_takeover(db_list.project_id, lock)
+                self.notification_service.notify_lock_acquired(db_list.project_id, list_id, user_internal_id)
                 return lock
             else:
+                if record_failure:
+                    lock_metrics.record_failed_acquire(list_id, project_id=db_list.project_id)
                 raise LockException("List is already locked by another user")
                 
         except (ForbiddenException, NotFoundException, LockException):
@@ -50,13 +60,71 @@ class LockService:
             logger.error(f"Unexpected error acquiring lock on list {list_id}: {str(e)}")
             raise LockException(f"Lock acquisition failed: {str(e)}")
 
+    def enqueue(self, list_id: int, user_internal_id: int, wait_seconds: float) -> Tuple[Optional[LockState], int]:
+        """
+        Join the FIFO queue for the list lock. Returns the lock if it could be
+        handed over right away, otherwise None and the caller's queue position.
+        """
+        db_list = self._check_project_access(list_id, user_internal_id)
+        self.lock_repo.enqueue(list_id, user_internal_id, timedelta(seconds=wait_seconds))
+        lock = self._hand_over(list_id, db_list.project_id)
+        if lock is not None and lock.holder_id == user_internal_id:
+            return lock, 0
+        return None, self.lock_repo.queue_position(list_id, user_internal_id)
+
+    def leave_queue(self, list_id: int, user_internal_id: int) -> Tuple[Optional[LockState], int]:
+        """Stop waiting; returns the lock if it was handed over in the meantime, else the position given up"""
+        position = self.lock_repo.dequeue(list_id, user_internal_id)
+        lock = self.backend.get(list_id)
+        if lock is not None and lock.holder_id == user_internal_id:
+            return lock, 0
+        return None, position
+
+    def get_queue(self, list_id: int, user_internal_id: int) -> Dict[str, Any]:
+        """Current holder and the unexpired waiters in FIFO order"""
+        self._check_project_access(list_id, user_internal_id)
+        lock = self.backend.get(list_id)
+        waiters = self.lock_repo.get_waiters(list_id)
+        return {
+            "list_id": list_id,
+            "holder_id": lock.holder_id if lock else None,
+            "expires_at": lock.expires_at if lock else None,
+            "waiters": [
+                {"user_internal_id": waiter.user_id, "position": position, "deadline": waiter.deadline}
+                for position, waiter in enumerate(waiters, start=1)
+            ],
+        }
+
+    def _hand_over(self, list_id: int, project_id: int) -> Optional[LockState]:
+        """Pass a free lock to the next waiter; the lock.acquired event wakes their request"""
+        lock = self.backend.hand_over(list_id, self._ttl(), self.lock_repo)
+        if lock is not None:
+            self._announce_takeover(project_id, lock)
+            self.notification_service.notify_lock_acquired(project_id, list_id, lock.holder_id, handed_over=True)
+        return lock
+
+    def _announce_takeover(self, project_id: int, lock: LockState) -> None:
+        """An acquire that replaced an expired, unswept lease ends that lease the way the sweeper would"""
+        if lock.taken_over_from is not None:
+            holder_id, expires_at = lock.taken_over_from
+            self.notification_service.notify_lock_expired(project_id, lock.list_id, holder_id, expires_at)
+
+    def renew_lock(self, list_id: int, user_internal_id: int) -> LockState:
+        """Extend the lease on a lock the user still holds"""
+        self._check_project_access(list_id, user_internal_id)
+        lock = self.backend.renew(list_id, user_internal_id, self._ttl())
+        if not lock:
+            raise LockException("Lock not held by current user or already expired")
+        return lock
+
     def release_lock(self, list_id: int, user_internal_id: int) -> Dict[str, Any]:
         try:
-            self._check_project_access(list_id, user_internal_id)
+            db_list = self._check_project_access(list_id, user_internal_id)
             
-            success = self.lock_repo.release_lock(list_id, user_internal_id) # Pass user_internal_id
+            success = self.backend.release(list_id, user_internal_id)
             if success:
-                self.notification_service.notify_lock_released(list_id, user_internal_id)
+                self.notification_service.notify_lock_released(db_list.project_id, list_id, user_internal_id)
+                self._hand_over(list_id, db_list.project_id)
                 return {"status": "success", "message": "Lock released successfully"}
             else:
                 raise ForbiddenException("Lock not held by current user or not found")
@@ -67,11 +135,68 @@ class LockService:
             logger.error(f"Unexpected error releasing lock on list {list_id}: {str(e)}")
             return {"status": "error", "message": f"Lock release failed: {str(e)}"}
 
+    def _resolve_lock_set(self, selection: LockSetRequest, user_internal_id: int):
+        """The lists picked by a LockSetRequest, after checking project access for all of them"""
+        selectors = [selection.list_ids, selection.step_id, selection.project_id]
+        if sum(selector is not None for selector in selectors) != 1:
+            raise BadRequestException("Give exactly one of list_ids, step_id or project_id")
+
+        if selection.list_ids is not None:
+            lists = self.list_repo.get_by_ids(selection.list_ids)
+            if len(lists) != len(set(selection.list_ids)):
+                raise NotFoundException("List not found")
+        elif selection.step_id is not None:
+            lists = self.list_repo.get_all_in_step_subtree(selection.step_id)
+        else:
+            lists = sorted(self.list_repo.get_all_for_project(selection.project_id), key=lambda db_list: db_list.id)
+        if not lists:
+            raise NotFoundException("No lists found for the selection")
+
+        accessible = set(self.project_repo.get_project_ids_for_user(user_internal_id))
+        if any(db_list.project_id not in accessible for db_list in lists):
+            raise ForbiddenException("You don't have access to this project")
+        return lists
+
+    def acquire_locks(self, selection: LockSetRequest, user_internal_id: int) -> List[LockState]:
+        """Lock every selected list in one transaction, or none of them"""
+        lists = self._resolve_lock_set(selection, user_internal_id)
+        locks = self.backend.acquire_many([db_list.id for db_list in lists], user_internal_id, self._ttl(), self.lock_repo)
+        if locks is None:
+            for db_list in lists:
+                lock_metrics.record_failed_acquire(db_list.id, project_id=db_list.project_id)
+            blocked = [
+                db_list.id for db_list in lists
+                if self._held_by_other(db_list.id, user_internal_id)
+                or self.lock_repo.has_waiters_ahead(db_list.id, user_internal_id)
+            ]
+            raise LockException(f"Lists are locked or queued for by other users: {blocked}")
+        by_list_id = {lock.list_id: lock for lock in locks}
+        for db_list in lists:
+            self._announce_takeover(db_list.project_id, by_list_id[db_list.id])
+            self.notification_service.notify_lock_acquired(db_list.project_id, db_list.id, user_internal_id)
+        return locks
+
+    def release_locks(self, selection: LockSetRequest, user_internal_id: int) -> List[int]:
+        """Release the user's locks on the selected lists in one statement; returns the released list ids"""
+        lists = self._resolve_lock_set(selection, user_internal_id)
+        released = set(self.backend.release_many([db_list.id for db_list in lists], user_internal_id))
+        for db_list in lists:
+            if db_list.id in released:
+                self.notification_service.notify_lock_released(db_list.project_id, db_list.id, user_internal_id)
+                self._hand_over(db_list.id, db_list.project_id)
+        return sorted(released)
+
+    def get_project_locks(self, project_id: int, user_internal_id: int) -> List[LockState]:
+        """Current locks on all lists of a project in one query"""
+        if not self.project_repo.get_by_id_for_user(project_id, user_internal_id):
+            raise ForbiddenException("You don't have access to this project")
+        return self.backend.get_for_project(project_id, self.list_repo)
+
     def check_lock(self, list_id: int, user_internal_id: int) -> bool:
         try:
             self._check_project_access(list_id, user_internal_id)
             
-            current_lock = self.lock_repo.get_lock_by_list_id(list_id)
+            current_lock = self.backend.get(list_id)
             
             if not current_lock:
                 return True
@@ -86,3 +211,38 @@ class LockService:
         except Exception as e:
             logger.error(f"Unexpected error checking lock on list {list_id}: {str(e)}")
             return False
+
+    @staticmethod
+    def _ttl() -> timedelta:
+        return timedelta(seconds=settings.LOCK_TTL_SECONDS)
+
+    def _held_by_other(self, list_id: int, user_internal_id: int) -> bool:
+        current_lock = self.backend.get(list_id)
+        return current_lock is not None and current_lock.holder_id != user_internal_id
+
+    def is_held_by(self, list_id: int, user_internal_id: int) -> bool:
+        current_lock = self.backend.get(list_id)
+        return current_lock is not None and current_lock.holder_id == user_internal_id
+
+
+def sweep_expired_locks() -> int:
+    """Delete lock rows whose lease has run out and announce them as expired"""
+    from app.core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        lock_service = LockService(db)
+        expired = lock_service.backend.expire()
+        for list_id, holder_id in expired:
+            db_list = lock_service.list_repo.get_by_id(list_id)
+            if db_list is None:
+                continue
+            lock_service.notification_service.notify_lock_expired(db_list.project_id, list_id, holder_id)
+            lock_service._hand_over(list_id, db_list.project_id)
+        lock_service.lock_repo.delete_expired_waiters()
+        lock_metrics.report_long_holds()
+        if expired:
+            logger.info(f"Swept {len(expired)} expired list locks")
+        return len(expired)
+    finally:
+        db.close()
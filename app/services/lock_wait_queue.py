@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.db import SessionLocal
+from app.core.exceptions import LockException
+from app.models.lock_model import Lock
+from app.repositories.user_repository import UserRepository
+from app.schemas.lock_schema import LockInDB
+from app.services.lock_metrics import lock_metrics
+from app.services.lock_service import LockService
+
+
+class LockWaitQueue:
+    """
+    Waits for list locks on the event loop.
+
+    The queue itself lives in the lock_waiters table, so its order survives
+    restarts and is shared by all workers. Each database step runs in its own
+    short session; between steps a waiting request only holds an asyncio
+    future, which is resolved when a lock.acquired event hands the lock over.
+    """
+
+    def __init__(self):
+        self._waiting: Dict[Tuple[int, int], asyncio.Future] = {}
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Event hub listener: wake the request the lock was handed to"""
+        if event["type"] != "lock.acquired":
+            return
+        key = (event["data"].get("list_id"), event["data"].get("user_internal_id"))
+        future = self._waiting.get(key)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def acquire(self, list_id: int, user_external_id: str, wait: float) -> LockInDB:
+        """Acquire the lock, queueing for up to `wait` seconds; raises LockException on timeout"""
+        user_internal_id = await run_in_threadpool(self._run, self._resolve_user, user_external_id)
+        if wait <= 0:
+            return await run_in_threadpool(
+                self._run, lambda db: LockInDB.model_validate(LockService(db).acquire_lock(list_id, user_internal_id))
+            )
+
+        key = (list_id, user_internal_id)
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = future
+        try:
+            lock, position = await run_in_threadpool(self._run, self._try_or_enqueue, list_id, user_internal_id, wait)
+            if lock is not None:
+                return lock
+            try:
+                await asyncio.wait_for(future, timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            lock, position = await run_in_threadpool(self._run, self._leave_queue, list_id, user_internal_id)
+            if lock is not None:
+                return lock
+            lock_metrics.record_failed_acquire(list_id, time.monotonic() - started)
+            raise LockException(f"List is already locked by another user (gave up at queue position {position})")
+        finally:
+            if self._waiting.get(key) is future:
+                del self._waiting[key]
+
+    @staticmethod
+    def _run(operation, *args):
+        db: Session = SessionLocal()
+        try:
+            return operation(db, *args)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _resolve_user(db: Session, user_external_id: str) -> int:
+        return UserRepository(db).get_or_create_by_external_id(user_external_id).internal_id
+
+    @staticmethod
+    def _try_or_enqueue(db: Session, list_id: int, user_internal_id: int, wait: float) -> Tuple[Optional[LockInDB], int]:
+        lock_service = LockService(db)
+        try:
+            lock, position = lock_service.acquire_lock(list_id, user_internal_id, record_failure=False), 0
+        except LockException:
+            lock, position = lock_service.enqueue(list_id, user_internal_id, wait)
+        return _to_schema(lock), position
+
+    @staticmethod
+    def _leave_queue(db: Session, list_id: int, user_internal_id: int) -> Tuple[Optional[LockInDB], int]:
+        lock, position = LockService(db).leave_queue(list_id, user_internal_id)
+        return _to_schema(lock), position
+
+
+def _to_schema(lock: Optional[Lock]) -> Optional[LockInDB]:
+    return LockInDB.model_validate(lock) if lock is not None else None
+
+
+lock_wait_queue = LockWaitQueue()
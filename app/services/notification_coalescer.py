@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+DigestKey = Tuple[int, int, int, str]
+
+
+class PendingDigest:
+    """Item changes of one kind, made by one user in one list, waiting to become a single notification"""
+
+    def __init__(self, project_id: int, list_id: int, list_name: Optional[str], user_id: int,
+                 notification_type: str, action: str, item_name: Optional[str]):
+        self.project_id = project_id
+        self.list_id = list_id
+        self.list_name = list_name
+        self.user_id = user_id
+        self.notification_type = notification_type
+        self.action = action
+        self.item_name = item_name
+        self.count = 1
+        self.first_seen = time.monotonic()
+
+    @property
+    def message(self) -> str:
+        where = self.list_name or "a list"
+        if self.count == 1:
+            subject = f"Item '{self.item_name}'" if self.item_name else "An item"
+            return f"{subject} {self.action} in {where}"
+        return f"{self.count} items {self.action} in {where}"
+
+
+def write_digests(digests: List[PendingDigest]) -> None:
+    """Fan each digest out to the other members of its project in one transaction"""
+    from app.core.db import SessionLocal
+    from app.repositories.notification_repository import NotificationRepository
+
+    db = SessionLocal()
+    try:
+        NotificationRepository(db).create_digests(digests)
+        db.commit()
+    finally:
+        db.close()
+
+
+class NotificationCoalescer:
+    """
+    Merges item notifications for the same list, actor and action that arrive
+    within NOTIFICATION_DIGEST_WINDOW_SECONDS into one digest per recipient.
+
+    Digests are written when the window passes (`flush_expired`, run on a timer),
+    when a digest reaches NOTIFICATION_DIGEST_MAX_EVENTS, or when more than
+    NOTIFICATION_DIGEST_MAX_PENDING digests are buffered.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[List[PendingDigest]], None] = write_digests,
+        window: float = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS,
+        max_events: int = settings.NOTIFICATION_DIGEST_MAX_EVENTS,
+        max_pending: int = settings.NOTIFICATION_DIGEST_MAX_PENDING,
+    ):
+        self.writer = writer
+        self.window = window
+        self.max_events = max_events
+        self.max_pending = max_pending
+        self._pending: Dict[DigestKey, PendingDigest] = {}
+        self._lock = threading.Lock()
+
+    def add(self, project_id: int, list_id: int, list_name: Optional[str], user_id: int,
+            notification_type: str, action: str, item_name: Optional[str] = None) -> None:
+        key = (list_id, user_id, notification_type, action)
+        ready: List[PendingDigest] = []
+        with self._lock:
+            digest = self._pending.get(key)
+            if digest is None:
+                digest = PendingDigest(project_id, list_id, list_name, user_id, notification_type, action, item_name)
+                self._pending[key] = digest
+            else:
+                digest.count += 1
+                digest.list_name = list_name or digest.list_name
+            if self.window <= 0 or digest.count >= self.max_events:
+                ready.append(self._pending.pop(key))
+            elif len(self._pending) > self.max_pending:
+                ready.extend(self._pending.values())
+                self._pending.clear()
+        self._write(ready)
+
+    def flush_expired(self) -> None:
+        """Write every digest whose window has passed"""
+        deadline = time.monotonic() - self.window
+        with self._lock:
+            expired = [key for key, digest in self._pending.items() if digest.first_seen <= deadline]
+            ready = [self._pending.pop(key) for key in expired]
+        self._write(ready)
+
+    def flush(self) -> None:
+        """Write all buffered digests now"""
+        with self._lock:
+            ready = list(self._pending.values())
+            self._pending.clear()
+        self._write(ready)
+
+    def flush_projects(self, project_ids: Collection[int]) -> None:
+        """Write the buffered digests of these projects now; other projects keep their window"""
+        project_ids = set(project_ids)
+        with self._lock:
+            keys = [key for key, digest in self._pending.items() if digest.project_id in project_ids]
+            ready = [self._pending.pop(key) for key in keys]
+        self._write(ready)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _write(self, digests: List[PendingDigest]) -> None:
+        if not digests:
+            return
+        try:
+            self.writer(digests)
+        except Exception as e:
+            logger.error(f"Could not write {len(digests)} notification digests: {e}")
+
+
+notification_coalescer = NotificationCoalescer()
@@ -1,46 +1,142 @@
-from typing import Dict, Any, List
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
 import logging
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.repositories.notification_repository import NotificationRepository
+from app.schemas.notification_schema import NotificationInDB, NotificationPage
+from app.services.event_hub import event_hub
+from app.services.notification_coalescer import notification_coalescer
 
 logger = logging.getLogger(__name__)
 
+STATUS_FIELDS = ("delivered", "bought", "approved")
+
+def describe_item_change(change_type: str, changes: Optional[Dict[str, Any]] = None) -> str:
+    """Short verb phrase for an item change, e.g. "marked delivered" """
+    if change_type == "created":
+        return "added"
+    if change_type == "deleted":
+        return "removed"
+    for field in STATUS_FIELDS:
+        if (changes or {}).get(field):
+            return f"marked {field}"
+    return "updated"
+
 class NotificationService:
-    """Service for handling in-app notifications as mentioned in README"""
-    
-    def __init__(self):
-        self.notifications = []  # In-memory storage for demo
-    
-    def send_notification(self, user_internal_id: int, message: str, notification_type: str = "info") -> Dict[str, Any]:
-        """Send notification to user"""
-        notification = {
-            "id": len(self.notifications) + 1,
-            "user_internal_id": user_internal_id,
-            "message": message,
-            "type": notification_type,
-            "timestamp": "2024-01-01T00:00:00Z",  # Should use datetime.utcnow()
-            "read": False
-        }
-        self.notifications.append(notification)
-        logger.info(f"Notification sent to user {user_internal_id}: {message}")
-        return notification
-    
-    def get_user_notifications(self, user_internal_id: int) -> List[Dict[str, Any]]:
-        """Get all notifications for a user"""
-        return [n for n in self.notifications if n["user_internal_id"] == user_internal_id]
-    
+    """Publishes change events to the live stream and records them in the members' inboxes"""
+
+    def __init__(self, db: Session):
+        self.repository = NotificationRepository(db)
+
+    def get_user_notifications(self, user_internal_id: int, before_id: Optional[int] = None,
+                               limit: int = settings.NOTIFICATION_PAGE_SIZE) -> NotificationPage:
+        """
+        Newest-first page of the user's inbox; pass next_before_id to get the
+        following page. Digests buffered in this process for the user's
+        projects are written first; digests buffered by other workers arrive
+        on their own timer or size thresholds.
+        """
+        notification_coalescer.flush_projects(self.repository.get_member_project_ids(user_internal_id))
+        limit = max(1, min(limit, settings.NOTIFICATION_MAX_PAGE_SIZE))
+        rows = self.repository.get_page_for_user(user_internal_id, before_id, limit)
+        items = [
+            NotificationInDB.model_validate(notification).model_copy(update={"read": read})
+            for notification, read in rows
+        ]
+        next_before_id = items[-1].id if len(items) == limit else None
+        return NotificationPage(items=items, next_before_id=next_before_id)
+
     def mark_as_read(self, notification_id: int, user_internal_id: int) -> bool:
-        """Mark notification as read"""
-        for notification in self.notifications:
-            if notification["id"] == notification_id and notification["user_internal_id"] == user_internal_id:
-                notification["read"] = True
-                return True
-        return False
-
-    def notify_list_change(self, list_id: int, change_type: str):
-        # Implementation needed
-        pass
-
-    def notify_lock_acquired(self, list_id: int, user_id: int):
+        marked = self.repository.mark_read(notification_id, user_internal_id)
+        self.repository.db.commit()
+        return marked
+
+    def mark_all_as_read(self, user_internal_id: int, up_to_id: Optional[int] = None) -> int:
+        """Advance the user's read cursor; everything at or below it counts as read"""
+        last_read_id = self.repository.mark_all_read(user_internal_id, up_to_id)
+        self.repository.db.commit()
+        return last_read_id
+
+    def _record(self, project_id: int, list_id: Optional[int], user_id: int, notification_type: str, message: str):
+        """
+        Fan a notification out to the other project members in a savepoint of
+        the caller's transaction, which commits it; a failure only undoes the
+        savepoint and never fails or ends the calling request's transaction
+        """
+        try:
+            with self.repository.db.begin_nested():
+                self.repository.create_for_project_members(project_id, user_id, notification_type, message, list_id)
+        except Exception as e:
+            logger.error(f"Could not record notification {notification_type} for project {project_id}: {e}")
+
+    def notify_list_change(self, project_id: int, list_id: int, change_type: str, user_id: int,
+                           data: Optional[Dict[str, Any]] = None, list_name: Optional[str] = None):
+        """Publish a list change (created, updated, deleted) to the project's change stream"""
+        event_hub.publish(f"list.{change_type}", project_id, {"list_id": list_id, "user_internal_id": user_id, **(data or {})})
+        self._record(project_id, list_id, user_id, f"list.{change_type}", f"{list_name or 'A list'} was {change_type}")
+
+    def notify_steps_change(self, project_id: int, change_type: str, user_id: int, count: int,
+                            data: Optional[Dict[str, Any]] = None):
+        """One event and one inbox entry for a set-wise step change (imported, copied, moved, deleted)"""
+        event_hub.publish(f"steps.{change_type}", project_id, {"user_internal_id": user_id, **(data or {})})
+        message = f"1 step was {change_type}" if count == 1 else f"{count} steps were {change_type}"
+        self._record(project_id, None, user_id, f"steps.{change_type}", message)
+
+    def notify_item_change(self, project_id: int, list_id: int, item_id: int, change_type: str, user_id: int,
+                           data: Optional[Dict[str, Any]] = None, list_name: Optional[str] = None,
+                           item_name: Optional[str] = None, changes: Optional[Dict[str, Any]] = None):
+        """Publish an item change (created, updated, deleted) to the project's change stream.
+
+        The inbox entry goes through the coalescer, so bursts of similar changes become one digest.
+        """
+        event_hub.publish(
+            f"item.{change_type}",
+            project_id,
+            {"list_id": list_id, "item_id": item_id, "user_internal_id": user_id, **(data or {})},
+        )
+        notification_coalescer.add(
+            project_id, list_id, list_name, user_id, f"item.{change_type}",
+            describe_item_change(change_type, changes), item_name
+        )
+
+    def notify_membership_change(self, project_id: int, change_type: str, user_id: int):
+        """Publish a project membership change (added, removed) for the affected user"""
+        event_hub.publish(f"membership.{change_type}", project_id, {"user_internal_id": user_id})
+        if change_type == "added":
+            try:
+                with self.repository.db.begin_nested():
+                    self.repository.create_for_user(user_id, project_id, "membership.added", "You were added to a project")
+            except Exception as e:
+                logger.error(f"Could not record membership notification for user {user_id}: {e}")
+
+    def notify_lock_acquired(self, project_id: int, list_id: int, user_id: int, handed_over: bool = False):
         logger.info(f"Notification: User {user_id} acquired lock on list {list_id}")
+        event_hub.publish(
+            "lock.acquired", project_id, {"list_id": list_id, "user_internal_id": user_id, "handed_over": handed_over}
+        )
 
-    def notify_lock_released(self, list_id: int, user_id: int):
+    def notify_lock_released(self, project_id: int, list_id: int, user_id: int):
         logger.info(f"Notification: User {user_id} released lock on list {list_id}")
+        event_hub.publish("lock.released", project_id, {"list_id": list_id, "user_internal_id": user_id})
+
+    def notify_lock_expired(self, project_id: int, list_id: int, user_id: int, expires_at: Optional[datetime] = None):
+        logger.info(f"Notification: Lock of user {user_id} on list {list_id} expired")
+        data = {"list_id": list_id, "user_internal_id": user_id}
+        if expires_at is not None:
+            data["expires_at"] = expires_at.isoformat()
+        event_hub.publish("lock.expired", project_id, data)
+
+def prune_old_notifications() -> int:
+    """Delete inbox entries older than NOTIFICATION_RETENTION_DAYS"""
+    from app.core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        deleted = NotificationRepository(db).delete_older_than(timedelta(days=settings.NOTIFICATION_RETENTION_DAYS))
+        db.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} notifications older than {settings.NOTIFICATION_RETENTION_DAYS} days")
+        return deleted
+    finally:
+        db.close()
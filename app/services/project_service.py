@@ -6,11 +6,13 @@ from app.schemas.project_schema import ProjectCreate, ProjectUpdate, Project as
 from app.models.project_model import Project
 from app.models.project_user_model import ProjectRoleType
 from app.core.exceptions import NotFoundException, ForbiddenException
+from app.services.notification_service import NotificationService
 
 class ProjectService:
     def __init__(self, db: Session):
         self.repository = ProjectRepository(db)
         self.user_repository = UserRepository(db)
+        self.notification_service = NotificationService(db)
 
     def create_project(self, project: ProjectCreate, user_internal_id: int) -> Project:
         new_project = self.repository.create(obj_in=project.model_dump())
@@ -58,6 +60,7 @@ class ProjectService:
         if not user_to_add:
             raise NotFoundException("User to add not found")
         self.repository.add_user_to_project(project, user_to_add.internal_id, ProjectRoleType.USER) # Pass internal_id
+        self.notification_service.notify_membership_change(project_id, "added", user_to_add.internal_id)
         
         # Re-fetch the project to ensure all relationships are eagerly loaded for Pydantic serialization
         project = self.repository.get_by_id_for_user(project_id, requester_internal_id)
@@ -76,7 +79,8 @@ class ProjectService:
         user_to_remove = self.user_repository.get_by_external_id(user_external_id)
         if not user_to_remove:
             raise NotFoundException("User to remove not found")
-        self.repository.remove_user_from_project(project, user_to_remove.internal_id) # Pass internal_id
+        if self.repository.remove_user_from_project(project, user_to_remove.internal_id):
+            self.notification_service.notify_membership_change(project_id, "removed", user_to_remove.internal_id)
         
         # Re-fetch the project to ensure all relationships are eagerly loaded for Pydantic serialization
         project = self.repository.get_by_id_for_user(project_id, requester_internal_id)
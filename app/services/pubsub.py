@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+Deliver = Callable[[Dict[str, Any]], None]
+
+publish_to_deliver = metrics.histogram("pubsub_publish_to_deliver_seconds")
+published_events = metrics.counter("pubsub_events_published")
+notify_batches = metrics.counter("pubsub_notify_batches")
+resyncs = metrics.counter("pubsub_resyncs")
+
+RESYNC_EVENT = "stream.resync"
+
+
+class PubSubBackend(ABC):
+    """Carries service events to every process that has stream subscribers.
+
+    `publish` may be called from any thread; `deliver` is invoked once per
+    event in each process, from the event loop thread.
+    """
+
+    def __init__(self, deliver: Deliver):
+        self.deliver = deliver
+
+    @abstractmethod
+    def publish(self, event: Dict[str, Any]) -> None:
+        ...
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _received(self, event: Dict[str, Any]) -> None:
+        publish_to_deliver.observe(max(time.time() - event["published_at"], 0.0))
+        self.deliver(event)
+
+    def _resync(self, reason: str) -> None:
+        """Tell every local subscriber that events were lost and state must be refetched"""
+        resyncs.inc()
+        logger.warning(f"Asking stream subscribers to resync: {reason}")
+        self._received({
+            "type": RESYNC_EVENT,
+            "project_id": None,
+            "data": {"reason": reason},
+            "timestamp": datetime.utcnow().isoformat(),
+            "published_at": time.time(),
+        })
+
+
+class InMemoryPubSub(PubSubBackend):
+    """Delivers events inside the current process only; for tests and single-worker runs"""
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        published_events.inc()
+        self._received(event)
+
+
+class PostgresPubSub(PubSubBackend):
+    """Fans events out to all workers through pg_notify / LISTEN.
+
+    A publisher thread batches events that arrive within PUBSUB_BATCH_WINDOW_MS
+    into as few NOTIFY payloads as fit under PUBSUB_MAX_PAYLOAD_BYTES. One
+    listener connection per process is driven by the event loop's reader callback.
+
+    NOTIFY is sent after the writer's commit, so a failed batch loses its
+    events. Each publisher numbers its events; a listener that sees a gap in
+    a publisher's sequence, or has to reconnect, delivers a stream.resync event.
+    """
+
+    def __init__(self, deliver: Deliver, connect: Callable[[], Any], channel: str = settings.PUBSUB_CHANNEL):
+        super().__init__(deliver)
+        self.connect = connect
+        self.channel = channel
+        self._outbox: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._publisher: Optional[threading.Thread] = None
+        self._listener = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._origin = uuid.uuid4().hex
+        self._sequence = itertools.count(1)
+        self._last_seen: Dict[str, int] = {}
+        self._listened = False
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        published_events.inc()
+        self._outbox.put(self._encode({**event, "origin": self._origin, "seq": next(self._sequence)}))
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._publisher = threading.Thread(target=self._publish_loop, name="pubsub-publisher", daemon=True)
+        self._publisher.start()
+        self._listen()
+
+    async def stop(self) -> None:
+        self._outbox.put(None)
+        if self._listener is not None:
+            self._loop.remove_reader(self._listener.fileno())
+            self._listener.close()
+            self._listener = None
+
+    def _encode(self, event: Dict[str, Any]) -> str:
+        payload = json.dumps(event, separators=(",", ":"), default=str)
+        if len(payload.encode()) <= settings.PUBSUB_MAX_PAYLOAD_BYTES:
+            return payload
+        # NOTIFY payloads are capped at 8000 bytes; keep the identifiers and let clients refetch
+        slim = {**event, "data": {key: value for key, value in event["data"].items() if not isinstance(value, (dict, list))}}
+        slim["truncated"] = True
+        return json.dumps(slim, separators=(",", ":"), default=str)
+
+    def _publish_loop(self) -> None:
+        connection = None
+        while True:
+            payload = self._outbox.get()
+            if payload is None:
+                break
+            batch = [payload]
+            deadline = time.monotonic() + settings.PUBSUB_BATCH_WINDOW_MS / 1000
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    payload = self._outbox.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if payload is None:
+                    self._outbox.put(None)
+                    break
+                batch.append(payload)
+            try:
+                connection = connection or self._connect()
+                self._notify(connection, batch)
+            except Exception as e:
+                logger.error(f"pg_notify failed, dropping {len(batch)} events: {e}")
+                connection = None
+        if connection is not None:
+            connection.close()
+
+    def _notify(self, connection, batch: List[str]) -> None:
+        """Pack payloads into JSON arrays under the size cap and send them in one statement"""
+        chunks: List[str] = []
+        current: List[str] = []
+        size = 2
+        for payload in batch:
+            length = len(payload.encode()) + 1
+            if current and size + length > settings.PUBSUB_MAX_PAYLOAD_BYTES:
+                chunks.append("[" + ",".join(current) + "]")
+                current, size = [], 2
+            current.append(payload)
+            size += length
+        chunks.append("[" + ",".join(current) + "]")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, chunk) FROM unnest(%s::text[]) WITH ORDINALITY AS c(chunk, n) ORDER BY n",
+                (self.channel, chunks),
+            )
+        notify_batches.inc(len(chunks))
+
+    def _connect(self):
+        connection = self.connect()
+        connection.autocommit = True
+        return connection
+
+    def _listen(self) -> None:
+        try:
+            self._listener = self._connect()
+            with self._listener.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            self._loop.add_reader(self._listener.fileno(), self._on_readable)
+            logger.info(f"Listening for events on channel {self.channel}")
+            if self._listened:
+                # Anything published while the listener was down never reached this process
+                self._last_seen.clear()
+                self._resync("event listener reconnected")
+            self._listened = True
+        except Exception as e:
+            logger.error(f"Could not start event listener, retrying: {e}")
+            self._listener = None
+            self._loop.call_later(1.0, self._listen)
+
+    def _on_readable(self) -> None:
+        try:
+            self._listener.poll()
+        except Exception as e:
+            logger.error(f"Event listener connection lost, reconnecting: {e}")
+            self._loop.remove_reader(self._listener.fileno())
+            self._listener = None
+            self._loop.call_later(1.0, self._listen)
+            return
+        while self._listener.notifies:
+            notification = self._listener.notifies.pop(0)
+            for event in json.loads(notification.payload):
+                self._check_sequence(event)
+                self._received(event)
+
+    def _check_sequence(self, event: Dict[str, Any]) -> None:
+        origin, seq = event["origin"], event["seq"]
+        last = self._last_seen.get(origin)
+        self._last_seen[origin] = seq
+        if last is not None and seq != last + 1:
+            self._resync(f"missed {seq - last - 1} events from another worker")
+
+
+def create_backend(deliver: Deliver) -> PubSubBackend:
+    if settings.PUBSUB_BACKEND == "postgres":
+        from app.core.db import create_raw_connection
+        return PostgresPubSub(deliver, create_raw_connection)
+    if settings.PUBSUB_BACKEND == "memory":
+        return InMemoryPubSub(deliver)
+    raise ValueError(f"Unknown PUBSUB_BACKEND: {settings.PUBSUB_BACKEND}")
@@ -0,0 +1,16 @@
+from app.repositories.rollup_repository import RollupRepository
+from app.utils.logger import logger
+
+
+def reconcile_rollups() -> int:
+    """Recompute list, step and project totals and fix any that drifted from the items and steps"""
+    from app.core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        fixed = RollupRepository(db).reconcile()
+        if fixed:
+            logger.warning(f"Reconciled {fixed} drifted cost rollups")
+        return fixed
+    finally:
+        db.close()
@@ -0,0 +1,214 @@
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, ConflictException, NotFoundException
+from app.repositories.project_repository import ProjectRepository
+from app.repositories.step_dependency_repository import StepDependencyRepository
+from app.schemas.timeline_schema import CostBin, DateBin, ProjectSimulation
+from app.services.step_tree_cache import simulation_cache
+from app.services.timeline_service import days_between, event_graph, schedule_anchor, topological_order
+
+
+class SimulationPlan(NamedTuple):
+    """
+    A project's schedule reduced to what a trial needs. Events are numbered as
+    in timeline_service.event_graph; outgoing leaves out each step's own
+    start -> finish edge, whose length is sampled per trial instead.
+    """
+    order: List[int]
+    outgoing: List[List[Tuple[int, float]]]
+    release: List[float]
+    durations: List[float]
+    sampled_steps: List[int]
+    fixed_cost: float
+    estimates: List[Tuple[float, float]]
+
+
+class SimulationService:
+    def __init__(self, db: Session):
+        self.repository = StepDependencyRepository(db)
+        self.project_repository = ProjectRepository(db)
+
+    def simulate_project(self, project_id: int, user_internal_id: int, trials: Optional[int] = None) -> ProjectSimulation:
+        """
+        Monte-Carlo finish date and final cost. Unfinished steps draw their
+        duration and cost ratios from finished steps across all projects;
+        finished steps keep their actual dates and totals. Seeded by project
+        and generation, and cached until the project's rollup_generation changes.
+        At most SIMULATION_MAX_TRIALS trials, whoever the caller is.
+        """
+        if trials is not None and not 1 <= trials <= settings.SIMULATION_MAX_TRIALS:
+            raise BadRequestException(f"trials must be between 1 and {settings.SIMULATION_MAX_TRIALS}")
+        project = self.project_repository.get_by_id_for_user(project_id, user_internal_id)
+        if not project:
+            raise NotFoundException("Project not found or you don't have access")
+        trials = trials or settings.SIMULATION_TRIALS
+
+        key = (project.rollup_generation, trials)
+        simulation = simulation_cache.get(project_id, key)
+        if simulation is None:
+            simulation = self._simulate(project, trials)
+            simulation_cache.put(project_id, key, simulation)
+        return simulation
+
+    def _simulate(self, project, trials: int) -> ProjectSimulation:
+        anchor = schedule_anchor(project)
+        steps = self.repository.get_schedule_steps(project.id)
+        plan = _build_plan(steps, self.repository.get_for_project(project.id), anchor)
+        if plan is None:
+            raise ConflictException("Step dependencies form a cycle")
+        history = self.repository.get_completion_ratios(settings.SIMULATION_HISTORY_LIMIT)
+        duration_ratios = [row.duration_ratio for row in history if row.duration_ratio is not None] or [1.0]
+        cost_ratios = [row.cost_ratio for row in history if row.cost_ratio is not None] or [1.0]
+
+        finishes, costs = simulation_pool.run(
+            plan, duration_ratios, cost_ratios, trials, f"{project.id}:{project.rollup_generation}"
+        )
+        finishes.sort()
+        costs.sort()
+        bins = settings.SIMULATION_HISTOGRAM_BINS
+        at = lambda days: anchor + timedelta(days=days)
+        return ProjectSimulation(
+            project_id=project.id,
+            trials=trials,
+            history_size=len(history),
+            completion_p50=at(_percentile(finishes, 0.5)),
+            completion_p90=at(_percentile(finishes, 0.9)),
+            completion_histogram=[
+                DateBin(start=at(low), end=at(high), count=count) for low, high, count in _histogram(finishes, bins)
+            ],
+            cost_mean=sum(costs) / len(costs),
+            cost_p50=_percentile(costs, 0.5),
+            cost_p90=_percentile(costs, 0.9),
+            cost_histogram=[CostBin(low=low, high=high, count=count) for low, high, count in _histogram(costs, bins)],
+        )
+
+
+class SimulationPool:
+    """
+    Splits trials across a lazily started pool of worker processes, so a
+    large run uses several cores instead of holding the GIL of a web worker.
+    With SIMULATION_PROCESSES=0 the trials run in the calling thread.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._mutex = threading.Lock()
+
+    def run(self, plan: SimulationPlan, duration_ratios: List[float], cost_ratios: List[float], trials: int,
+            seed: str) -> Tuple[List[float], List[float]]:
+        """(finish days, cost) per trial; the same seed gives the same results"""
+        processes = settings.SIMULATION_PROCESSES
+        if processes <= 0:
+            return run_trials(plan, duration_ratios, cost_ratios, trials, f"{seed}:0")
+        chunks = [trials // processes + (1 if chunk < trials % processes else 0) for chunk in range(processes)]
+        executor = self._get_executor(processes)
+        futures = [
+            executor.submit(run_trials, plan, duration_ratios, cost_ratios, count, f"{seed}:{chunk}")
+            for chunk, count in enumerate(chunks) if count
+        ]
+        finishes, costs = [], []
+        for future in futures:
+            chunk_finishes, chunk_costs = future.result()
+            finishes.extend(chunk_finishes)
+            costs.extend(chunk_costs)
+        return finishes, costs
+
+    def _get_executor(self, processes: int) -> ProcessPoolExecutor:
+        with self._mutex:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn"))
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._mutex:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+simulation_pool = SimulationPool()
+
+
+def run_trials(plan: SimulationPlan, duration_ratios: Sequence[float], cost_ratios: Sequence[float], trials: int,
+               seed: str) -> Tuple[List[float], List[float]]:
+    """Forward pass per trial over the precomputed topological order; module-level so worker processes can run it"""
+    rng = random.Random(seed)
+    finishes, costs = [], []
+    for _ in range(trials):
+        durations = list(plan.durations)
+        for i in plan.sampled_steps:
+            durations[i] *= rng.choice(duration_ratios)
+        early = list(plan.release)
+        for node in plan.order:
+            time = early[node]
+            if not node & 1 and time + durations[node >> 1] > early[node + 1]:
+                early[node + 1] = time + durations[node >> 1]
+            for target, days in plan.outgoing[node]:
+                if time + days > early[target]:
+                    early[target] = time + days
+        finishes.append(max(early, default=0.0))
+        costs.append(plan.fixed_cost + sum(
+            max(estimate * rng.choice(cost_ratios), floor) for estimate, floor in plan.estimates
+        ))
+    return finishes, costs
+
+
+def _build_plan(steps: Sequence, dependencies: Sequence[Tuple[int, int]], anchor) -> Optional[SimulationPlan]:
+    """
+    Finished steps keep their actual duration and totals. An unfinished step
+    without sub-steps has a sampled duration (planned times a ratio). Its cost
+    is its own estimate times a ratio, but never less than its current totals.
+    A started step cannot start before its actual start.
+    """
+    planned, edges = event_graph(steps, dependencies)
+    topological = topological_order(2 * len(steps), edges)
+    if topological is None:
+        return None
+    order, outgoing = topological
+    outgoing = [
+        [(target, days) for target, days in targets if node & 1 or target != node + 1]
+        for node, targets in enumerate(outgoing)
+    ]
+    parents = {step.parent_step_id for step in steps}
+    release = [0.0] * (2 * len(steps))
+    durations, sampled_steps, estimates, fixed_cost = [], [], [], 0.0
+    for i, step in enumerate(steps):
+        start = step.actual_start_date or step.planned_start_date
+        if start is not None:
+            release[2 * i] = days_between(anchor, start)
+        total = (step.total_materials_price or 0) + (step.total_workers_price or 0)
+        estimate = (step.materials_price or 0) + (step.workers_price or 0)
+        finished = step.actual_start_date is not None and step.actual_end_date is not None
+        if finished and step.id not in parents:
+            durations.append(days_between(step.actual_start_date, step.actual_end_date))
+        else:
+            durations.append(planned[i])
+            if planned[i]:
+                sampled_steps.append(i)
+        if finished or not estimate:
+            fixed_cost += total
+        else:
+            estimates.append((estimate, total))
+    return SimulationPlan(order, outgoing, release, durations, sampled_steps, fixed_cost, estimates)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _histogram(ordered: List[float], bins: int) -> List[Tuple[float, float, int]]:
+    """Equal-width bins from the smallest to the largest value"""
+    low, high = ordered[0], ordered[-1]
+    if high == low:
+        return [(low, high, len(ordered))]
+    width = (high - low) / bins
+    counts = [0] * bins
+    for value in ordered:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    return [(low + width * i, low + width * (i + 1), count) for i, count in enumerate(counts)]
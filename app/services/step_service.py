@@ -1,10 +1,19 @@
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
 from app.repositories.step_repository import StepRepository
 from app.repositories.project_repository import ProjectRepository
-from app.schemas.step_schema import StepCreate, StepUpdate, Step as StepSchema
-from app.core.exceptions import NotFoundException, ForbiddenException
+from app.schemas.step_schema import (
+    StepCreate, StepUpdate, Step as StepSchema, StepCopyResult, StepShift, StepImport, StepImportNode, StepImportResult, StepInDB,
+    StepPage, StepRollup
+)
+from app.core.exceptions import BadRequestException, NotFoundException, ForbiddenException
 from app.models.step_model import Step
+from app.services.notification_service import NotificationService
+from app.services.step_tree_cache import step_tree_cache
+from app.services.timeline_service import creates_cycle
+from app.repositories.step_dependency_repository import StepDependencyRepository
 
 class StepService:
     def __init__(self, db: Session):
@@ -12,6 +21,8 @@ class StepService:
         self.project_repository = ProjectRepository(db)
         from app.repositories.list_repository import ListRepository
         self.list_repository = ListRepository(db)
+        self.notification_service = NotificationService(db)
+        self.dependency_repository = StepDependencyRepository(db)
 
     def create_step(self, step: StepCreate, user_internal_id: int) -> Step:
         project = self.project_repository.get_by_id_for_user(step.project_id, user_internal_id)
@@ -25,10 +36,37 @@ class StepService:
             "project_id": new_step.project_id,
             "step_id": new_step.id
         }
-        self.list_repository.create(list_data)
+        new_list = self.list_repository.create(list_data)
+        self.notification_service.notify_list_change(
+            new_list.project_id, new_list.id, "created", user_internal_id, {"step_id": new_step.id, "name": new_list.name},
+            list_name=new_list.name
+        )
         
         return new_step
 
+    def import_steps(self, step_import: StepImport, user_internal_id: int) -> StepImportResult:
+        """Create a nested plan of steps, each with its list, in one transaction"""
+        project_id = step_import.project_id
+        if not self.project_repository.get_by_id_for_user(project_id, user_internal_id):
+            raise NotFoundException("Project not found or you don't have access")
+        if step_import.parent_step_id is not None:
+            self._get_parent_in_project(step_import.parent_step_id, project_id)
+
+        temp_ids, steps = _flatten_import(step_import.steps, step_import.parent_step_id)
+        if len(temp_ids) > settings.STEP_IMPORT_MAX_STEPS:
+            raise BadRequestException(f"At most {settings.STEP_IMPORT_MAX_STEPS} steps can be imported at once")
+        if len(set(temp_ids)) != len(temp_ids):
+            raise BadRequestException("temp_id values must be unique within an import")
+
+        created = self.repository.create_many(project_id, steps)
+        self.notification_service.notify_steps_change(
+            project_id, "imported", user_internal_id, len(created), {"list_ids": [list_id for _, list_id in created]}
+        )
+        return StepImportResult(
+            step_ids={temp_id: step_id for temp_id, (step_id, _) in zip(temp_ids, created)},
+            list_ids={temp_id: list_id for temp_id, (_, list_id) in zip(temp_ids, created)},
+        )
+
     def get_step(self, step_id: int, user_internal_id: int) -> StepSchema:
         db_step = self.repository.get(step_id)
         if not db_step:
@@ -40,9 +78,29 @@ class StepService:
             
         return StepSchema.model_validate(db_step)
 
-    def get_all_steps(self) -> List[StepSchema]:
-        steps = self.repository.get_multi(skip=0, limit=10000) 
-        return [StepSchema.model_validate(step) for step in steps]
+    def list_steps(self, user_internal_id: int, after_id: Optional[int] = None, limit: int = settings.STEP_PAGE_SIZE,
+                   project_id: Optional[int] = None, parent_step_id: Optional[int] = None,
+                   from_date: Optional[datetime] = None, to_date: Optional[datetime] = None) -> StepPage:
+        """A page of the steps in the user's projects; pass next_after_id to get the following page"""
+        limit = max(1, min(limit, settings.STEP_MAX_PAGE_SIZE))
+        steps = self.repository.get_page_for_user(
+            user_internal_id, limit, after_id, project_id, parent_step_id, from_date, to_date
+        )
+        items = [StepInDB.model_validate(step) for step in steps]
+        return StepPage(items=items, next_after_id=items[-1].id if len(items) == limit else None)
+
+    def get_step_tree(self, project_id: int, user_internal_id: int) -> List[StepRollup]:
+        """The project's step forest with subtree rollups; cached until the project's rollup_generation changes"""
+        project = self.project_repository.get_by_id_for_user(project_id, user_internal_id)
+        if not project:
+            raise NotFoundException("Project not found or you don't have access")
+
+        generation = project.rollup_generation
+        tree = step_tree_cache.get(project_id, generation)
+        if tree is None:
+            tree = _build_tree(self.repository.get_subtree_rollups(project_id))
+            step_tree_cache.put(project_id, generation, tree)
+        return tree
 
     def update_step(self, step_id: int, step: StepUpdate, user_internal_id: int) -> Step:
         db_step = self.repository.get(step_id)
@@ -53,11 +111,134 @@ class StepService:
         if not project:
             raise ForbiddenException("You don't have access to this project")
 
-        updated_step = self.repository.update(id=step_id, obj_in=step.model_dump(exclude_unset=True))
+        step_data = step.model_dump(exclude_unset=True)
+        if step_data.get("project_id", db_step.project_id) != db_step.project_id:
+            self._check_project_change(db_step, step_data, user_internal_id)
+        elif "parent_step_id" in step_data and step_data["parent_step_id"] != db_step.parent_step_id:
+            self._check_new_parent(db_step, step_data["parent_step_id"])
+        updated_step = self.repository.update(id=step_id, obj_in=step_data)
         if not updated_step:
             raise NotFoundException("Step not found")
         return updated_step
 
+    def move_step(self, step_id: int, parent_step_id: Optional[int], user_internal_id: int) -> Step:
+        """Re-hang the step with its whole subtree; a parent inside that subtree is rejected"""
+        db_step = self._get_accessible_step(step_id, user_internal_id)
+        if parent_step_id == db_step.parent_step_id:
+            return db_step
+        self._check_new_parent(db_step, parent_step_id)
+        moved = self.repository.update(id=step_id, obj_in={"parent_step_id": parent_step_id})
+        if not moved:
+            raise NotFoundException("Step not found")
+        self.notification_service.notify_steps_change(
+            moved.project_id, "moved", user_internal_id, 1, {"step_id": step_id, "parent_step_id": parent_step_id}
+        )
+        return moved
+
+    def copy_step(self, step_id: int, parent_step_id: Optional[int], user_internal_id: int) -> StepCopyResult:
+        """Copy the step and its sub-steps, each with a new empty list, under parent_step_id"""
+        db_step = self._get_accessible_step(step_id, user_internal_id)
+        if parent_step_id is not None:
+            self._get_parent_in_project(parent_step_id, db_step.project_id)
+        copies = self.repository.copy_subtree(step_id, parent_step_id)
+        self.notification_service.notify_steps_change(
+            db_step.project_id, "copied", user_internal_id, len(copies), {"list_ids": [list_id for _, _, list_id in copies]}
+        )
+        return StepCopyResult(
+            step_ids={source_id: new_id for source_id, new_id, _ in copies},
+            list_ids={source_id: list_id for source_id, _, list_id in copies},
+        )
+
+    def shift_step(self, step_id: int, shift: StepShift, user_internal_id: int) -> List[Step]:
+        """Move the planned dates of the step and all of its sub-steps by the same amount"""
+        if (shift.delta_days is None) == (shift.new_start_date is None):
+            raise BadRequestException("Provide exactly one of delta_days and new_start_date")
+        db_step = self._get_accessible_step(step_id, user_internal_id)
+        self.repository.lock_hierarchy(db_step.project_id)
+        # Re-read the anchor under a row lock, so a concurrent edit cannot move it before the UPDATE
+        self.repository.db.refresh(db_step, with_for_update=True)
+        if shift.new_start_date is not None:
+            if db_step.planned_start_date is None:
+                self.repository.db.rollback()
+                raise BadRequestException("The step has no planned start date to re-anchor")
+            delta = shift.new_start_date - db_step.planned_start_date
+        else:
+            delta = timedelta(days=shift.delta_days)
+        if not delta:
+            self.repository.db.rollback()
+            return []
+
+        shifted = self.repository.shift_subtree(step_id, delta)
+        self.notification_service.notify_steps_change(
+            db_step.project_id, "shifted", user_internal_id, len(shifted),
+            {"step_ids": [step.id for step in shifted], "delta_days": delta.total_seconds() / 86400},
+        )
+        return shifted
+
+    def delete_step_subtree(self, step_id: int, user_internal_id: int) -> Dict[str, Any]:
+        """Delete the step, all of its sub-steps and their lists and items"""
+        db_step = self._get_accessible_step(step_id, user_internal_id)
+        self.repository.lock_hierarchy(db_step.project_id)
+        deleted = self.repository.delete_subtree(step_id)
+        if deleted is None:
+            raise NotFoundException("Step not found")
+        project_id, list_ids, step_count = deleted
+        self.notification_service.notify_steps_change(project_id, "deleted", user_internal_id, step_count, {"list_ids": list_ids})
+        return {"deleted_steps": step_count, "deleted_list_ids": list_ids}
+
+    def _get_accessible_step(self, step_id: int, user_internal_id: int) -> Step:
+        db_step = self.repository.get(step_id)
+        if not db_step:
+            raise NotFoundException("Step not found")
+        if not self.project_repository.get_by_id_for_user(db_step.project_id, user_internal_id):
+            raise ForbiddenException("You don't have access to this project")
+        return db_step
+
+    def _get_parent_in_project(self, parent_step_id: int, project_id: int) -> Step:
+        parent = self.repository.get(parent_step_id)
+        if parent is None or parent.project_id != project_id:
+            raise BadRequestException("parent_step_id must be a step of the same project")
+        return parent
+
+    def _check_project_change(self, db_step: Step, step_data: Dict[str, Any], user_internal_id: int) -> None:
+        """
+        A step moves to another project on its own: it must end up top-level and
+        have no sub-steps or dependencies, checked under both projects' hierarchy
+        locks, and the caller needs access to the target project
+        """
+        target_project_id = step_data["project_id"]
+        if not self.project_repository.get_by_id_for_user(target_project_id, user_internal_id):
+            raise ForbiddenException("You don't have access to the target project")
+        for project_id in sorted({db_step.project_id, target_project_id}):
+            self.repository.lock_hierarchy(project_id)
+        if (step_data.get("parent_step_id", db_step.parent_step_id) is not None
+                or self.repository.has_sub_steps(db_step.id)
+                or self.dependency_repository.has_dependencies(db_step.id)):
+            self.repository.db.rollback()
+            raise BadRequestException(
+                "Only a top-level step without sub-steps or dependencies can move to another project"
+            )
+
+    def _check_new_parent(self, db_step: Step, parent_step_id: Optional[int]) -> None:
+        """
+        Take the project's hierarchy lock for the rest of the transaction, then
+        reject a parent from another project or from the step's own subtree
+        (a cycle), checked against step_closure under that lock, or one that
+        would close a cycle through step dependencies
+        """
+        if parent_step_id is not None:
+            self._get_parent_in_project(parent_step_id, db_step.project_id)
+        self.repository.lock_hierarchy(db_step.project_id)
+        if parent_step_id is not None and self.repository.would_create_cycle(db_step.id, parent_step_id):
+            self.repository.db.rollback()
+            raise BadRequestException("A step cannot be moved under itself or one of its sub-steps")
+        dependencies = self.dependency_repository.get_for_project(db_step.project_id)
+        if dependencies:
+            steps = self.dependency_repository.get_schedule_steps(db_step.project_id)
+            if creates_cycle(steps, dependencies, {db_step.id: parent_step_id}):
+                self.repository.db.rollback()
+                raise BadRequestException("The move would make the schedule cyclic through step dependencies")
+
     def delete_step(self, step_id: int, user_internal_id: int) -> bool:
         db_step = self.repository.get(step_id)
         if not db_step:
@@ -67,7 +248,40 @@ class StepService:
         if not project:
             raise ForbiddenException("You don't have access to this project")
 
+        project_id = db_step.project_id
+        step_list_id = db_step.list.id if db_step.list else None
+        step_list_name = db_step.list.name if db_step.list else None
         was_deleted = self.repository.delete(id=step_id)
         if not was_deleted:
             raise NotFoundException("Step not found")
+        if step_list_id is not None:
+            self.notification_service.notify_list_change(
+                project_id, step_list_id, "deleted", user_internal_id, list_name=step_list_name
+            )
         return was_deleted
+
+
+def _flatten_import(nodes: List[StepImportNode], parent_step_id: Optional[int]):
+    """Depth-first (temp_ids, step rows); each row names its parent by parent_index, top-level rows by parent_step_id"""
+    temp_ids, steps = [], []
+    pending = [(node, None) for node in reversed(nodes)]
+    while pending:
+        node, parent_index = pending.pop()
+        temp_ids.append(node.temp_id)
+        steps.append({
+            **node.model_dump(exclude={"temp_id", "sub_steps"}),
+            "parent_step_id": parent_step_id if parent_index is None else None,
+            "parent_index": parent_index,
+        })
+        index = len(steps) - 1
+        pending.extend((child, index) for child in reversed(node.sub_steps))
+    return temp_ids, steps
+
+
+def _build_tree(rows) -> List[StepRollup]:
+    nodes = {row.step_id: StepRollup.model_validate(row) for row in rows}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node.parent_step_id)
+        (parent.sub_steps if parent is not None else roots).append(node)
+    return roots
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.metrics import MetricsRegistry, metrics
+
+
+class StepTreeCache:
+    """
+    Per-process LRU of values derived from a project's steps (the rollup tree,
+    the timeline, the simulation, the cash-flow forecast), keyed by the
+    project's rollup_generation. Every write that changes a step, a rollup, a
+    dependency or an item's delivery period bumps the generation in the
+    database, so a stale entry is simply never matched again, in any worker.
+    The generation is read before the value is computed, which means an entry
+    is never older than its generation, only possibly newer.
+    """
+
+    def __init__(self, max_projects: Optional[int] = None, registry: MetricsRegistry = metrics,
+                 name: str = "step_tree_cache"):
+        self.max_projects = max_projects if max_projects is not None else settings.STEP_TREE_CACHE_SIZE
+        self.hits = registry.counter(f"{name}_hits")
+        self.misses = registry.counter(f"{name}_misses")
+        self._entries: "OrderedDict[int, Tuple[int, Any]]" = OrderedDict()
+        self._mutex = threading.Lock()
+
+    def get(self, project_id: int, generation: int) -> Optional[Any]:
+        with self._mutex:
+            entry = self._entries.get(project_id)
+            if entry is None or entry[0] != generation:
+                self.misses.inc()
+                return None
+            self._entries.move_to_end(project_id)
+            self.hits.inc()
+            return entry[1]
+
+    def put(self, project_id: int, generation: int, value: Any) -> None:
+        with self._mutex:
+            self._entries[project_id] = (generation, value)
+            self._entries.move_to_end(project_id)
+            while len(self._entries) > self.max_projects:
+                self._entries.popitem(last=False)
+
+
+step_tree_cache = StepTreeCache()
+timeline_cache = StepTreeCache(name="timeline_cache")
+simulation_cache = StepTreeCache(name="simulation_cache")
+cashflow_cache = StepTreeCache(name="cashflow_cache")
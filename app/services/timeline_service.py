@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.core.exceptions import BadRequestException, ConflictException, ForbiddenException, NotFoundException
+from app.models.project_model import Project
+from app.repositories.project_repository import ProjectRepository
+from app.repositories.step_dependency_repository import StepDependencyRepository
+from app.repositories.step_repository import StepRepository
+from app.schemas.timeline_schema import ProjectTimeline, StepDependency, TimelineStep
+from app.services.step_tree_cache import timeline_cache
+
+# Slack below this many days is floating-point rounding; such steps are critical
+CRITICAL_SLACK_DAYS = 1e-6
+
+Edge = Tuple[int, int, float]
+
+
+class TimelineService:
+    def __init__(self, db: Session):
+        self.repository = StepDependencyRepository(db)
+        self.step_repository = StepRepository(db)
+        self.project_repository = ProjectRepository(db)
+
+    def get_project_timeline(self, project_id: int, user_internal_id: int) -> ProjectTimeline:
+        """Critical-path schedule of the project; cached until the project's rollup_generation changes"""
+        project = self.project_repository.get_by_id_for_user(project_id, user_internal_id)
+        if not project:
+            raise NotFoundException("Project not found or you don't have access")
+
+        generation = project.rollup_generation
+        timeline = timeline_cache.get(project_id, generation)
+        if timeline is None:
+            timeline = self._compute_timeline(project)
+            timeline_cache.put(project_id, generation, timeline)
+        return timeline
+
+    def add_dependency(self, successor_id: int, predecessor_id: int, user_internal_id: int) -> StepDependency:
+        """Make successor_id wait for predecessor_id to finish; a link that would make the schedule cyclic is rejected"""
+        successor = self._get_accessible_step(successor_id, user_internal_id)
+        predecessor = self.step_repository.get(predecessor_id)
+        if predecessor is None or predecessor.project_id != successor.project_id:
+            raise BadRequestException("predecessor_id must be a step of the same project")
+        if predecessor_id == successor_id:
+            raise BadRequestException("A step cannot depend on itself")
+
+        project_id = successor.project_id
+        self.step_repository.lock_hierarchy(project_id)
+        dependencies = self.repository.get_for_project(project_id) + [(predecessor_id, successor_id)]
+        if creates_cycle(self.repository.get_schedule_steps(project_id), dependencies):
+            self.repository.db.rollback()
+            raise BadRequestException(
+                "The dependency would make the schedule cyclic (the steps depend on each other or one contains the other)"
+            )
+        if not self.repository.add(project_id, predecessor_id, successor_id):
+            raise ConflictException("Dependency already exists")
+        return StepDependency(predecessor_id=predecessor_id, successor_id=successor_id)
+
+    def remove_dependency(self, successor_id: int, predecessor_id: int, user_internal_id: int) -> None:
+        successor = self._get_accessible_step(successor_id, user_internal_id)
+        if not self.repository.remove(successor.project_id, predecessor_id, successor_id):
+            raise NotFoundException("Dependency not found")
+
+    def _get_accessible_step(self, step_id: int, user_internal_id: int):
+        step = self.step_repository.get(step_id)
+        if not step:
+            raise NotFoundException("Step not found")
+        if not self.project_repository.get_by_id_for_user(step.project_id, user_internal_id):
+            raise ForbiddenException("You don't have access to this project")
+        return step
+
+    def _compute_timeline(self, project: Project) -> ProjectTimeline:
+        steps = self.repository.get_schedule_steps(project.id)
+        dependencies = self.repository.get_for_project(project.id)
+        anchor = schedule_anchor(project)
+        durations, edges = event_graph(steps, dependencies)
+        release = [0.0] * (2 * len(steps))
+        for i, step in enumerate(steps):
+            if step.planned_start_date is not None:
+                release[2 * i] = max(days_between(anchor, step.planned_start_date), 0.0)
+        schedule = _forward_backward_pass(release, edges)
+        if schedule is None:
+            raise ConflictException("Step dependencies form a cycle")
+        early, late, finish = schedule
+
+        predecessors: Dict[int, List[int]] = {}
+        for predecessor_id, successor_id in dependencies:
+            predecessors.setdefault(successor_id, []).append(predecessor_id)
+        at = lambda days: anchor + timedelta(days=days)
+        timeline_steps = []
+        for i, step in enumerate(steps):
+            slack = late[2 * i] - early[2 * i]
+            timeline_steps.append(TimelineStep(
+                step_id=step.id,
+                parent_step_id=step.parent_step_id,
+                name=step.name,
+                duration_days=durations[i],
+                earliest_start=at(early[2 * i]),
+                earliest_finish=at(early[2 * i + 1]),
+                latest_start=at(late[2 * i]),
+                latest_finish=at(late[2 * i + 1]),
+                slack_days=round(slack, 6),
+                critical=slack < CRITICAL_SLACK_DAYS,
+                predecessor_ids=sorted(predecessors.get(step.id, [])),
+            ))
+        parents = {step.parent_step_id for step in steps}
+        critical_path = [
+            node.step_id
+            for node in sorted(timeline_steps, key=lambda node: (node.earliest_start, node.step_id))
+            if node.critical and node.step_id not in parents
+        ]
+        return ProjectTimeline(
+            project_id=project.id,
+            start=anchor,
+            finish=at(finish),
+            duration_days=finish,
+            critical_path=critical_path,
+            steps=timeline_steps,
+        )
+
+
+def schedule_anchor(project: Project) -> datetime:
+    """Day 0 of the project's schedules: its earliest planned start, else the day it was created"""
+    return project.planned_start_date or project.created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def creates_cycle(steps: Sequence, dependencies: Iterable[Tuple[int, int]],
+                  new_parents: Optional[Dict[int, Optional[int]]] = None) -> bool:
+    """Whether the step tree, with new_parents applied, together with the dependencies has no valid schedule"""
+    _, edges = event_graph(steps, dependencies, new_parents)
+    return topological_order(2 * len(steps), edges) is None
+
+
+def event_graph(steps: Sequence, dependencies: Iterable[Tuple[int, int]],
+                 new_parents: Optional[Dict[int, Optional[int]]] = None) -> Tuple[List[float], List[Edge]]:
+    """
+    Two events per step, start (2i) and finish (2i + 1), and (from, to, days)
+    edges between them: a step without sub-steps lasts its planned duration;
+    a step with sub-steps starts before and finishes after each of them; a
+    dependency is predecessor finish -> successor start. Returns each step's
+    own duration and the edges.
+    """
+    new_parents = new_parents or {}
+    parent_ids = [new_parents.get(step.id, step.parent_step_id) for step in steps]
+    index = {step.id: i for i, step in enumerate(steps)}
+    parents = set(parent_ids)
+    durations, edges = [], []
+    for i, step in enumerate(steps):
+        duration = 0.0 if step.id in parents else days_between(step.planned_start_date, step.planned_end_date)
+        durations.append(duration)
+        edges.append((2 * i, 2 * i + 1, duration))
+        parent = index.get(parent_ids[i])
+        if parent is not None:
+            edges.append((2 * parent, 2 * i, 0.0))
+            edges.append((2 * i + 1, 2 * parent + 1, 0.0))
+    for predecessor_id, successor_id in dependencies:
+        if predecessor_id in index and successor_id in index:
+            edges.append((2 * index[predecessor_id] + 1, 2 * index[successor_id], 0.0))
+    return durations, edges
+
+
+def topological_order(node_count: int, edges: List[Edge]) -> Optional[Tuple[List[int], List[List[Tuple[int, float]]]]]:
+    """Kahn's algorithm; returns the order and adjacency lists, or None when the graph has a cycle"""
+    outgoing: List[List[Tuple[int, float]]] = [[] for _ in range(node_count)]
+    indegree = [0] * node_count
+    for source, target, days in edges:
+        outgoing[source].append((target, days))
+        indegree[target] += 1
+    order = [node for node in range(node_count) if indegree[node] == 0]
+    for node in order:
+        for target, _ in outgoing[node]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                order.append(target)
+    return (order, outgoing) if len(order) == node_count else None
+
+
+def _forward_backward_pass(release: List[float], edges: List[Edge]) -> Optional[Tuple[List[float], List[float], float]]:
+    """
+    Earliest and latest time of every event, in days from the anchor, and the
+    project finish: one pass in topological order and one in reverse, each
+    touching every edge once. release holds each event's not-before time.
+    """
+    topological = topological_order(len(release), edges)
+    if topological is None:
+        return None
+    order, outgoing = topological
+    early = list(release)
+    for node in order:
+        for target, days in outgoing[node]:
+            if early[node] + days > early[target]:
+                early[target] = early[node] + days
+    finish = max(early, default=0.0)
+    late = [finish] * len(release)
+    for node in reversed(order):
+        for target, days in outgoing[node]:
+            if late[target] - days < late[node]:
+                late[node] = late[target] - days
+    return early, late, finish
+
+
+def days_between(start: Optional[datetime], end: Optional[datetime]) -> float:
+    if start is None or end is None:
+        return 0.0
+    return max((end - start).total_seconds() / 86400, 0.0)
@@ -0,0 +1,26 @@
+from typing import Optional
+
+
+class WeakETagError(ValueError):
+    """A W/ validator in If-Match, which never matches under strong comparison"""
+
+
+def format_etag(version: int) -> str:
+    """Strong ETag for a row version"""
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """
+    The row version an If-Match header asks for; None when the header is
+    absent or `*`. If-Match compares strongly (RFC 9110), so weak tags raise
+    WeakETagError; anything else that is not one of our ETags raises ValueError.
+    """
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        raise WeakETagError(tag)
+    if len(tag) < 2 or not (tag.startswith('"') and tag.endswith('"')):
+        raise ValueError(tag)
+    return int(tag[1:-1])
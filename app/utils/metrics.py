@@ -0,0 +1,81 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, Sequence
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Bucketed histogram with per-bucket (non-cumulative) counts; cheap enough to observe on every call"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+            return {
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "avg": round(self.total / self.count, 6) if self.count else 0.0,
+                "max": round(self.max, 6),
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> int:
+        return self.value
+
+
+class MetricsRegistry:
+    """Process-local metrics, exposed as JSON on GET /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(buckets))
+
+    def counter(self, name: str) -> Counter:
+        return self._get_or_create(name, Counter)
+
+    def register(self, name: str, metric: Any) -> None:
+        """Expose any object with a snapshot() method under `name`"""
+        with self._lock:
+            self._metrics[name] = metric
+
+    def _get_or_create(self, name: str, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, factory())
+        return metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+
+metrics = MetricsRegistry()
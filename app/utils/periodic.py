@@ -0,0 +1,37 @@
+import asyncio
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.logger import logger
+
+
+class PeriodicTask:
+    """Runs a blocking maintenance function every `interval` seconds on the event loop's threadpool"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.func)
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {e}")
@@ -15,6 +15,12 @@ drop table IF EXISTS project_roles   CASCADE;
 drop table IF EXISTS projects   CASCADE;
 drop table IF EXISTS steps   CASCADE;
 drop table IF EXISTS locks  CASCADE;
+drop table IF EXISTS lock_waiters  CASCADE;
+drop table IF EXISTS notifications  CASCADE;
+drop table IF EXISTS notification_cursors  CASCADE;
+drop table IF EXISTS idempotency_keys  CASCADE;
+drop table IF EXISTS step_closure  CASCADE;
+drop table IF EXISTS step_dependencies  CASCADE;
 DROP TYPE IF EXISTS public.globalroletype;
 DROP TYPE IF EXISTS public.projectroletype;
 --
@@ -137,7 +143,9 @@ CREATE TABLE public.items (
     store_distance double precision,
     approved integer,
     bought integer,
-    delivered integer
+    delivered integer,
+    version integer DEFAULT 1 NOT NULL,
+    field_versions jsonb DEFAULT '{}'::jsonb NOT NULL
 );
 
 
@@ -215,7 +223,9 @@ CREATE TABLE public.lists (
     updated_at timestamp without time zone,
     destination_address character varying,
     project_id integer NOT NULL,
-    step_id integer NOT NULL UNIQUE
+    step_id integer NOT NULL UNIQUE,
+    version integer DEFAULT 1 NOT NULL,
+    items_total double precision DEFAULT 0 NOT NULL
 );
 
 
@@ -253,6 +263,7 @@ CREATE TABLE public.locks (
     holder_id integer NOT NULL,
 --    acquired_at timestamp with time zone DEFAULT now() NOT NULL,
     acquired_at timestamp without time zone DEFAULT now() NOT NULL,
+    expires_at timestamp without time zone NOT NULL,
     created_at timestamp without time zone,
     updated_at timestamp without time zone
 );
@@ -329,8 +340,9 @@ CREATE TABLE public.projects (
     planned_end_date timestamp without time zone,
     actual_start_date timestamp without time zone,
     actual_end_date timestamp without time zone,
-    total_materials_price double precision,
-    total_workers_price double precision,
+    total_materials_price double precision DEFAULT 0,
+    total_workers_price double precision DEFAULT 0,
+    rollup_generation integer DEFAULT 0 NOT NULL,
     created_at timestamp without time zone DEFAULT now(),
     updated_at timestamp without time zone
 );
@@ -366,6 +378,8 @@ CREATE TABLE public.steps (
     actual_end_date timestamp without time zone,
     materials_price double precision,
     workers_price double precision,
+    total_materials_price double precision DEFAULT 0 NOT NULL,
+    total_workers_price double precision DEFAULT 0 NOT NULL,
     project_id integer NOT NULL,
     parent_step_id integer,
     created_at timestamp without time zone DEFAULT now(),
@@ -570,6 +584,7 @@ CREATE INDEX ix_project_users_id ON public.project_users USING btree (id);
 --
 
 CREATE INDEX ix_locks_id ON public.locks USING btree (id);
+CREATE INDEX ix_locks_expires_at ON public.locks USING btree (expires_at);
 
 --
 -- Name: ix_project_roles_id; Type: INDEX; Schema: public; Owner: dev
@@ -589,6 +604,24 @@ CREATE INDEX ix_projects_id ON public.projects USING btree (id);
 
 CREATE INDEX ix_steps_id ON public.steps USING btree (id);
 
+--
+-- Name: ix_steps_project_id_parent_step_id_id; Type: INDEX; Schema: public; Owner: dev
+--
+
+CREATE INDEX ix_steps_project_id_parent_step_id_id ON public.steps USING btree (project_id, parent_step_id, id);
+
+--
+-- Name: ix_lists_project_id; Type: INDEX; Schema: public; Owner: dev
+--
+
+CREATE INDEX ix_lists_project_id ON public.lists USING btree (project_id);
+
+--
+-- Name: ix_items_list_id; Type: INDEX; Schema: public; Owner: dev
+--
+
+CREATE INDEX ix_items_list_id ON public.items USING btree (list_id);
+
 --
 -- Name: global_roles global_roles_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: dev
 --
@@ -663,6 +696,76 @@ ALTER TABLE ONLY public.lists
 ALTER TABLE ONLY public.lists
     ADD CONSTRAINT lists_step_id_fkey FOREIGN KEY (step_id) REFERENCES public.steps(id);
 
+--
+-- Name: lock_waiters; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.lock_waiters (
+    id integer NOT NULL GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    list_id integer NOT NULL REFERENCES public.lists(id) ON DELETE CASCADE,
+    user_id integer NOT NULL REFERENCES public.users(internal_id),
+    enqueued_at timestamp without time zone DEFAULT now() NOT NULL,
+    deadline timestamp without time zone NOT NULL,
+    CONSTRAINT uq_lock_waiters_list_id_user_id UNIQUE (list_id, user_id)
+);
+
+ALTER TABLE public.lock_waiters OWNER TO dev;
+
+CREATE INDEX ix_lock_waiters_list_id_id ON public.lock_waiters USING btree (list_id, id);
+
+--
+-- Name: notifications; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.notifications (
+    id integer NOT NULL GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id integer NOT NULL REFERENCES public.users(internal_id),
+    project_id integer NOT NULL,
+    list_id integer,
+    type character varying NOT NULL,
+    message character varying NOT NULL,
+    is_read boolean DEFAULT false NOT NULL,
+    created_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+ALTER TABLE public.notifications OWNER TO dev;
+
+CREATE INDEX ix_notifications_user_id_id ON public.notifications USING btree (user_id, id);
+CREATE INDEX ix_notifications_created_at ON public.notifications USING btree (created_at);
+
+--
+-- Name: notification_cursors; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.notification_cursors (
+    user_id integer NOT NULL PRIMARY KEY REFERENCES public.users(internal_id),
+    last_read_id integer DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now()
+);
+
+ALTER TABLE public.notification_cursors OWNER TO dev;
+
+--
+-- Name: idempotency_keys; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.idempotency_keys (
+    id integer NOT NULL GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id integer NOT NULL REFERENCES public.users(internal_id),
+    key character varying(255) NOT NULL,
+    scope character varying NOT NULL,
+    request_hash character varying(64) NOT NULL,
+    status_code integer,
+    response jsonb,
+    created_at timestamp without time zone DEFAULT now() NOT NULL,
+    expires_at timestamp without time zone NOT NULL,
+    CONSTRAINT uq_idempotency_keys_user_id_key UNIQUE (user_id, key)
+);
+
+ALTER TABLE public.idempotency_keys OWNER TO dev;
+
+CREATE INDEX ix_idempotency_keys_expires_at ON public.idempotency_keys USING btree (expires_at);
+
 --
 -- Data for Name: project_roles; Type: TABLE DATA; Schema: public; Owner: dev
 --
@@ -675,3 +778,43 @@ INSERT INTO public.project_roles (role_type, description) VALUES ('USER', 'User
 --
 
 \set VERBOSITY default
+
+--
+-- Name: step_closure; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.step_closure (
+    ancestor_id integer NOT NULL REFERENCES public.steps(id) ON DELETE CASCADE,
+    descendant_id integer NOT NULL REFERENCES public.steps(id) ON DELETE CASCADE,
+    depth integer NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+ALTER TABLE public.step_closure OWNER TO dev;
+
+CREATE INDEX ix_step_closure_descendant_id ON public.step_closure USING btree (descendant_id, ancestor_id);
+
+-- Backfill from parent_step_id when adding the table to an existing database
+INSERT INTO public.step_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE pairs AS (
+    SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth FROM public.steps
+    UNION
+    SELECT pairs.ancestor_id, steps.id, pairs.depth + 1
+    FROM pairs JOIN public.steps ON steps.parent_step_id = pairs.descendant_id
+    WHERE pairs.depth < 1000
+)
+SELECT ancestor_id, descendant_id, min(depth) FROM pairs GROUP BY ancestor_id, descendant_id;
+
+--
+-- Name: step_dependencies; Type: TABLE; Schema: public; Owner: dev
+--
+
+CREATE TABLE public.step_dependencies (
+    predecessor_id integer NOT NULL REFERENCES public.steps(id) ON DELETE CASCADE,
+    successor_id integer NOT NULL REFERENCES public.steps(id) ON DELETE CASCADE,
+    PRIMARY KEY (predecessor_id, successor_id)
+);
+
+ALTER TABLE public.step_dependencies OWNER TO dev;
+
+CREATE INDEX ix_step_dependencies_successor_id ON public.step_dependencies USING btree (successor_id);
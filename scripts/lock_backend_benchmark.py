@@ -0,0 +1,79 @@
+"""
+Compare the lock backends on the configured database.
+
+    python -m scripts.lock_backend_benchmark --cycles 2000
+
+Creates a throwaway user, project and list, then for each backend times
+acquire + release cycles and lock checks (get) in a single thread and
+prints operations per second.
+"""
+import argparse
+import time
+import uuid
+from datetime import timedelta
+
+from app.core.db import SessionLocal
+from app.models.list_model import List
+from app.models.project_model import Project
+from app.models.step_model import Step
+from app.models.user_model import User
+from app.repositories.lock_repository import LockRepository
+from app.services.lock_backends import create_lock_backend
+
+TTL = timedelta(seconds=60)
+
+
+def create_list(db) -> tuple:
+    user = User(external_id=f"lock-bench-{uuid.uuid4()}")
+    project = Project(name="Lock Benchmark")
+    db.add_all([user, project])
+    db.flush()
+    step = Step(name="Lock Benchmark Step", project_id=project.id)
+    db.add(step)
+    db.flush()
+    db_list = List(name="List for Lock Benchmark", project_id=project.id, step_id=step.id)
+    db.add(db_list)
+    db.commit()
+    return [db_list, step, project, user], db_list.id, user.internal_id
+
+
+def rate(operations: int, started: float) -> float:
+    return operations / (time.perf_counter() - started)
+
+
+def main(cycles: int, backends: list) -> None:
+    db = SessionLocal()
+    created, list_id, user_id = create_list(db)
+    try:
+        print(f"{'backend':<10} {'acquire+release/s':>18} {'get/s':>10}")
+        for name in backends:
+            backend = create_lock_backend(LockRepository(db), name)
+
+            started = time.perf_counter()
+            for _ in range(cycles):
+                backend.acquire(list_id, user_id, TTL)
+                backend.release(list_id, user_id)
+            cycle_rate = rate(cycles, started)
+
+            backend.acquire(list_id, user_id, TTL)
+            started = time.perf_counter()
+            for _ in range(cycles):
+                backend.get(list_id)
+            get_rate = rate(cycles, started)
+            backend.release(list_id, user_id)
+
+            print(f"{name:<10} {cycle_rate:>18.0f} {get_rate:>10.0f}")
+    finally:
+        for record in created:
+            db.delete(record)
+            db.flush()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--backends", nargs="+", default=["table", "advisory", "memory"])
+    args = parser.parse_args()
+    main(args.cycles, args.backends)
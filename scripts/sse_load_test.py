@@ -0,0 +1,69 @@
+"""
+Hold many idle Server-Sent Events connections against a single worker.
+
+    ulimit -n 20000
+    uvicorn app.main:app --workers 1 &
+    python scripts/sse_load_test.py --connections 5000 --hold 60
+
+Every connection authenticates as its own user, subscribes to /api/sync/stream
+and then stays idle (only keep-alive comments arrive). The script reports how
+many connections were established and how many were still open at the end.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+BASE_URL = "http://localhost:8000/api"
+
+
+async def hold_connection(client: httpx.AsyncClient, hold_seconds: float, ready: asyncio.Event, stats: dict) -> None:
+    headers = {"X-User-ID": f"sse-load-{uuid.uuid4()}"}
+    try:
+        async with client.stream("GET", f"{BASE_URL}/sync/stream", headers=headers) as response:
+            if response.status_code != 200:
+                stats["failed"] += 1
+                return
+            stats["connected"] += 1
+            await ready.wait()
+            deadline = time.monotonic() + hold_seconds
+            async for _ in response.aiter_lines():
+                if time.monotonic() >= deadline:
+                    break
+            stats["held"] += 1
+    except httpx.HTTPError:
+        stats["failed"] += 1
+
+
+async def main(connections: int, hold_seconds: float, ramp_per_second: int) -> None:
+    stats = {"connected": 0, "held": 0, "failed": 0}
+    ready = asyncio.Event()
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=0)
+    timeout = httpx.Timeout(connect=30.0, read=None, write=30.0, pool=None)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        started = time.monotonic()
+        tasks = []
+        for index in range(connections):
+            tasks.append(asyncio.create_task(hold_connection(client, hold_seconds, ready, stats)))
+            if (index + 1) % ramp_per_second == 0:
+                await asyncio.sleep(1)
+        while stats["connected"] + stats["failed"] < connections:
+            await asyncio.sleep(0.5)
+        print(f"Established {stats['connected']} connections ({stats['failed']} failed) "
+              f"in {time.monotonic() - started:.1f}s")
+        ready.set()
+        await asyncio.gather(*tasks)
+
+    print(f"Held {stats['held']}/{connections} idle connections for {hold_seconds:.0f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--hold", type=float, default=60.0, help="seconds to keep every connection open")
+    parser.add_argument("--ramp", type=int, default=250, help="new connections opened per second")
+    args = parser.parse_args()
+    asyncio.run(main(args.connections, args.hold, args.ramp))
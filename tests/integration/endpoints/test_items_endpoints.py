@@ -1,7 +1,12 @@
 import uuid
 import requests
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Generator, Dict, Any, Tuple
+from sqlalchemy import func, null, update
+from app.core.config import settings
+from app.models.idempotency_key_model import IdempotencyKey
 from app.models.item_model import Item # Import Item model
 from app.core.db import SessionLocal # Import SessionLocal for direct DB access
 
@@ -313,3 +318,185 @@ def test_worker_cannot_update_item_price(setup_list: Tuple[str, int]):
         assert db_item.price == 10.0 # Should remain original price
     finally:
         db.close()
+
+def test_item_writes_respect_list_lock(setup_list: Tuple[str, int]):
+    # Arrange
+    holder_external_id, list_id = setup_list
+    other_external_id = generate_external_userid()
+    login_or_create_user(other_external_id)
+    project_id = requests.get(f"{BASE_URL}/lists/{list_id}", headers={"X-User-ID": holder_external_id}).json()["data"]["project_id"]
+    requests.post(f"{BASE_URL}/projects/{project_id}/users", headers={"X-User-ID": holder_external_id},
+                  json={"user_external_id": other_external_id})
+    holder_headers = {"X-User-ID": holder_external_id}
+    other_headers = {"X-User-ID": other_external_id}
+    item_id = requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=other_headers, json={"name": "Locked Item"}).json()["data"]["id"]
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=holder_headers).status_code == 200
+
+    # Act - the other member fires concurrent creates, updates and deletes while the lock is held
+    writes = [
+        lambda: requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=other_headers, json={"name": "Sneaky"}),
+        lambda: requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_id}", headers=other_headers, json={"name": "Sneaky"}),
+        lambda: requests.delete(f"{BASE_URL}/lists/{list_id}/items/{item_id}", headers=other_headers),
+    ]
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        responses = list(pool.map(lambda write: write(), writes * 10))
+    holder_response = requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_id}", headers=holder_headers, json={"name": "Holder Edit"})
+
+    # Assert
+    assert [response.status_code for response in responses] == [409] * 30
+    assert "List is locked by another user" in responses[0].json()["message"]
+    assert holder_response.status_code == 200
+    db = SessionLocal()
+    try:
+        db_items = db.query(Item).filter(Item.list_id == list_id).all()
+        assert [db_item.name for db_item in db_items] == ["Holder Edit"]
+    finally:
+        db.close()
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=holder_headers)
+    assert requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_id}", headers=other_headers, json={"name": "After Release"}).status_code == 200
+
+def test_update_item_with_if_match(setup_list: Tuple[str, int]):
+    # Arrange
+    external_user_id, list_id = setup_list
+    headers = {"X-User-ID": external_user_id}
+    item = requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=headers, json={"name": "Versioned Item"}).json()["data"]
+    assert item["version"] == 1
+    url = f"{BASE_URL}/lists/{list_id}/items/{item['id']}"
+
+    # Act - two edits race from the same version
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(
+            lambda name: requests.put(url, headers={**headers, "If-Match": '"1"'}, json={"name": name}), ["Edit A", "Edit B"]
+        ))
+    stale_response = requests.put(url, headers={**headers, "If-Match": '"1"'}, json={"name": "Stale Edit"})
+    fresh_response = requests.put(url, headers={**headers, "If-Match": stale_response.headers["ETag"]}, json={"name": "Fresh Edit"})
+
+    # Assert
+    assert sorted(response.status_code for response in responses) == [200, 412]
+    winner = next(response for response in responses if response.status_code == 200)
+    assert winner.headers["ETag"] == '"2"'
+    assert stale_response.status_code == 412
+    assert stale_response.json()["data"]["name"] == winner.json()["data"]["name"]
+    assert stale_response.json()["data"]["version"] == 2
+    assert fresh_response.status_code == 200
+    assert fresh_response.json()["data"]["version"] == 3
+    assert requests.put(url, headers=headers, json={"name": "Unconditional"}).json()["data"]["version"] == 4
+
+def test_update_list_with_stale_if_match(setup_list: Tuple[str, int]):
+    # Arrange
+    external_user_id, list_id = setup_list
+    headers = {"X-User-ID": external_user_id}
+    etag = requests.get(f"{BASE_URL}/lists/{list_id}", headers=headers).headers["ETag"]
+    assert requests.put(f"{BASE_URL}/lists/{list_id}", headers={**headers, "If-Match": etag}, json={"name": "Renamed"}).status_code == 200
+
+    # Act
+    response = requests.put(f"{BASE_URL}/lists/{list_id}", headers={**headers, "If-Match": etag}, json={"name": "Lost Update"})
+
+    # Assert
+    assert response.status_code == 412
+    assert response.json()["data"]["name"] == "Renamed"
+    assert response.headers["ETag"] == '"2"'
+    assert requests.put(f"{BASE_URL}/lists/{list_id}", headers={**headers, "If-Match": "garbage"}, json={"name": "X"}).status_code == 400
+    # Strong comparison: a weak tag never matches, even for the current version
+    weak = requests.put(f"{BASE_URL}/lists/{list_id}", headers={**headers, "If-Match": 'W/"2"'}, json={"name": "Weak"})
+    assert weak.status_code == 412
+    assert requests.get(f"{BASE_URL}/lists/{list_id}", headers=headers).json()["data"]["name"] == "Renamed"
+
+def test_update_item_merges_edits_of_different_fields(setup_list: Tuple[str, int]):
+    # Arrange
+    external_user_id, list_id = setup_list
+    headers = {"X-User-ID": external_user_id}
+    item = requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=headers, json={"name": "Tiles", "price": 10.0}).json()["data"]
+    url = f"{BASE_URL}/lists/{list_id}/items/{item['id']}?base_version=1"
+
+    # Act - everyone edits from version 1
+    price_response = requests.put(url, headers=headers, json={"price": 12.5})
+    bought_response = requests.put(url, headers=headers, json={"bought": 1})
+    same_price_response = requests.put(url, headers=headers, json={"price": 12.5})
+    conflict_response = requests.put(url, headers=headers, json={"price": 9.0, "quantity": 4})
+
+    # Assert
+    assert price_response.status_code == 200
+    assert bought_response.status_code == 200
+    merged = bought_response.json()["data"]
+    assert (merged["price"], merged["bought"], merged["version"]) == (12.5, 1, 3)
+    assert same_price_response.status_code == 200
+    assert conflict_response.status_code == 409
+    assert conflict_response.json()["data"]["conflicting_fields"] == ["price"]
+    assert conflict_response.json()["data"]["item"]["quantity"] == 1
+
+def test_concurrent_merges_only_conflict_on_the_same_field(setup_list: Tuple[str, int]):
+    # Arrange
+    external_user_id, list_id = setup_list
+    headers = {"X-User-ID": external_user_id}
+    item = requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=headers, json={"name": "Bricks"}).json()["data"]
+    url = f"{BASE_URL}/lists/{list_id}/items/{item['id']}?base_version=1"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # Act
+        different_fields = list(pool.map(lambda change: requests.put(url, headers=headers, json=change),
+                                         [{"price": 5.0}, {"quantity": 3}, {"approved": 1}, {"delivered": 1}]))
+        same_field = list(pool.map(lambda name: requests.put(url, headers=headers, json={"name": name}),
+                                   ["Red Bricks", "Blue Bricks"]))
+
+    # Assert
+    assert [response.status_code for response in different_fields] == [200] * 4
+    assert sorted(response.status_code for response in same_field) == [200, 409]
+    final = requests.get(f"{BASE_URL}/lists/{list_id}/items", headers=headers).json()["data"][0]
+    assert (final["price"], final["quantity"], final["approved"], final["delivered"]) == (5.0, 3, 1, 1)
+    assert final["version"] == 6
+
+def test_concurrent_retries_with_idempotency_key_create_one_item(setup_list: Tuple[str, int]):
+    # Arrange
+    external_user_id, list_id = setup_list
+    headers = {"X-User-ID": external_user_id, "Idempotency-Key": str(uuid.uuid4())}
+    url = f"{BASE_URL}/lists/{list_id}/items"
+
+    # Act
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        responses = list(pool.map(lambda _: requests.post(url, headers=headers, json={"name": "Cement"}), range(5)))
+    retry_response = requests.post(url, headers=headers, json={"name": "Cement"})
+
+    # Assert
+    assert all(response.status_code in (200, 409) for response in responses)
+    created_ids = {response.json()["data"]["id"] for response in responses + [retry_response] if response.status_code == 200}
+    assert len(created_ids) == 1
+    assert retry_response.status_code == 200
+    db = SessionLocal()
+    try:
+        assert db.query(Item).filter(Item.list_id == list_id).count() == 1
+    finally:
+        db.close()
+
+def test_idempotency_key_left_in_progress_is_taken_over_once_stale(setup_list: Tuple[str, int]):
+    # Arrange - a first attempt claimed the key and died before storing its response
+    external_user_id, list_id = setup_list
+    key = str(uuid.uuid4())
+    headers = {"X-User-ID": external_user_id, "Idempotency-Key": key}
+    url = f"{BASE_URL}/lists/{list_id}/items"
+    assert requests.post(url, headers=headers, json={"name": "Sand"}).status_code == 200
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(IdempotencyKey).where(IdempotencyKey.key == key).values(response=null(), status_code=None)
+        )
+        db.commit()
+        assert requests.post(url, headers=headers, json={"name": "Sand"}).status_code == 409
+
+        # Act - the claim has been in progress for longer than the timeout
+        db.execute(
+            update(IdempotencyKey).where(IdempotencyKey.key == key)
+            .values(created_at=func.now() - timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS + 1))
+        )
+        db.commit()
+        retry = requests.post(url, headers=headers, json={"name": "Sand"})
+
+        # Assert
+        assert retry.status_code == 200
+        assert "Idempotent-Replayed" not in retry.headers
+        replay = requests.post(url, headers=headers, json={"name": "Sand"})
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert replay.json()["data"]["id"] == retry.json()["data"]["id"]
+    finally:
+        db.close()
@@ -223,3 +223,35 @@ def test_delete_list_successfully():
         assert db_list is None
     finally:
         db.close()
+
+def test_get_list_summary():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    project_id = create_project(external_user_id, "Summary Project")["data"]["id"]
+    list_id = create_list_via_step(external_user_id, project_id, "Step for Summary")["data"]["id"]
+    headers = {"Content-Type": "application/json", "X-User-ID": external_user_id}
+
+    empty = requests.get(f"{BASE_URL}/lists/{list_id}/summary", headers=headers).json()["data"]
+    assert (empty["item_count"], empty["total_cost"], empty["by_category"]) == (0, 0, {})
+
+    items = [
+        {"name": "Bricks", "category": "masonry", "quantity": 10, "price": 2.0, "delivery_price": 5.0, "delivery_period": 3},
+        {"name": "Mortar", "category": "masonry", "quantity": 2, "price": 7.5, "delivery_period": 7},
+        {"name": "Gloves", "price": 4.0},
+    ]
+    item_ids = [
+        requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=headers, json=item).json()["data"]["id"] for item in items
+    ]
+    requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_ids[0]}", headers=headers, json={"approved": 1}).raise_for_status()
+    requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_ids[1]}", headers=headers, json={"bought": 1}).raise_for_status()
+
+    response = requests.get(f"{BASE_URL}/lists/{list_id}/summary", headers=headers)
+
+    assert response.status_code == 200
+    summary = response.json()["data"]
+    assert summary["item_count"] == 3
+    assert summary["total_cost"] == 44.0
+    assert summary["max_delivery_period"] == 7
+    assert summary["by_category"] == {"masonry": 2, "uncategorized": 1}
+    assert summary["by_status"] == {"approved": 1, "bought": 1, "delivered": 0}
+    assert requests.get(f"{BASE_URL}/lists/{list_id}/summary", headers={"X-User-ID": generate_external_userid()}).status_code == 404
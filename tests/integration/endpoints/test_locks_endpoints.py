@@ -1,5 +1,7 @@
+import time
 import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
 BASE_URL = "http://localhost:8000/api"
@@ -176,3 +178,210 @@ def test_release_lock_not_found():
     assert release_response.status_code == 404 # Not Found
     release_response_data = release_response.json()
     assert "List not found" in release_response_data["message"]
+
+def test_renew_lock_extends_lease():
+    # Arrange
+    creator_external_id = generate_external_userid()
+    _, creator_external_id_returned = login_or_create_user(creator_external_id)
+    other_user_external_id = generate_external_userid()
+    _, other_user_external_id_returned = login_or_create_user(other_user_external_id)
+
+    project_id = create_project(creator_external_id_returned, "Lock Lease Project")["data"]["id"]
+    list_id = create_list(creator_external_id_returned, project_id, "Lock Lease List")["data"]["id"]
+    requests.post(f"{BASE_URL}/projects/{project_id}/users", headers={"X-User-ID": creator_external_id_returned},
+                  json={"user_external_id": other_user_external_id_returned})
+    creator_headers = {"X-User-ID": creator_external_id_returned}
+    other_user_headers = {"X-User-ID": other_user_external_id_returned}
+
+    acquire_response = requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers)
+    assert acquire_response.status_code == 200
+    expires_at = acquire_response.json()["data"]["expires_at"]
+
+    # Act
+    renew_response = requests.post(f"{BASE_URL}/lists/{list_id}/lock/renew", headers=creator_headers)
+    other_renew_response = requests.post(f"{BASE_URL}/lists/{list_id}/lock/renew", headers=other_user_headers)
+
+    # Assert
+    assert renew_response.status_code == 200
+    assert renew_response.json()["data"]["expires_at"] > expires_at
+    assert other_renew_response.status_code == 409
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers)
+
+def setup_shared_list(project_name: str):
+    """A list in a project with two members; returns (list_id, creator_headers, other_user_headers, other_internal_id)"""
+    _, creator_external_id = login_or_create_user(generate_external_userid())
+    other_internal_id, other_external_id = login_or_create_user(generate_external_userid())
+    project_id = create_project(creator_external_id, project_name)["data"]["id"]
+    list_id = create_list(creator_external_id, project_id, f"{project_name} List")["data"]["id"]
+    requests.post(f"{BASE_URL}/projects/{project_id}/users", headers={"X-User-ID": creator_external_id},
+                  json={"user_external_id": other_external_id})
+    return list_id, {"X-User-ID": creator_external_id}, {"X-User-ID": other_external_id}, other_internal_id
+
+def test_waiting_acquire_is_handed_the_lock_on_release():
+    # Arrange
+    list_id, creator_headers, other_user_headers, other_internal_id = setup_shared_list("Lock Queue Project")
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers).status_code == 200
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Act
+        waiting = pool.submit(requests.post, f"{BASE_URL}/lists/{list_id}/lock?wait=10", headers=other_user_headers)
+        deadline = time.monotonic() + 5
+        queue = {}
+        while time.monotonic() < deadline:
+            queue = requests.get(f"{BASE_URL}/lists/{list_id}/lock/queue", headers=creator_headers).json()["data"]
+            if queue["waiters"]:
+                break
+            time.sleep(0.05)
+        released_at = time.monotonic()
+        requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers)
+        response = waiting.result(timeout=10)
+
+    # Assert
+    assert queue["waiters"] == [
+        {"user_internal_id": other_internal_id, "position": 1, "deadline": queue["waiters"][0]["deadline"]}
+    ]
+    assert response.status_code == 200
+    assert response.json()["data"]["holder_id"] == other_internal_id
+    assert time.monotonic() - released_at < 2
+    queue = requests.get(f"{BASE_URL}/lists/{list_id}/lock/queue", headers=creator_headers).json()["data"]
+    assert queue["holder_id"] == other_internal_id
+    assert queue["waiters"] == []
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers)
+
+def test_waiting_acquire_times_out_with_queue_position():
+    # Arrange
+    list_id, creator_headers, other_user_headers, _ = setup_shared_list("Lock Timeout Project")
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers).status_code == 200
+
+    # Act
+    started = time.monotonic()
+    response = requests.post(f"{BASE_URL}/lists/{list_id}/lock?wait=0.5", headers=other_user_headers)
+
+    # Assert
+    assert response.status_code == 409
+    assert "queue position 1" in response.json()["message"]
+    assert 0.5 <= time.monotonic() - started < 3
+    queue = requests.get(f"{BASE_URL}/lists/{list_id}/lock/queue", headers=creator_headers).json()["data"]
+    assert queue["waiters"] == []
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers)
+
+def list_for_step(external_user_id: str, project_id: int, step_id: int) -> int:
+    lists = requests.get(f"{BASE_URL}/lists/project/{project_id}", headers={"X-User-ID": external_user_id}).json()["data"]
+    return next(l["id"] for l in lists if l["step_id"] == step_id)
+
+def test_lock_step_subtree_and_release_in_bulk():
+    # Arrange
+    _, creator_external_id = login_or_create_user(generate_external_userid())
+    _, other_external_id = login_or_create_user(generate_external_userid())
+    project_id = create_project(creator_external_id, "Bulk Lock Project")["data"]["id"]
+    requests.post(f"{BASE_URL}/projects/{project_id}/users", headers={"X-User-ID": creator_external_id},
+                  json={"user_external_id": other_external_id})
+    headers = {"Content-Type": "application/json", "X-User-ID": creator_external_id}
+    phase = requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Phase", "project_id": project_id}).json()["data"]
+    sub_step = requests.post(f"{BASE_URL}/steps/", headers=headers,
+                             json={"name": "Sub Step", "project_id": project_id, "parent_step_id": phase["id"]}).json()["data"]
+    sub_sub_step = requests.post(f"{BASE_URL}/steps/", headers=headers,
+                                 json={"name": "Sub Sub Step", "project_id": project_id, "parent_step_id": sub_step["id"]}).json()["data"]
+    outside_step = create_step(creator_external_id, project_id, "Outside Step")["data"]
+    subtree_list_ids = sorted(list_for_step(creator_external_id, project_id, step["id"]) for step in (phase, sub_step, sub_sub_step))
+    outside_list_id = list_for_step(creator_external_id, project_id, outside_step["id"])
+
+    # Act
+    response = requests.post(f"{BASE_URL}/lists/locks", headers=headers, json={"step_id": phase["id"]})
+
+    # Assert
+    assert response.status_code == 200
+    assert [lock["list_id"] for lock in response.json()["data"]] == subtree_list_ids
+    other_headers = {"X-User-ID": other_external_id}
+    assert requests.post(f"{BASE_URL}/lists/{subtree_list_ids[-1]}/lock", headers=other_headers).status_code == 409
+    assert requests.post(f"{BASE_URL}/lists/{outside_list_id}/lock", headers=other_headers).status_code == 200
+
+    release_response = requests.post(f"{BASE_URL}/lists/locks/release", headers=headers, json={"project_id": project_id})
+    assert release_response.status_code == 200
+    assert release_response.json()["data"] == subtree_list_ids
+    assert requests.post(f"{BASE_URL}/lists/{subtree_list_ids[0]}/lock", headers=other_headers).status_code == 200
+
+def test_bulk_lock_is_all_or_nothing():
+    # Arrange
+    list_id, creator_headers, other_user_headers, _ = setup_shared_list("Bulk Lock Conflict Project")
+    project_id = requests.get(f"{BASE_URL}/lists/{list_id}", headers=creator_headers).json()["data"]["project_id"]
+    free_list_id = create_list(creator_headers["X-User-ID"], project_id, "Free List")["data"]["id"]
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers).status_code == 200
+
+    # Act
+    response = requests.post(f"{BASE_URL}/lists/locks", headers=creator_headers, json={"list_ids": [free_list_id, list_id]})
+
+    # Assert
+    assert response.status_code == 409
+    assert str([list_id]) in response.json()["message"]
+    queue = requests.get(f"{BASE_URL}/lists/{free_list_id}/lock/queue", headers=creator_headers).json()["data"]
+    assert queue["holder_id"] is None
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers)
+
+def test_overlapping_bulk_locks_do_not_deadlock():
+    # Arrange
+    list_id, creator_headers, other_user_headers, _ = setup_shared_list("Bulk Lock Race Project")
+    project_id = requests.get(f"{BASE_URL}/lists/{list_id}", headers=creator_headers).json()["data"]["project_id"]
+    list_ids = [list_id] + [
+        create_list(creator_headers["X-User-ID"], project_id, f"Race List {index}")["data"]["id"] for index in range(3)
+    ]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in range(10):
+            # Act - both users ask for the same lists, in opposite orders
+            attempts = [
+                pool.submit(requests.post, f"{BASE_URL}/lists/locks", headers=creator_headers, json={"list_ids": list_ids}),
+                pool.submit(requests.post, f"{BASE_URL}/lists/locks", headers=other_user_headers, json={"list_ids": list_ids[::-1]}),
+            ]
+            statuses = sorted(attempt.result(timeout=10).status_code for attempt in attempts)
+
+            # Assert
+            assert statuses == [200, 409]
+            for headers in (creator_headers, other_user_headers):
+                requests.post(f"{BASE_URL}/lists/locks/release", headers=headers, json={"list_ids": list_ids})
+
+def test_project_lock_status_in_one_call():
+    # Arrange
+    list_id, creator_headers, other_user_headers, other_internal_id = setup_shared_list("Lock Badges Project")
+    project_id = requests.get(f"{BASE_URL}/lists/{list_id}", headers=creator_headers).json()["data"]["project_id"]
+    unlocked_list_id = create_list(creator_headers["X-User-ID"], project_id, "Unlocked List")["data"]["id"]
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers).status_code == 200
+    _, outsider_external_id = login_or_create_user(generate_external_userid())
+
+    # Act
+    locks_response = requests.get(f"{BASE_URL}/projects/{project_id}/locks", headers=creator_headers)
+    lists_response = requests.get(f"{BASE_URL}/lists/project/{project_id}?include_locks=true", headers=creator_headers)
+    outsider_response = requests.get(f"{BASE_URL}/projects/{project_id}/locks", headers={"X-User-ID": outsider_external_id})
+
+    # Assert
+    assert locks_response.status_code == 200
+    locks = locks_response.json()["data"]
+    assert [(lock["list_id"], lock["holder_id"]) for lock in locks] == [(list_id, other_internal_id)]
+    assert locks[0]["acquired_at"] and locks[0]["expires_at"]
+    lock_badges = {l["id"]: l["lock_status"] for l in lists_response.json()["data"]}
+    assert lock_badges[list_id]["holder_id"] == other_internal_id
+    assert lock_badges[unlocked_list_id] is None
+    assert outsider_response.status_code == 403
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers)
+
+def test_failed_acquires_show_up_in_lock_metrics():
+    # Arrange
+    list_id, creator_headers, other_user_headers, _ = setup_shared_list("Lock Metrics Project")
+    assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers).status_code == 200
+
+    # Act
+    for _ in range(3):
+        assert requests.post(f"{BASE_URL}/lists/{list_id}/lock", headers=other_user_headers).status_code == 409
+    lock_metrics = requests.get(BASE_URL.replace("/api", "/metrics")).json()["locks"]
+
+    # Assert
+    assert lock_metrics["held"] >= 1
+    contended = {entry["list_id"]: entry for entry in lock_metrics["top_contended_lists"]}
+    assert contended[list_id]["failed_acquires"] == 3
+
+    requests.delete(f"{BASE_URL}/lists/{list_id}/lock", headers=creator_headers)
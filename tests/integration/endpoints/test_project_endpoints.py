@@ -1,9 +1,13 @@
 import uuid
+import pytest
 import requests
 from app.models.project_model import Project # Import Project model
 from app.models.project_user_model import ProjectUser # Import ProjectUser model
 from app.models.user_model import User # Import User model
 from app.core.db import SessionLocal # Import SessionLocal for direct DB access
+from app.core.config import settings
+from app.core.exceptions import BadRequestException
+from app.services.simulation_service import SimulationService
 
 BASE_URL = "http://localhost:8000/api"
 
@@ -203,3 +207,99 @@ def test_delete_project():
 
     get_response = requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers)
     assert get_response.status_code == 404
+
+def test_create_project_with_idempotency_key_is_not_repeated():
+    # Arrange
+    external_user_id = generate_external_userid()
+    internal_user_id = login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Idempotency-Key": str(uuid.uuid4())}
+    payload = {"name": f"Idempotent Project {uuid.uuid4()}"}
+
+    # Act
+    first_response = requests.post(f"{BASE_URL}/projects/", headers=headers, json=payload)
+    retry_response = requests.post(f"{BASE_URL}/projects/", headers=headers, json=payload)
+    changed_response = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Another Project"})
+
+    # Assert
+    assert first_response.status_code == 201
+    assert retry_response.status_code == 201
+    assert retry_response.headers["Idempotent-Replayed"] == "true"
+    assert retry_response.json() == first_response.json()
+    assert changed_response.status_code == 400
+    db = SessionLocal()
+    try:
+        assert db.query(Project).filter(Project.name == payload["name"]).count() == 1
+    finally:
+        db.close()
+
+def test_project_simulation_uses_history_of_finished_steps():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Risky Project"}).json()["data"]["id"]
+    for name, actual_end in (("Done late", "2025-01-21T00:00:00"), ("Done on time", "2025-01-11T00:00:00")):
+        requests.post(f"{BASE_URL}/steps/", headers=headers, json={
+            "name": name, "project_id": project_id, "materials_price": 100.0,
+            "planned_start_date": "2025-01-01T00:00:00", "planned_end_date": "2025-01-11T00:00:00",
+            "actual_start_date": "2025-01-01T00:00:00", "actual_end_date": actual_end,
+        })
+    requests.post(f"{BASE_URL}/steps/", headers=headers, json={
+        "name": "Open", "project_id": project_id, "materials_price": 50.0,
+        "planned_start_date": "2025-02-01T00:00:00", "planned_end_date": "2025-02-11T00:00:00",
+    })
+
+    response = requests.get(f"{BASE_URL}/projects/{project_id}/simulation?trials=400", headers=headers)
+
+    assert response.status_code == 200
+    simulation = response.json()["data"]
+    assert simulation["trials"] == 400 and simulation["history_size"] >= 2
+    assert "2025-02-11T00:00:00" <= simulation["completion_p50"] <= simulation["completion_p90"]
+    assert sum(bin["count"] for bin in simulation["completion_histogram"]) == 400
+    assert sum(bin["count"] for bin in simulation["cost_histogram"]) == 400
+    assert simulation["cost_p50"] <= simulation["cost_p90"]
+    assert simulation["cost_mean"] >= 250.0
+    assert requests.get(f"{BASE_URL}/projects/{project_id}/simulation?trials=400", headers=headers).json()["data"] == simulation
+    too_many = requests.get(f"{BASE_URL}/projects/{project_id}/simulation?trials={settings.SIMULATION_MAX_TRIALS + 1}", headers=headers)
+    assert too_many.status_code == 422
+    assert requests.get(f"{BASE_URL}/projects/{project_id}/simulation", headers={"X-User-ID": generate_external_userid()}).status_code == 404
+
+def test_simulation_service_caps_trials_for_every_caller():
+    db = SessionLocal()
+    try:
+        with pytest.raises(BadRequestException):
+            SimulationService(db).simulate_project(1, 1, settings.SIMULATION_MAX_TRIALS + 1)
+    finally:
+        db.close()
+
+def test_project_cashflow_spreads_workers_and_places_items():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Cash Project"}).json()["data"]["id"]
+    step_id = requests.post(f"{BASE_URL}/steps/", headers=headers, json={
+        "name": "Walls", "project_id": project_id, "workers_price": 140.0, "materials_price": 10.0,
+        # Monday to Monday two weeks later: half of the workers price in each week
+        "planned_start_date": "2025-03-03T00:00:00", "planned_end_date": "2025-03-17T00:00:00",
+    }).json()["data"]["id"]
+    requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Someday", "project_id": project_id, "workers_price": 5.0})
+    list_id = next(l["id"] for l in requests.get(f"{BASE_URL}/lists/project/{project_id}", headers=headers).json()["data"] if l["step_id"] == step_id)
+    item_id = requests.post(f"{BASE_URL}/lists/{list_id}/items", headers=headers, json={
+        "name": "Bricks", "quantity": 10, "price": 2.0, "delivery_price": 4.0, "delivery_period": 7,
+    }).json()["data"]["id"]
+
+    cashflow = requests.get(f"{BASE_URL}/projects/{project_id}/cashflow?bucket=week", headers=headers).json()["data"]
+
+    assert [(b["start"], b["materials"], b["workers"]) for b in cashflow["buckets"]] == [
+        ("2025-02-24T00:00:00", 24.0, 0.0),
+        ("2025-03-03T00:00:00", 10.0, 70.0),
+        ("2025-03-10T00:00:00", 0.0, 70.0),
+    ]
+    assert cashflow["buckets"][-1]["cumulative"] == 174.0
+    assert (cashflow["unscheduled_workers"], cashflow["total"]) == (5.0, 179.0)
+
+    requests.put(f"{BASE_URL}/lists/{list_id}/items/{item_id}", headers=headers, json={"delivery_period": 0})
+    cashflow = requests.get(f"{BASE_URL}/projects/{project_id}/cashflow?bucket=week", headers=headers).json()["data"]
+    assert cashflow["buckets"][0]["start"] == "2025-03-03T00:00:00"
+    cashflow = requests.get(f"{BASE_URL}/projects/{project_id}/cashflow?bucket=month", headers=headers).json()["data"]
+    assert [(b["start"], b["total"]) for b in cashflow["buckets"]] == [("2025-03-01T00:00:00", 174.0)]
+    assert requests.get(f"{BASE_URL}/projects/{project_id}/cashflow?bucket=year", headers=headers).status_code == 422
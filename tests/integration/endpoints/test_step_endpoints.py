@@ -116,25 +116,51 @@ def test_get_all_steps(): # Removed client and db_session
     step2_response = requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Step Beta", "project_id": project_id})
     assert step2_response.status_code == 201
     
-    # 3. Get all steps (note: this endpoint gets ALL steps, not just for one project)
+    # 3. Get the steps of the user's projects
     response = requests.get(f"{BASE_URL}/steps/", headers=headers)
     
     # Verify the response
     assert response.status_code == 200
-    data = response.json()["data"]
+    data = response.json()["data"]["items"]
     assert isinstance(data, list)
     
-    print(f"\nTotal steps returned: {len(data)}")
-    print(f"Project ID we're looking for: {project_id}")
-    for s in data:
-        print(f"Step: {s['name']}, project_id: {s['project_id']}")
-    
-    # Filter for the steps we just created
-    project_steps = [s for s in data if s["project_id"] == project_id]
-    assert len(project_steps) == 2
-    step_names = [s["name"] for s in project_steps]
-    assert "Step Alpha" in step_names
-    assert "Step Beta" in step_names
+    # Only this user's project is visible
+    assert {s["project_id"] for s in data} == {project_id}
+    step_names = [s["name"] for s in data]
+    assert step_names == ["Step Alpha", "Step Beta"]
+    assert "sub_steps" not in data[0]
+
+def test_get_all_steps_filters_and_paginates():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Paged Steps"}).json()["data"]["id"]
+    other_project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Other"}).json()["data"]["id"]
+    parent_id = requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Parent", "project_id": project_id}).json()["data"]["id"]
+    child_ids = [
+        requests.post(f"{BASE_URL}/steps/", headers=headers, json={
+            "name": f"Child {index}", "project_id": project_id, "parent_step_id": parent_id,
+            "planned_start_date": f"2025-0{index + 1}-01T00:00:00", "planned_end_date": f"2025-0{index + 1}-20T00:00:00",
+        }).json()["data"]["id"]
+        for index in range(3)
+    ]
+    requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Elsewhere", "project_id": other_project_id})
+
+    params = {"project_id": project_id, "parent_step_id": parent_id, "limit": 2}
+    first = requests.get(f"{BASE_URL}/steps/", headers=headers, params=params).json()["data"]
+    second = requests.get(f"{BASE_URL}/steps/", headers=headers, params={**params, "after_id": first["next_after_id"]}).json()["data"]
+
+    assert [s["id"] for s in first["items"]] == child_ids[:2]
+    assert [s["id"] for s in second["items"]] == child_ids[2:]
+    assert second["next_after_id"] is None
+
+    in_range = requests.get(f"{BASE_URL}/steps/", headers=headers, params={
+        "project_id": project_id, "from_date": "2025-02-10T00:00:00", "to_date": "2025-03-05T00:00:00",
+    }).json()["data"]["items"]
+    assert [s["id"] for s in in_range] == child_ids[1:]
+
+    outsider = {"X-User-ID": generate_external_userid()}
+    assert requests.get(f"{BASE_URL}/steps/", headers=outsider, params={"project_id": project_id}).json()["data"]["items"] == []
 
 def test_update_step(): # Removed client and db_session
     """
@@ -229,3 +255,235 @@ def test_delete_nonexistent_step(): # Removed client
     response = requests.delete(f"{BASE_URL}/steps/99999", headers=headers)
     assert response.status_code == 404
     assert response.json()["message"] == "Step not found"
+
+def test_step_tree_rolls_up_sub_steps_and_refreshes_after_writes():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Tree Project"}).json()["data"]["id"]
+
+    def create(name, parent_step_id=None, **fields):
+        payload = {"name": name, "project_id": project_id, "parent_step_id": parent_step_id, **fields}
+        return requests.post(f"{BASE_URL}/steps/", headers=headers, json=payload).json()["data"]["id"]
+
+    phase = create("Phase", materials_price=100.0, planned_start_date="2025-03-01T00:00:00")
+    walls = create("Walls", phase, workers_price=30.0, planned_end_date="2025-04-01T00:00:00")
+    paint = create("Paint", walls, materials_price=20.0)
+    paint_list = next(
+        l for l in requests.get(f"{BASE_URL}/lists/project/{project_id}", headers=headers).json()["data"]
+        if l["step_id"] == paint
+    )
+    requests.post(f"{BASE_URL}/lists/{paint_list['id']}/items", headers=headers, json={"name": "Paint", "quantity": 3, "price": 5.0})
+
+    tree = requests.get(f"{BASE_URL}/steps/project/{project_id}/tree", headers=headers).json()["data"]
+
+    assert [node["step_id"] for node in tree] == [phase]
+    root = tree[0]
+    assert (root["materials_price"], root["workers_price"], root["items_cost"]) == (120.0, 30.0, 15.0)
+    assert (root["planned_start_date"], root["planned_end_date"]) == ("2025-03-01T00:00:00", "2025-04-01T00:00:00")
+    assert root["sub_steps"][0]["step_id"] == walls
+    assert root["sub_steps"][0]["sub_steps"][0]["materials_price"] == 20.0
+
+    hits = requests.get("http://localhost:8000/metrics").json()["step_tree_cache_hits"]
+    requests.get(f"{BASE_URL}/steps/project/{project_id}/tree", headers=headers)
+    assert requests.get("http://localhost:8000/metrics").json()["step_tree_cache_hits"] == hits + 1
+
+    requests.put(f"{BASE_URL}/steps/{paint}", headers=headers, json={"name": "Paint", "project_id": project_id, "parent_step_id": walls, "materials_price": 50.0})
+    tree = requests.get(f"{BASE_URL}/steps/project/{project_id}/tree", headers=headers).json()["data"]
+    assert tree[0]["materials_price"] == 150.0
+    assert requests.get(f"{BASE_URL}/steps/project/{project_id}/tree", headers={"X-User-ID": generate_external_userid()}).status_code == 404
+
+def test_import_nested_plan():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Imported Plan"}).json()["data"]["id"]
+    plan = {
+        "project_id": project_id,
+        "steps": [
+            {"temp_id": "shell", "name": "Shell", "materials_price": 1000.0, "sub_steps": [
+                {"temp_id": "walls", "name": "Walls", "workers_price": 300.0, "sub_steps": [
+                    {"temp_id": "bricks", "name": "Bricks", "materials_price": 200.0},
+                ]},
+                {"temp_id": "roof", "name": "Roof", "planned_end_date": "2025-06-01T00:00:00"},
+            ]},
+            {"temp_id": "finish", "name": "Finishing"},
+        ],
+    }
+
+    response = requests.post(f"{BASE_URL}/steps/import", headers=headers, json=plan)
+
+    assert response.status_code == 201
+    result = response.json()["data"]
+    assert set(result["step_ids"]) == set(result["list_ids"]) == {"shell", "walls", "bricks", "roof", "finish"}
+    step_ids = result["step_ids"]
+    bricks = requests.get(f"{BASE_URL}/steps/{step_ids['bricks']}", headers=headers).json()["data"]
+    assert bricks["parent_step_id"] == step_ids["walls"]
+    walls = requests.get(f"{BASE_URL}/steps/{step_ids['walls']}", headers=headers).json()["data"]
+    assert walls["parent_step_id"] == step_ids["shell"]
+    lists = requests.get(f"{BASE_URL}/lists/project/{project_id}", headers=headers).json()["data"]
+    assert {l["step_id"]: l["id"] for l in lists} == {step_ids[key]: result["list_ids"][key] for key in step_ids}
+    project = requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers).json()["data"]
+    assert (project["total_materials_price"], project["total_workers_price"]) == (1200.0, 300.0)
+    assert project["planned_end_date"] == "2025-06-01T00:00:00"
+
+    duplicate = {"project_id": project_id, "steps": [{"temp_id": "a", "name": "A"}, {"temp_id": "a", "name": "B"}]}
+    assert requests.post(f"{BASE_URL}/steps/import", headers=headers, json=duplicate).status_code == 400
+
+def test_move_copy_and_delete_subtree():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Hierarchy Project"}).json()["data"]["id"]
+    plan = {"project_id": project_id, "steps": [
+        {"temp_id": "shell", "name": "Shell", "sub_steps": [
+            {"temp_id": "walls", "name": "Walls", "materials_price": 40.0, "sub_steps": [
+                {"temp_id": "bricks", "name": "Bricks", "workers_price": 10.0},
+            ]},
+        ]},
+        {"temp_id": "finish", "name": "Finishing"},
+    ]}
+    step_ids = requests.post(f"{BASE_URL}/steps/import", headers=headers, json=plan).json()["data"]["step_ids"]
+
+    response = requests.post(f"{BASE_URL}/steps/{step_ids['walls']}/move", headers=headers, json={"parent_step_id": step_ids["finish"]})
+    assert response.status_code == 200
+    assert response.json()["data"]["parent_step_id"] == step_ids["finish"]
+    tree = requests.get(f"{BASE_URL}/steps/project/{project_id}/tree", headers=headers).json()["data"]
+    finish = next(node for node in tree if node["step_id"] == step_ids["finish"])
+    assert (finish["materials_price"], finish["workers_price"]) == (40.0, 10.0)
+    assert finish["sub_steps"][0]["sub_steps"][0]["step_id"] == step_ids["bricks"]
+
+    cycle = requests.post(f"{BASE_URL}/steps/{step_ids['finish']}/move", headers=headers, json={"parent_step_id": step_ids["bricks"]})
+    assert cycle.status_code == 400
+
+    response = requests.post(f"{BASE_URL}/steps/{step_ids['walls']}/copy", headers=headers, json={"parent_step_id": step_ids["shell"]})
+    assert response.status_code == 201
+    copies = response.json()["data"]
+    assert set(copies["step_ids"]) == {str(step_ids["walls"]), str(step_ids["bricks"])}
+    copied_bricks = requests.get(f"{BASE_URL}/steps/{copies['step_ids'][str(step_ids['bricks'])]}", headers=headers).json()["data"]
+    assert copied_bricks["parent_step_id"] == copies["step_ids"][str(step_ids["walls"])]
+    project = requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers).json()["data"]
+    assert (project["total_materials_price"], project["total_workers_price"]) == (80.0, 20.0)
+
+    response = requests.delete(f"{BASE_URL}/steps/{step_ids['shell']}/subtree", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["data"]["deleted_steps"] == 3
+    assert set(copies["list_ids"].values()) < set(response.json()["data"]["deleted_list_ids"])
+    remaining = {l["step_id"] for l in requests.get(f"{BASE_URL}/lists/project/{project_id}", headers=headers).json()["data"]}
+    assert remaining == {step_ids["finish"], step_ids["walls"], step_ids["bricks"]}
+    project = requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers).json()["data"]
+    assert (project["total_materials_price"], project["total_workers_price"]) == (40.0, 10.0)
+
+def test_update_moves_only_a_lone_top_level_step_to_another_project():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    source_id, target_id = (
+        requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": name}).json()["data"]["id"]
+        for name in ("Source Project", "Target Project")
+    )
+    plan = {"project_id": source_id, "steps": [
+        {"temp_id": "shell", "name": "Shell", "sub_steps": [{"temp_id": "walls", "name": "Walls"}]},
+        {"temp_id": "roof", "name": "Roof", "materials_price": 30.0},
+    ]}
+    step_ids = requests.post(f"{BASE_URL}/steps/import", headers=headers, json=plan).json()["data"]["step_ids"]
+    parent_id = requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": "Parent", "project_id": target_id}).json()["data"]["id"]
+    move = lambda key, **changes: requests.put(f"{BASE_URL}/steps/{step_ids[key]}", headers=headers,
+                                               json={"name": key, "project_id": target_id, **changes})
+    rejected = "Only a top-level step without sub-steps or dependencies can move to another project"
+
+    # A step with sub-steps, a sub-step, or a step given a parent stays where it is
+    for response in (move("shell"), move("walls"), move("roof", parent_step_id=parent_id)):
+        assert response.status_code == 400
+        assert response.json()["message"] == rejected
+
+    # A project the caller cannot access
+    other_external_id = generate_external_userid()
+    login_or_create_user(other_external_id)
+    foreign_id = requests.post(f"{BASE_URL}/projects/", headers={"X-User-ID": other_external_id},
+                               json={"name": "Foreign Project"}).json()["data"]["id"]
+    assert move("roof", project_id=foreign_id).status_code == 403
+
+    # A lone top-level step moves with its list and totals
+    response = move("roof")
+    assert response.status_code == 200
+    assert response.json()["data"]["project_id"] == target_id
+    target_lists = requests.get(f"{BASE_URL}/lists/project/{target_id}", headers=headers).json()["data"]
+    assert step_ids["roof"] in {l["step_id"] for l in target_lists}
+    source_lists = requests.get(f"{BASE_URL}/lists/project/{source_id}", headers=headers).json()["data"]
+    assert step_ids["roof"] not in {l["step_id"] for l in source_lists}
+    totals = [requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers).json()["data"]["total_materials_price"]
+              for project_id in (source_id, target_id)]
+    assert totals == [0.0, 30.0]
+
+def test_project_timeline_critical_path_and_dependencies():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Timeline Project"}).json()["data"]["id"]
+    plan = {"project_id": project_id, "steps": [
+        {"temp_id": "shell", "name": "Shell", "sub_steps": [
+            {"temp_id": "walls", "name": "Walls", "planned_start_date": "2025-03-01T00:00:00", "planned_end_date": "2025-03-11T00:00:00"},
+            {"temp_id": "roof", "name": "Roof", "planned_start_date": "2025-03-01T00:00:00", "planned_end_date": "2025-03-06T00:00:00"},
+        ]},
+        {"temp_id": "paint", "name": "Paint", "planned_start_date": "2025-03-01T00:00:00", "planned_end_date": "2025-03-03T00:00:00"},
+    ]}
+    ids = requests.post(f"{BASE_URL}/steps/import", headers=headers, json=plan).json()["data"]["step_ids"]
+
+    response = requests.post(f"{BASE_URL}/steps/{ids['paint']}/dependencies", headers=headers, json={"predecessor_id": ids["shell"]})
+    assert response.status_code == 201
+    assert requests.post(f"{BASE_URL}/steps/{ids['shell']}/dependencies", headers=headers, json={"predecessor_id": ids["paint"]}).status_code == 400
+    assert requests.post(f"{BASE_URL}/steps/{ids['walls']}/dependencies", headers=headers, json={"predecessor_id": ids["shell"]}).status_code == 400
+
+    timeline = requests.get(f"{BASE_URL}/projects/{project_id}/timeline", headers=headers).json()["data"]
+
+    steps = {step["step_id"]: step for step in timeline["steps"]}
+    assert timeline["duration_days"] == 12.0
+    assert timeline["finish"] == "2025-03-13T00:00:00"
+    assert timeline["critical_path"] == [ids["walls"], ids["paint"]]
+    assert steps[ids["roof"]]["slack_days"] == 5.0 and not steps[ids["roof"]]["critical"]
+    assert steps[ids["paint"]]["earliest_start"] == "2025-03-11T00:00:00"
+    assert steps[ids["paint"]]["predecessor_ids"] == [ids["shell"]]
+    assert steps[ids["shell"]]["critical"]
+
+    assert requests.delete(f"{BASE_URL}/steps/{ids['paint']}/dependencies/{ids['shell']}", headers=headers).status_code == 204
+    timeline = requests.get(f"{BASE_URL}/projects/{project_id}/timeline", headers=headers).json()["data"]
+    assert timeline["duration_days"] == 10.0
+    assert timeline["critical_path"] == [ids["walls"]]
+
+def test_shift_step_moves_subtree_dates():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+    headers = {"X-User-ID": external_user_id, "Content-Type": "application/json"}
+    project_id = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": "Shift Project"}).json()["data"]["id"]
+    plan = {"project_id": project_id, "steps": [
+        {"temp_id": "shell", "name": "Shell", "planned_start_date": "2025-03-01T00:00:00", "sub_steps": [
+            {"temp_id": "walls", "name": "Walls", "planned_start_date": "2025-03-02T00:00:00", "planned_end_date": "2025-03-10T00:00:00"},
+        ]},
+        {"temp_id": "other", "name": "Other", "planned_start_date": "2025-03-01T00:00:00"},
+    ]}
+    ids = requests.post(f"{BASE_URL}/steps/import", headers=headers, json=plan).json()["data"]["step_ids"]
+    timeline = requests.get(f"{BASE_URL}/projects/{project_id}/timeline", headers=headers).json()["data"]
+    assert timeline["finish"] == "2025-03-10T00:00:00"
+
+    response = requests.post(f"{BASE_URL}/steps/{ids['shell']}/shift", headers=headers, json={"delta_days": 7})
+
+    assert response.status_code == 200
+    shifted = {step["id"]: step for step in response.json()["data"]}
+    assert set(shifted) == {ids["shell"], ids["walls"]}
+    assert shifted[ids["shell"]]["planned_end_date"] is None
+    assert (shifted[ids["walls"]]["planned_start_date"], shifted[ids["walls"]]["planned_end_date"]) == ("2025-03-09T00:00:00", "2025-03-17T00:00:00")
+    project = requests.get(f"{BASE_URL}/projects/{project_id}", headers=headers).json()["data"]
+    assert project["planned_end_date"] == "2025-03-17T00:00:00"
+    timeline = requests.get(f"{BASE_URL}/projects/{project_id}/timeline", headers=headers).json()["data"]
+    assert timeline["finish"] == "2025-03-17T00:00:00"
+
+    response = requests.post(f"{BASE_URL}/steps/{ids['walls']}/shift", headers=headers, json={"new_start_date": "2025-03-04T00:00:00"})
+    assert response.json()["data"][0]["planned_end_date"] == "2025-03-12T00:00:00"
+    response = requests.post(f"{BASE_URL}/steps/{ids['walls']}/shift", headers=headers, json={"new_start_date": "2025-03-05T02:00:00+02:00"})
+    assert response.status_code == 200
+    assert response.json()["data"][0]["planned_start_date"] == "2025-03-05T00:00:00"
+    response = requests.post(f"{BASE_URL}/steps/{ids['walls']}/shift", headers=headers, json={"new_start_date": "2025-03-06T00:00:00Z"})
+    assert response.status_code == 200
+    assert response.json()["data"][0]["planned_start_date"] == "2025-03-06T00:00:00"
+    assert requests.post(f"{BASE_URL}/steps/{ids['walls']}/shift", headers=headers, json={}).status_code == 400
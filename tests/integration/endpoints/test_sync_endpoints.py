@@ -0,0 +1,152 @@
+import json
+import uuid
+import requests
+from typing import Dict, Any, Iterator
+
+BASE_URL = "http://localhost:8000/api"
+
+def generate_external_userid():
+    return str(uuid.uuid4())
+
+def login_or_create_user(external_user_id: str) -> int:
+    headers = {"X-User-ID": external_user_id}
+    response = requests.post(f"{BASE_URL}/users/login", headers=headers)
+    response.raise_for_status()
+    return response.json()["internal_id"]
+
+def create_project(external_user_id: str, project_name: str) -> Dict[str, Any]:
+    headers = {"Content-Type": "application/json", "X-User-ID": external_user_id}
+    response = requests.post(f"{BASE_URL}/projects/", headers=headers, json={"name": project_name})
+    response.raise_for_status()
+    return response.json()["data"]
+
+def create_list(external_user_id: str, project_id: int, step_name: str) -> Dict[str, Any]:
+    headers = {"Content-Type": "application/json", "X-User-ID": external_user_id}
+    response = requests.post(f"{BASE_URL}/steps/", headers=headers, json={"name": step_name, "project_id": project_id})
+    response.raise_for_status()
+    response = requests.get(f"{BASE_URL}/lists/project/{project_id}", headers=headers)
+    response.raise_for_status()
+    for l in response.json()["data"]:
+        if l["name"] == f"List for {step_name}":
+            return l
+    raise Exception("List not found for step")
+
+def read_events(response: requests.Response) -> Iterator[Dict[str, Any]]:
+    """Yield decoded SSE events from a streaming response"""
+    event_type = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event_type = line[len("event: "):]
+        elif line.startswith("data: ") and event_type:
+            event = json.loads(line[len("data: "):])
+            assert event["type"] == event_type
+            yield event
+
+def test_get_notifications():
+    external_user_id = generate_external_userid()
+    login_or_create_user(external_user_id)
+
+    response = requests.get(f"{BASE_URL}/sync/notifications", headers={"X-User-ID": external_user_id})
+
+    assert response.status_code == 200
+    assert response.json()["data"] == {"items": [], "next_before_id": None}
+
+def test_notifications_fan_out_to_members_and_mark_read():
+    # Arrange
+    creator_external_id = generate_external_userid()
+    login_or_create_user(creator_external_id)
+    member_external_id = generate_external_userid()
+    login_or_create_user(member_external_id)
+    project = create_project(creator_external_id, "Inbox Project")
+    db_list = create_list(creator_external_id, project["id"], "Walls")
+    creator_headers = {"Content-Type": "application/json", "X-User-ID": creator_external_id}
+    member_headers = {"X-User-ID": member_external_id}
+    requests.post(f"{BASE_URL}/projects/{project['id']}/users", headers=creator_headers,
+                  json={"user_external_id": member_external_id})
+
+    # Act
+    for name in ("Paint", "Plaster", "Tiles"):
+        requests.post(f"{BASE_URL}/lists/{db_list['id']}/items", headers=creator_headers, json={"name": name})
+
+    # Assert: the member gets one digest for the burst, the actor gets nothing
+    first_page = requests.get(f"{BASE_URL}/sync/notifications?limit=1", headers=member_headers).json()["data"]
+    assert [n["message"] for n in first_page["items"]] == ["3 items added in List for Walls"]
+    assert first_page["items"][0]["read"] is False
+    second_page = requests.get(
+        f"{BASE_URL}/sync/notifications?limit=1&before_id={first_page['next_before_id']}", headers=member_headers
+    ).json()["data"]
+    assert second_page["items"][0]["type"] == "membership.added"
+    creator_page = requests.get(f"{BASE_URL}/sync/notifications", headers=creator_headers).json()["data"]
+    assert creator_page["items"] == []
+
+    # Act: mark one, then everything, as read
+    digest_id = first_page["items"][0]["id"]
+    response = requests.post(f"{BASE_URL}/sync/notifications/{digest_id}/read", headers=member_headers)
+    assert response.status_code == 200
+    response = requests.post(f"{BASE_URL}/sync/notifications/{digest_id}/read", headers=creator_headers)
+    assert response.status_code == 404
+    page = requests.get(f"{BASE_URL}/sync/notifications", headers=member_headers).json()["data"]
+    assert [n["read"] for n in page["items"]] == [True, False]
+
+    response = requests.post(f"{BASE_URL}/sync/notifications/read-all", headers=member_headers)
+    assert response.status_code == 200
+    assert response.json()["data"]["last_read_id"] == digest_id
+    page = requests.get(f"{BASE_URL}/sync/notifications", headers=member_headers).json()["data"]
+    assert all(n["read"] for n in page["items"])
+
+def test_stream_receives_item_and_lock_events():
+    # Arrange
+    external_user_id = generate_external_userid()
+    internal_user_id = login_or_create_user(external_user_id)
+    project = create_project(external_user_id, "Stream Project")
+    db_list = create_list(external_user_id, project["id"], "Stream Step")
+    headers = {"Content-Type": "application/json", "X-User-ID": external_user_id}
+
+    with requests.get(f"{BASE_URL}/sync/stream", headers={"X-User-ID": external_user_id}, stream=True, timeout=10) as stream:
+        assert stream.status_code == 200
+        assert stream.headers["content-type"].startswith("text/event-stream")
+
+        # Act
+        item_response = requests.post(f"{BASE_URL}/lists/{db_list['id']}/items", headers=headers, json={"name": "Bricks"})
+        assert item_response.status_code == 200
+        lock_response = requests.post(f"{BASE_URL}/lists/{db_list['id']}/lock", headers=headers)
+        assert lock_response.status_code == 200
+
+        # Assert
+        events = read_events(stream)
+        item_event = next(events)
+        assert item_event["type"] == "item.created"
+        assert item_event["project_id"] == project["id"]
+        assert item_event["data"]["list_id"] == db_list["id"]
+        assert item_event["data"]["item"]["name"] == "Bricks"
+
+        lock_event = next(events)
+        assert lock_event["type"] == "lock.acquired"
+        assert lock_event["data"]["user_internal_id"] == internal_user_id
+
+    requests.delete(f"{BASE_URL}/lists/{db_list['id']}/lock", headers=headers)
+
+def test_stream_follows_project_membership():
+    # Arrange
+    creator_external_id = generate_external_userid()
+    login_or_create_user(creator_external_id)
+    member_external_id = generate_external_userid()
+    member_internal_id = login_or_create_user(member_external_id)
+    project = create_project(creator_external_id, "Membership Stream Project")
+    db_list = create_list(creator_external_id, project["id"], "Membership Step")
+    creator_headers = {"Content-Type": "application/json", "X-User-ID": creator_external_id}
+
+    with requests.get(f"{BASE_URL}/sync/stream", headers={"X-User-ID": member_external_id}, stream=True, timeout=10) as stream:
+        # Act
+        requests.post(f"{BASE_URL}/projects/{project['id']}/users", headers=creator_headers,
+                      json={"user_external_id": member_external_id})
+        requests.post(f"{BASE_URL}/lists/{db_list['id']}/items", headers=creator_headers, json={"name": "Cement"})
+
+        # Assert
+        events = read_events(stream)
+        membership_event = next(events)
+        assert membership_event["type"] == "membership.added"
+        assert membership_event["data"]["user_internal_id"] == member_internal_id
+        item_event = next(events)
+        assert item_event["type"] == "item.created"
+        assert item_event["data"]["item"]["name"] == "Cement"
@@ -0,0 +1,111 @@
+import uuid
+import pytest
+from typing import Dict, Any, Tuple
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+
+def generate_external_userid():
+    return str(uuid.uuid4())
+
+@pytest.fixture(scope="module")
+def app_client() -> TestClient:
+    """In-process client, so socket and REST calls share the same event hub"""
+    with TestClient(app) as c:
+        yield c
+
+def login(client: TestClient, external_user_id: str) -> int:
+    response = client.post("/api/users/login", headers={"X-User-ID": external_user_id})
+    response.raise_for_status()
+    return response.json()["internal_id"]
+
+def create_project_with_list(client: TestClient, external_user_id: str) -> Tuple[int, Dict[str, Any]]:
+    headers = {"X-User-ID": external_user_id}
+    project_id = client.post("/api/projects/", headers=headers, json={"name": "Socket Project"}).json()["data"]["id"]
+    client.post("/api/steps/", headers=headers, json={"name": "Socket Step", "project_id": project_id})
+    lists = client.get(f"/api/lists/project/{project_id}", headers=headers).json()["data"]
+    return project_id, lists[0]
+
+def receive_until(websocket, event_type: str) -> Dict[str, Any]:
+    while True:
+        message = websocket.receive_json()
+        if message["type"] == event_type:
+            return message
+
+def test_socket_rejects_user_without_access(app_client: TestClient):
+    owner_external_id = generate_external_userid()
+    login(app_client, owner_external_id)
+    _, db_list = create_project_with_list(app_client, owner_external_id)
+
+    with pytest.raises(WebSocketDisconnect):
+        with app_client.websocket_connect(f"/ws/lists/{db_list['id']}", headers={"X-User-ID": generate_external_userid()}) as websocket:
+            websocket.receive_json()
+
+def test_socket_presence_and_item_broadcast(app_client: TestClient):
+    # Arrange
+    owner_external_id = generate_external_userid()
+    owner_internal_id = login(app_client, owner_external_id)
+    _, db_list = create_project_with_list(app_client, owner_external_id)
+
+    with app_client.websocket_connect(f"/ws/lists/{db_list['id']}?user_id={owner_external_id}") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "presence.snapshot"
+        assert snapshot["data"]["users"] == [{"user_internal_id": owner_internal_id, "state": "viewing"}]
+        assert snapshot["data"]["scope"] == "worker"
+
+        # Act
+        app_client.post(f"/api/lists/{db_list['id']}/items", headers={"X-User-ID": owner_external_id}, json={"name": "Tiles"})
+
+        # Assert
+        event = receive_until(websocket, "item.created")
+        assert event["data"]["list_id"] == db_list["id"]
+        assert event["data"]["item"]["name"] == "Tiles"
+
+def test_socket_lock_heartbeat_and_release_on_disconnect(app_client: TestClient):
+    # Arrange
+    owner_external_id = generate_external_userid()
+    login(app_client, owner_external_id)
+    other_external_id = generate_external_userid()
+    login(app_client, other_external_id)
+    project_id, db_list = create_project_with_list(app_client, owner_external_id)
+    app_client.post(f"/api/projects/{project_id}/users", headers={"X-User-ID": owner_external_id},
+                    json={"user_external_id": other_external_id})
+    other_headers = {"X-User-ID": other_external_id}
+
+    with app_client.websocket_connect(f"/ws/lists/{db_list['id']}", headers={"X-User-ID": owner_external_id}) as websocket:
+        websocket.receive_json()
+
+        # Act - lock over the socket and keep it alive
+        websocket.send_json({"type": "lock"})
+        assert receive_until(websocket, "lock.ok")
+        websocket.send_json({"type": "heartbeat"})
+        assert receive_until(websocket, "heartbeat.ack")["lock_held"] is True
+
+        # Assert - other editors are blocked while the socket holds the lock
+        assert app_client.post(f"/api/lists/{db_list['id']}/lock", headers=other_headers).status_code == 409
+
+    # Assert - dropping the socket released the lock (queue for it, as the release runs after the close)
+    response = app_client.post(f"/api/lists/{db_list['id']}/lock?wait=5", headers=other_headers)
+    assert response.status_code == 200
+    app_client.delete(f"/api/lists/{db_list['id']}/lock", headers=other_headers)
+
+def test_socket_answers_malformed_messages_with_errors(app_client: TestClient):
+    owner_external_id = generate_external_userid()
+    login(app_client, owner_external_id)
+    _, db_list = create_project_with_list(app_client, owner_external_id)
+
+    with app_client.websocket_connect(f"/ws/lists/{db_list['id']}", headers={"X-User-ID": owner_external_id}) as websocket:
+        websocket.receive_json()
+
+        websocket.send_text("not json")
+        assert receive_until(websocket, "error")["message"] == "Message is not valid JSON"
+        websocket.send_json(["lock"])
+        assert receive_until(websocket, "error")["message"] == "Message must be a JSON object"
+        websocket.send_json("heartbeat")
+        assert receive_until(websocket, "error")["message"] == "Message must be a JSON object"
+        websocket.send_bytes(b'{"type": "heartbeat"}')
+        assert receive_until(websocket, "error")["message"] == "Binary frames are not supported; send JSON text"
+
+        # The socket stays open for well-formed messages
+        websocket.send_json({"type": "heartbeat"})
+        assert receive_until(websocket, "heartbeat.ack")["lock_held"] is False
@@ -3,7 +3,7 @@ from unittest.mock import Mock
 from datetime import datetime
 from app.services.item_service import ItemService
 from app.schemas.item_schema import ItemCreate, ItemInDB
-from app.core.exceptions import NotFoundException, ForbiddenException
+from app.core.exceptions import NotFoundException, ForbiddenException, LockException
 from app.models.item_model import Item
 from app.models.list_model import List
 from app.models.project_model import Project
@@ -42,8 +42,7 @@ def test_create_item_successfully(item_service, mock_item_repository, mock_list_
     project_id = 1
     item_create = ItemCreate(name="Test Item", description="A test item")
     
-    mock_list_repository.get_by_id.return_value = List(id=list_id, name="Test List", project_id=project_id)
-    mock_project_repository.get_by_id_for_user.return_value = Project(id=project_id, name="Test Project")
+    mock_list_repository.get_for_write.return_value = (List(id=list_id, name="Test List", project_id=project_id), True, None)
     
     current_time = datetime.now()
     mock_item_repository.create.return_value = Item(
@@ -63,8 +62,8 @@ def test_create_item_successfully(item_service, mock_item_repository, mock_list_
     created_item = item_service.create_item(list_id, item_create, user_internal_id)
 
     # Assert
-    mock_list_repository.get_by_id.assert_called_once_with(list_id)
-    mock_project_repository.get_by_id_for_user.assert_called_once_with(project_id, user_internal_id)
+    mock_list_repository.get_for_write.assert_called_once_with(list_id, user_internal_id)
+    mock_project_repository.get_by_id_for_user.assert_not_called()
     mock_item_repository.create.assert_called_once_with(list_id, item_create.model_dump(exclude_unset=True))
     
     assert isinstance(created_item, ItemInDB)
@@ -85,15 +84,27 @@ def test_create_item_no_access_to_project(item_service, mock_list_repository, mo
     project_id = 1
     item_create = ItemCreate(name="Test Item", description="A test item")
     
-    mock_list_repository.get_by_id.return_value = List(id=list_id, name="Test List", project_id=project_id)
-    mock_project_repository.get_by_id_for_user.return_value = None
+    mock_list_repository.get_for_write.return_value = (List(id=list_id, name="Test List", project_id=project_id), False, None)
 
     # Act & Assert
     with pytest.raises(ForbiddenException, match="You don't have access to this project"):
         item_service.create_item(list_id, item_create, user_internal_id)
     
-    mock_list_repository.get_by_id.assert_called_once_with(list_id)
-    mock_project_repository.get_by_id_for_user.assert_called_once_with(project_id, user_internal_id)
+    mock_list_repository.get_for_write.assert_called_once_with(list_id, user_internal_id)
+
+def test_create_item_list_locked_by_another_user(item_service, mock_item_repository, mock_list_repository):
+    # Arrange
+    list_id = 1
+    user_internal_id = 1
+    item_create = ItemCreate(name="Test Item", description="A test item")
+    
+    mock_list_repository.get_for_write.return_value = (List(id=list_id, name="Test List", project_id=1), True, 2)
+
+    # Act & Assert
+    with pytest.raises(LockException, match="List is locked by another user"):
+        item_service.create_item(list_id, item_create, user_internal_id)
+    
+    mock_item_repository.create.assert_not_called()
 
 def test_create_item_list_not_found(item_service, mock_list_repository):
     # Arrange
@@ -101,13 +112,13 @@ def test_create_item_list_not_found(item_service, mock_list_repository):
     user_internal_id = 1
     item_create = ItemCreate(name="Test Item", description="A test item")
     
-    mock_list_repository.get_by_id.return_value = None
+    mock_list_repository.get_for_write.return_value = None
 
     # Act & Assert
     with pytest.raises(NotFoundException, match="List not found"):
         item_service.create_item(list_id, item_create, user_internal_id)
     
-    mock_list_repository.get_by_id.assert_called_once_with(list_id)
+    mock_list_repository.get_for_write.assert_called_once_with(list_id, user_internal_id)
 
 def test_get_item_successfully(item_service, mock_item_repository, mock_list_repository, mock_project_repository):
     # Arrange
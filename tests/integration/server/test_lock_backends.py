@@ -0,0 +1,94 @@
+import uuid
+import pytest
+from datetime import timedelta
+from app.core.db import SessionLocal, create_raw_connection
+from app.models.list_model import List
+from app.models.project_model import Project
+from app.models.step_model import Step
+from app.models.user_model import User
+from app.repositories.lock_repository import LockRepository
+from app.services.lock_backends import AdvisoryLockBackend, InMemoryLockBackend, TableLockBackend
+
+LEASE = timedelta(seconds=60)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def lock_setup(db):
+    """A list and two users, created directly in the database"""
+    holder, other = User(external_id=str(uuid.uuid4())), User(external_id=str(uuid.uuid4()))
+    project = Project(name="Backend Project")
+    db.add_all([holder, other, project])
+    db.flush()
+    step = Step(name="Backend Step", project_id=project.id)
+    db.add(step)
+    db.flush()
+    db_list = List(name="List for Backend Step", project_id=project.id, step_id=step.id)
+    db.add(db_list)
+    db.commit()
+    return db_list.id, holder.internal_id, other.internal_id
+
+@pytest.fixture(params=["table", "memory", "advisory"])
+def backend(request, db):
+    if request.param == "table":
+        return TableLockBackend(LockRepository(db))
+    if request.param == "memory":
+        return InMemoryLockBackend()
+    return AdvisoryLockBackend(create_raw_connection)
+
+def test_backend_grants_one_holder_at_a_time(backend, lock_setup):
+    list_id, holder_id, other_id = lock_setup
+
+    assert backend.acquire(list_id, holder_id, LEASE).holder_id == holder_id
+    assert backend.acquire(list_id, other_id, LEASE) is None
+    assert backend.get(list_id).holder_id == holder_id
+    assert backend.renew(list_id, other_id, LEASE) is None
+    assert backend.renew(list_id, holder_id, LEASE).holder_id == holder_id
+    assert backend.release(list_id, other_id) is False
+
+    assert backend.release(list_id, holder_id) is True
+    assert backend.get(list_id) is None
+    assert backend.acquire(list_id, other_id, LEASE).holder_id == other_id
+    backend.release(list_id, other_id)
+
+def test_backend_expires_leases(backend, lock_setup):
+    list_id, holder_id, other_id = lock_setup
+    backend.acquire(list_id, holder_id, timedelta(seconds=-1))
+
+    assert backend.get(list_id) is None
+    assert (list_id, holder_id) in backend.expire()
+    assert backend.acquire(list_id, other_id, LEASE).holder_id == other_id
+    backend.release(list_id, other_id)
+
+def test_backend_reports_the_expired_lease_it_takes_over(backend, lock_setup):
+    list_id, holder_id, other_id = lock_setup
+    assert backend.acquire(list_id, holder_id, timedelta(seconds=-1)).taken_over_from is None
+    lapsed = backend.acquire(list_id, holder_id, timedelta(seconds=-1))
+    assert lapsed.taken_over_from is None
+    lapsed_at = lapsed.expires_at
+
+    taken = backend.acquire(list_id, other_id, LEASE)
+
+    assert taken.taken_over_from == (holder_id, lapsed_at)
+    assert backend.acquire(list_id, other_id, LEASE).taken_over_from is None
+    backend.release(list_id, other_id)
+
+def test_advisory_holder_is_visible_to_other_processes(lock_setup):
+    list_id, holder_id, other_id = lock_setup
+    worker_a = AdvisoryLockBackend(create_raw_connection)
+    worker_b = AdvisoryLockBackend(create_raw_connection)
+
+    worker_a.acquire(list_id, holder_id, LEASE)
+
+    remote = worker_b.get(list_id)
+    assert remote.holder_id == holder_id
+    assert (remote.acquired_at, remote.expires_at) == (None, None)
+    assert worker_b.acquire(list_id, other_id, LEASE) is None
+    worker_a.release(list_id, holder_id)
+    assert worker_b.get(list_id) is None
+    assert worker_b.acquire(list_id, other_id, LEASE).holder_id == other_id
+    worker_b.release(list_id, other_id)
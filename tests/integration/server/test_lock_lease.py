@@ -0,0 +1,103 @@
+import threading
+import uuid
+import pytest
+from datetime import timedelta
+from app.core.db import SessionLocal
+from app.models.list_model import List
+from app.models.lock_model import Lock
+from app.models.project_model import Project
+from app.models.step_model import Step
+from app.models.user_model import User
+from app.repositories.item_repository import ItemRepository
+from app.repositories.list_repository import ListRepository
+from app.repositories.lock_repository import LockRepository
+from app.services.lock_service import sweep_expired_locks
+
+EXPIRED = timedelta(seconds=-1)
+LEASE = timedelta(seconds=60)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def lease_setup(db):
+    """A list and two users, created directly in the database"""
+    holder, other = User(external_id=str(uuid.uuid4())), User(external_id=str(uuid.uuid4()))
+    project = Project(name="Lease Project")
+    db.add_all([holder, other, project])
+    db.flush()
+    step = Step(name="Lease Step", project_id=project.id)
+    db.add(step)
+    db.flush()
+    db_list = List(name="List for Lease Step", project_id=project.id, step_id=step.id)
+    db.add(db_list)
+    db.commit()
+    return db_list.id, holder.internal_id, other.internal_id
+
+def test_expired_lock_can_be_taken_over(db, lease_setup):
+    list_id, holder_id, other_id = lease_setup
+    repository = LockRepository(db)
+
+    assert repository.acquire_lock(list_id, holder_id, EXPIRED) is not None
+    assert repository.get_lock_by_list_id(list_id) is None
+
+    lock = repository.acquire_lock(list_id, other_id, LEASE)
+
+    assert lock.holder_id == other_id
+    assert repository.acquire_lock(list_id, holder_id, LEASE) is None
+    assert repository.renew_lock(list_id, holder_id, LEASE) is None
+
+def test_renew_extends_the_lease(db, lease_setup):
+    list_id, holder_id, _ = lease_setup
+    repository = LockRepository(db)
+    lock = repository.acquire_lock(list_id, holder_id, timedelta(seconds=5))
+    first_expiry = lock.expires_at
+
+    renewed = repository.renew_lock(list_id, holder_id, LEASE)
+
+    assert renewed.expires_at > first_expiry
+    assert renewed.acquired_at == lock.acquired_at
+
+def test_lease_times_come_from_one_clock(db, lease_setup):
+    list_id, holder_id, _ = lease_setup
+    lock = LockRepository(db).acquire_lock(list_id, holder_id, LEASE)
+
+    assert lock.acquired_at.tzinfo is None and lock.expires_at.tzinfo is None
+    assert lock.expires_at - lock.acquired_at == LEASE
+    assert lock.created_at == lock.updated_at == lock.acquired_at
+
+def test_acquire_waits_for_a_write_past_the_lock_check(db, lease_setup):
+    list_id, holder_id, writer_id = lease_setup
+    writer, acquirer = SessionLocal(), SessionLocal()
+    acquired = []
+    try:
+        # The writer passes the lock check; the list row stays locked until its write commits
+        assert ListRepository(writer).get_for_write(list_id, writer_id).holder_id is None
+        acquire_thread = threading.Thread(
+            target=lambda: acquired.append(LockRepository(acquirer).acquire_lock(list_id, holder_id, LEASE))
+        )
+        acquire_thread.start()
+        acquire_thread.join(timeout=0.3)
+        assert acquire_thread.is_alive() and not acquired
+
+        ItemRepository(writer).create(list_id, {"name": "In flight"})
+        acquire_thread.join(timeout=5)
+
+        # Granted only after the write committed, and later writes see it
+        assert acquired[0].holder_id == holder_id
+        assert ListRepository(writer).get_for_write(list_id, writer_id).holder_id == holder_id
+        writer.rollback()
+    finally:
+        writer.close()
+        acquirer.close()
+
+def test_sweeper_removes_expired_locks(db, lease_setup):
+    list_id, holder_id, _ = lease_setup
+    repository = LockRepository(db)
+    repository.acquire_lock(list_id, holder_id, EXPIRED)
+
+    assert sweep_expired_locks() >= 1
+    assert db.query(Lock).filter(Lock.list_id == list_id).count() == 0
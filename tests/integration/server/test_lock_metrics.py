@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from app.services.lock_metrics import LockMetrics
+from app.utils.metrics import MetricsRegistry
+
+def lock_event(event_type: str, list_id: int, holder_id: int, at: float, project_id: int = 3):
+    return {"type": event_type, "project_id": project_id, "data": {"list_id": list_id, "user_internal_id": holder_id},
+            "published_at": at}
+
+def make_metrics(**options) -> LockMetrics:
+    return LockMetrics(registry=MetricsRegistry(), **{"long_hold_seconds": 600, "top_n": 10, "max_tracked": 1000, **options})
+
+def test_hold_duration_is_measured_from_first_acquire_to_release():
+    lock_metrics = make_metrics()
+
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 1, at=100.0))
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 1, at=130.0))  # renewal by re-acquire
+    lock_metrics.on_event(lock_event("lock.acquired", 8, 2, at=100.0))
+    assert lock_metrics.held_count() == 2
+    lock_metrics.on_event(lock_event("lock.released", 7, 1, at=145.0))
+    lock_metrics.on_event(lock_event("lock.expired", 8, 2, at=103.0))
+
+    snapshot = lock_metrics.snapshot()
+    assert snapshot["held"] == 0
+    assert lock_metrics.hold_seconds.snapshot()["sum"] == 48.0
+    assert snapshot["by_project"][3]["hold_seconds"]["count"] == 2
+
+def test_taken_over_lease_is_held_until_its_expiry():
+    lock_metrics = make_metrics()
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 1, at=100.0))
+
+    expired = lock_event("lock.expired", 7, 1, at=500.0)
+    expired["data"]["expires_at"] = datetime.fromtimestamp(160.0, tz=timezone.utc).replace(tzinfo=None).isoformat()
+    lock_metrics.on_event(expired)
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 2, at=500.0))
+
+    assert lock_metrics.hold_seconds.snapshot()["sum"] == 60.0
+    assert lock_metrics.held_count() == 1
+
+def test_failed_acquires_rank_the_most_contended_lists():
+    lock_metrics = make_metrics(top_n=2)
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 1, at=100.0, project_id=5))
+
+    for list_id, failures in ((7, 3), (8, 1), (9, 2)):
+        for _ in range(failures):
+            lock_metrics.record_failed_acquire(list_id, waited_seconds=0.2)
+
+    snapshot = lock_metrics.snapshot()
+    assert [(entry["list_id"], entry["failed_acquires"]) for entry in snapshot["top_contended_lists"]] == [(7, 3), (9, 2)]
+    assert snapshot["top_contended_lists"][0]["failed_acquire_wait_seconds"]["count"] == 3
+    assert snapshot["by_project"][5]["failed_acquire_wait_seconds"]["count"] == 3
+    assert lock_metrics.failed_acquires.snapshot() == 6
+
+def test_long_holds_are_reported_once():
+    lock_metrics = make_metrics(long_hold_seconds=0)
+    lock_metrics.on_event(lock_event("lock.acquired", 7, 1, at=0.0))
+
+    assert lock_metrics.report_long_holds() == 1
+    assert lock_metrics.report_long_holds() == 0
+
+def test_per_key_histograms_are_capped():
+    lock_metrics = make_metrics(max_tracked=2)
+
+    for list_id in range(5):
+        lock_metrics.record_failed_acquire(list_id, project_id=list_id)
+
+    snapshot = lock_metrics.snapshot()
+    assert len(snapshot["top_contended_lists"]) == 2
+    assert len(snapshot["by_project"]) == 2
+    assert lock_metrics.failed_acquires.snapshot() == 5
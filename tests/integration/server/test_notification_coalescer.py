@@ -0,0 +1,64 @@
+import time
+from typing import List
+from app.services.notification_coalescer import NotificationCoalescer, PendingDigest
+
+def make_coalescer(written: List[PendingDigest], window: float = 10.0, max_events: int = 100, max_pending: int = 1000):
+    return NotificationCoalescer(writer=written.extend, window=window, max_events=max_events, max_pending=max_pending)
+
+def test_burst_for_same_list_becomes_one_digest():
+    written = []
+    coalescer = make_coalescer(written)
+
+    for index in range(12):
+        coalescer.add(1, 7, "List for Walls", 3, "item.updated", "marked delivered", f"Item {index}")
+    coalescer.add(1, 8, "List for Roof", 3, "item.updated", "marked delivered", "Shingles")
+    assert written == []
+    coalescer.flush()
+
+    assert sorted(digest.message for digest in written) == [
+        "12 items marked delivered in List for Walls",
+        "Item 'Shingles' marked delivered in List for Roof",
+    ]
+
+def test_digest_flushes_on_size_threshold():
+    written = []
+    coalescer = make_coalescer(written, max_events=5)
+
+    for _ in range(7):
+        coalescer.add(1, 7, "List for Walls", 3, "item.created", "added")
+
+    assert [digest.count for digest in written] == [5]
+    assert coalescer.pending_count() == 1
+
+def test_too_many_pending_digests_flushes_everything():
+    written = []
+    coalescer = make_coalescer(written, max_pending=3)
+
+    for list_id in range(4):
+        coalescer.add(1, list_id, f"List {list_id}", 3, "item.created", "added")
+
+    assert len(written) == 4
+    assert coalescer.pending_count() == 0
+
+def test_flush_expired_only_writes_digests_past_the_window():
+    written = []
+    coalescer = make_coalescer(written, window=0.05)
+
+    coalescer.add(1, 7, "List for Walls", 3, "item.deleted", "removed")
+    time.sleep(0.06)
+    coalescer.add(1, 8, "List for Roof", 3, "item.deleted", "removed")
+    coalescer.flush_expired()
+
+    assert [digest.list_id for digest in written] == [7]
+    assert coalescer.pending_count() == 1
+
+def test_flush_projects_leaves_other_projects_buffered():
+    written = []
+    coalescer = make_coalescer(written)
+    coalescer.add(1, 7, "List for Walls", 3, "item.created", "added")
+    coalescer.add(2, 9, "List for Roof", 3, "item.created", "added")
+
+    coalescer.flush_projects([1])
+
+    assert [digest.list_id for digest in written] == [7]
+    assert coalescer.pending_count() == 1
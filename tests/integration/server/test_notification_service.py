@@ -0,0 +1,54 @@
+import uuid
+from sqlalchemy import func, select, text
+from app.core.db import SessionLocal
+from app.models.notification_model import Notification
+from app.models.project_model import Project
+from app.models.user_model import User
+from app.services.notification_service import NotificationService
+
+def test_failed_notification_keeps_the_callers_transaction():
+    db = SessionLocal()
+    try:
+        project = Project(name="Uncommitted Project")
+        db.add(project)
+        db.flush()
+        project_id = project.id
+        db.execute(select(func.pg_advisory_xact_lock(project_id)))
+
+        # No such user: the insert fails inside its savepoint
+        NotificationService(db).notify_membership_change(project_id, "added", -1)
+
+        assert db.in_transaction() and project in db
+        assert db.scalar(text(
+            "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+        )) == 1
+        db.commit()
+    finally:
+        db.close()
+
+    check = SessionLocal()
+    try:
+        assert check.get(Project, project_id) is not None
+        assert check.scalar(select(func.count()).select_from(Notification).where(Notification.project_id == project_id)) == 0
+    finally:
+        check.close()
+
+def test_notification_commits_with_the_callers_transaction():
+    db = SessionLocal()
+    try:
+        user = User(external_id=str(uuid.uuid4()))
+        project = Project(name="Membership Project")
+        db.add_all([user, project])
+        db.flush()
+        user_id = user.internal_id
+
+        NotificationService(db).notify_membership_change(project.id, "added", user_id)
+        db.rollback()
+    finally:
+        db.close()
+
+    check = SessionLocal()
+    try:
+        assert check.scalar(select(func.count()).select_from(Notification).where(Notification.user_id == user_id)) == 0
+    finally:
+        check.close()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+import pytest
+from typing import Dict, Any, List
+from app.core.db import engine
+from app.services.pubsub import InMemoryPubSub, PostgresPubSub, publish_to_deliver, notify_batches
+
+def connect():
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.dbapi.connect(*cargs, **cparams)
+
+def make_event(index: int) -> Dict[str, Any]:
+    return {"type": "item.updated", "project_id": 1, "data": {"item_id": index}, "published_at": time.time()}
+
+async def wait_for(received: List[Dict[str, Any]], count: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while len(received) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+def test_in_memory_backend_delivers_and_measures_latency():
+    received = []
+    backend = InMemoryPubSub(received.append)
+    observed = publish_to_deliver.count
+
+    backend.publish(make_event(1))
+
+    assert [event["data"]["item_id"] for event in received] == [1]
+    assert publish_to_deliver.count == observed + 1
+
+async def test_postgres_backend_fans_out_between_workers():
+    # Arrange - two backends stand in for two uvicorn workers
+    worker_a_received, worker_b_received = [], []
+    worker_a = PostgresPubSub(worker_a_received.append, connect, channel="test_pubsub_fan_out")
+    worker_b = PostgresPubSub(worker_b_received.append, connect, channel="test_pubsub_fan_out")
+    await worker_a.start()
+    await worker_b.start()
+    batches_before = notify_batches.value
+
+    try:
+        # Act
+        for index in range(50):
+            worker_a.publish(make_event(index))
+        await wait_for(worker_b_received, 50)
+
+        # Assert - every worker sees every event, in order, in far fewer NOTIFYs
+        assert [event["data"]["item_id"] for event in worker_b_received] == list(range(50))
+        assert [event["data"]["item_id"] for event in worker_a_received] == list(range(50))
+        assert notify_batches.value - batches_before < 50
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+async def test_postgres_backend_truncates_oversized_payloads():
+    received = []
+    backend = PostgresPubSub(received.append, connect, channel="test_pubsub_truncate")
+    await backend.start()
+    try:
+        event = make_event(7)
+        event["data"]["item"] = {"description": "x" * 20000}
+        backend.publish(event)
+        await wait_for(received, 1)
+
+        assert received[0]["truncated"] is True
+        assert received[0]["data"] == {"item_id": 7}
+    finally:
+        await backend.stop()
+
+async def test_postgres_backend_asks_for_resync_on_a_sequence_gap():
+    received = []
+    backend = PostgresPubSub(received.append, connect, channel="test_pubsub_gap")
+    await backend.start()
+    sender = connect()
+    sender.autocommit = True
+    try:
+        # Event 2 of this publisher never made it, as when a NOTIFY batch fails
+        with sender.cursor() as cursor:
+            for seq in (1, 3):
+                event = {**make_event(seq), "origin": "other-worker", "seq": seq}
+                cursor.execute("SELECT pg_notify(%s, %s)", ("test_pubsub_gap", json.dumps([event])))
+        await wait_for(received, 3)
+
+        assert [event["type"] for event in received] == ["item.updated", "stream.resync", "item.updated"]
+        assert received[1]["project_id"] is None
+        assert received[1]["data"]["reason"] == "missed 1 events from another worker"
+    finally:
+        sender.close()
+        await backend.stop()
@@ -0,0 +1,107 @@
+import threading
+import time
+import pytest
+from datetime import datetime
+from sqlalchemy import select, update
+from app.core.db import SessionLocal
+from app.models.item_model import Item
+from app.models.list_model import List
+from app.models.project_model import Project
+from app.models.step_model import Step
+from app.repositories.item_repository import ItemRepository
+from app.repositories.list_repository import ListRepository
+from app.repositories.step_repository import StepRepository
+from app.services.rollup_service import reconcile_rollups
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def project_step_list(db):
+    """A project with one step (materials 100, workers 50) and the step's list"""
+    project = Project(name="Rollup Project")
+    db.add(project)
+    db.commit()
+    step = StepRepository(db).create({
+        "name": "Walls", "project_id": project.id, "materials_price": 100.0, "workers_price": 50.0,
+        "planned_start_date": datetime(2025, 3, 1), "planned_end_date": datetime(2025, 3, 10),
+    })
+    db_list = ListRepository(db).create({"name": "List for Walls", "project_id": project.id, "step_id": step.id})
+    return project, step, db_list
+
+def totals(db, project, step, db_list):
+    for obj in (project, step, db_list):
+        db.refresh(obj)
+    return db_list.items_total, step.total_materials_price, project.total_materials_price
+
+def test_item_writes_roll_up_to_list_step_and_project(db, project_step_list):
+    project, step, db_list = project_step_list
+    items = ItemRepository(db)
+
+    bricks = items.create(db_list.id, {"name": "Bricks", "quantity": 10, "price": 2.5, "delivery_price": 5.0})
+    assert totals(db, project, step, db_list) == (30.0, 130.0, 130.0)
+    assert project.total_workers_price == 50.0
+
+    items.update(bricks.id, {"quantity": 20})
+    assert totals(db, project, step, db_list) == (55.0, 155.0, 155.0)
+
+    assert items.delete(db_list.id, bricks.id)
+    assert totals(db, project, step, db_list) == (0.0, 100.0, 100.0)
+
+def test_item_update_locks_the_list_before_the_item(db, project_step_list):
+    _, _, db_list = project_step_list
+    bricks = ItemRepository(db).create(db_list.id, {"name": "Bricks", "quantity": 10, "price": 2.5})
+    list_holder, observer, writer = SessionLocal(), SessionLocal(), SessionLocal()
+    try:
+        # As ListRepository.delete does: the list row is taken first
+        list_holder.execute(select(List.id).where(List.id == db_list.id).with_for_update())
+        update_thread = threading.Thread(target=ItemRepository(writer).update, args=(bricks.id, {"quantity": 20}))
+        update_thread.start()
+        time.sleep(0.2)
+
+        # The blocked update waits on the list without holding the item
+        assert observer.scalar(select(Item.id).where(Item.id == bricks.id).with_for_update(nowait=True)) == bricks.id
+        observer.rollback()
+        list_holder.commit()
+        update_thread.join(timeout=5)
+        assert not update_thread.is_alive()
+    finally:
+        for session in (list_holder, observer, writer):
+            session.close()
+    db.refresh(bricks)
+    assert bricks.quantity == 20
+
+def test_step_writes_update_project_totals_and_dates(db, project_step_list):
+    project, step, _ = project_step_list
+    steps = StepRepository(db)
+    roof = steps.create({
+        "name": "Roof", "project_id": project.id, "workers_price": 70.0,
+        "planned_start_date": datetime(2025, 3, 5), "planned_end_date": datetime(2025, 4, 1),
+    })
+    db.refresh(project)
+    assert (project.total_materials_price, project.total_workers_price) == (100.0, 120.0)
+    assert (project.planned_start_date, project.planned_end_date) == (datetime(2025, 3, 1), datetime(2025, 4, 1))
+
+    steps.update(step.id, {"materials_price": 40.0, "planned_start_date": datetime(2025, 2, 1)})
+    db.refresh(project)
+    assert project.total_materials_price == 40.0
+    assert project.planned_start_date == datetime(2025, 2, 1)
+
+    steps.delete(roof.id)
+    db.refresh(project)
+    assert (project.total_workers_price, project.planned_end_date) == (50.0, datetime(2025, 3, 10))
+
+def test_reconcile_fixes_drift(db, project_step_list):
+    project, step, db_list = project_step_list
+    ItemRepository(db).create(db_list.id, {"name": "Bricks", "quantity": 4, "price": 5.0})
+    db.execute(update(List).where(List.id == db_list.id).values(items_total=999))
+    db.execute(update(Project).where(Project.id == project.id).values(total_workers_price=0, planned_end_date=None))
+    db.commit()
+
+    assert reconcile_rollups() >= 2
+
+    assert totals(db, project, step, db_list) == (20.0, 120.0, 120.0)
+    assert (project.total_workers_price, project.planned_end_date) == (50.0, datetime(2025, 3, 10))